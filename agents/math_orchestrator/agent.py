@@ -1,20 +1,34 @@
 from __future__ import annotations
 
-import sys
-from pathlib import Path
+from functools import cache
+from typing import Any
 
 from loguru import logger
 
-from google.adk.apps.app import App
 
-from google_adk_test import OpenAIConfig, build_math_orchestrator  # noqa: E402
+@cache
+def _build_app():
+    """Build the app on first access so discovering it stays cheap."""
+    from google.adk.apps.app import App
 
+    from google_adk_test import OpenAIConfig, build_math_orchestrator
+    from google_adk_test.session_cache import SessionBoundsPlugin
+    from google_adk_test.telemetry import TracingPlugin
 
-def _build_root_agent():
     config = OpenAIConfig.from_env()
-    logger.info(f"Loading math orchestrator for ADK web UI with {config.model}")
-    return build_math_orchestrator(config)
-
-
-root_agent = _build_root_agent()
-app = App(name="math_orchestrator", root_agent=root_agent)
+    logger.info("Loading math orchestrator for ADK web UI with {}", config.model)
+    return App(
+        name="math_orchestrator",
+        root_agent=build_math_orchestrator(config),
+        # ``adk web`` keeps sessions in its own unbounded in-memory service.
+        plugins=[SessionBoundsPlugin(), TracingPlugin()],
+    )
+
+
+def __getattr__(name: str) -> Any:
+    # ``app`` and ``root_agent`` are what the ADK agent loader looks up.
+    if name == "app":
+        return _build_app()
+    if name == "root_agent":
+        return _build_app().root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
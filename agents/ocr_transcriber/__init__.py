@@ -0,0 +1,12 @@
+"""Expose the OCR transcriber app."""
+
+from typing import Any
+
+
+def __getattr__(name: str) -> Any:
+    # Defer to ``agent.py`` so the app is only built when ADK asks for it.
+    if name in {"app", "root_agent"}:
+        from . import agent
+
+        return getattr(agent, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,24 +1,34 @@
 from __future__ import annotations
 
-import sys
-from pathlib import Path
+from functools import cache
+from typing import Any
 
 from loguru import logger
 
-from google.adk.apps.app import App
 
-# REPO_ROOT = Path(__file__).resolve().parents[2]
-# if str(REPO_ROOT) not in sys.path:
-#     sys.path.insert(0, str(REPO_ROOT))
+@cache
+def _build_app():
+    """Build the app on first access so discovering it stays cheap."""
+    from google.adk.apps.app import App
 
-from google_adk_test import OpenAIConfig, build_ocr_agent  # noqa: E402
+    from google_adk_test import OpenAIConfig, build_ocr_agent
+    from google_adk_test.session_cache import SessionBoundsPlugin
+    from google_adk_test.telemetry import TracingPlugin
 
-
-def _build_root_agent():
     config = OpenAIConfig.from_env()
-    logger.info("Loading OCR transcriber agent with %s", config.model)
-    return build_ocr_agent(config)
-
-
-root_agent = _build_root_agent()
-app = App(name="ocr_transcriber", root_agent=root_agent)
+    logger.info("Loading OCR transcriber agent with {}", config.model)
+    return App(
+        name="ocr_transcriber",
+        root_agent=build_ocr_agent(config),
+        # ``adk web`` keeps sessions, uploaded images included, in its own unbounded in-memory service.
+        plugins=[SessionBoundsPlugin(), TracingPlugin()],
+    )
+
+
+def __getattr__(name: str) -> Any:
+    # ``app`` and ``root_agent`` are what the ADK agent loader looks up.
+    if name == "app":
+        return _build_app()
+    if name == "root_agent":
+        return _build_app().root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
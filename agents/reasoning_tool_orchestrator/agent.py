@@ -1,24 +1,40 @@
 from __future__ import annotations
 
 import sys
+from functools import cache
 from pathlib import Path
+from typing import Any
 
 from loguru import logger
 
-from google.adk.apps.app import App
-
 REPO_ROOT = Path(__file__).resolve().parents[2]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from google_adk_test import OpenAIConfig, build_reasoning_tool_orchestrator  # noqa: E402
-
 
-def _build_root_agent():
-    config = OpenAIConfig.from_env()
-    logger.info("Loading reasoning tool orchestrator with %s", config.model)
-    return build_reasoning_tool_orchestrator(config)
+@cache
+def _build_app():
+    """Build the app on first access so discovering it stays cheap."""
+    from google.adk.apps.app import App
 
+    from google_adk_test import OpenAIConfig, build_reasoning_tool_orchestrator
+    from google_adk_test.session_cache import SessionBoundsPlugin
+    from google_adk_test.telemetry import TracingPlugin
 
-root_agent = _build_root_agent()
-app = App(name="reasoning_tool_orchestrator", root_agent=root_agent)
+    config = OpenAIConfig.from_env()
+    logger.info("Loading reasoning tool orchestrator with {}", config.model)
+    return App(
+        name="reasoning_tool_orchestrator",
+        root_agent=build_reasoning_tool_orchestrator(config),
+        # ``adk web`` keeps sessions in its own unbounded in-memory service.
+        plugins=[SessionBoundsPlugin(), TracingPlugin()],
+    )
+
+
+def __getattr__(name: str) -> Any:
+    # ``app`` and ``root_agent`` are what the ADK agent loader looks up.
+    if name == "app":
+        return _build_app()
+    if name == "root_agent":
+        return _build_app().root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
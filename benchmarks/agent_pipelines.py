@@ -0,0 +1,394 @@
+"""Offline throughput/latency benchmark for the agent pipelines.
+
+Run with ``uv run python benchmarks/agent_pipelines.py run``. A local mock
+model backend (``benchmarks/mock_llm.py``) replaces OpenAI, so the numbers
+measure ADK/LiteLLM orchestration overhead on top of a fixed, configurable
+model latency. Each pipeline and concurrency level runs in a fresh worker
+process so peak RSS is measured per configuration. Results are written as
+JSON; ``compare`` diffs two result files, e.g. from two commits.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+import typer
+from rich.console import Console
+from rich.table import Table
+
+app = typer.Typer(help="Benchmark the agent pipelines against a local mock model backend.")
+console = Console()
+
+PIPELINES = ("math", "reasoning", "ocr")
+DEFAULT_PROMPTS = [
+    "What is 12 / 3 + 4?",
+    "Compute (2 + 3) * 7 and write a short poem about it.",
+    "Please add 1250.50 + 349.25 - 99.99 for my invoice.",
+    "What is 18 * 4 - 6 / 3? Celebrate the answer with a verse.",
+    "Divide 81 by 9, then multiply by 5: 81 / 9 * 5",
+]
+_MOCK_SCRIPT = Path(__file__).with_name("mock_llm.py")
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Linearly interpolated percentile of ``values`` (``fraction`` in 0..1)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def current_rss_mb() -> float | None:
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def make_page(index: int) -> bytes:
+    """Render a synthetic A4-ish scanned page with a few lines of text."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("L", (1240, 1754), 255)
+    draw = ImageDraw.Draw(image)
+    for line in range(40):
+        draw.text((80, 80 + line * 40), f"Page {index} line {line}: invoice total {index * line}.00", fill=0)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def build_pipeline(name: str):
+    from google_adk_test import (
+        OpenAIConfig,
+        build_math_orchestrator,
+        build_ocr_agent,
+        build_reasoning_tool_orchestrator,
+    )
+
+    config = OpenAIConfig.from_env()
+    builders = {
+        "math": build_math_orchestrator,
+        "reasoning": build_reasoning_tool_orchestrator,
+        "ocr": build_ocr_agent,
+    }
+    return builders[name](config)
+
+
+def build_messages(pipeline: str, count: int) -> list[Any]:
+    from google.genai import types
+
+    if pipeline == "ocr":
+        return [
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part(text="Transcribe this page."),
+                    types.Part(inline_data=types.Blob(data=make_page(index), mime_type="image/png")),
+                ],
+            )
+            for index in range(count)
+        ]
+    return [
+        types.Content(role="user", parts=[types.Part(text=DEFAULT_PROMPTS[index % len(DEFAULT_PROMPTS)])])
+        for index in range(count)
+    ]
+
+
+async def run_requests(runner, messages: list[Any], concurrency: int) -> list[dict[str, Any]]:
+    """Send each message in a fresh session, at most ``concurrency`` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(message) -> dict[str, Any]:
+        async with semaphore:
+            started = time.perf_counter()
+            session = await runner.session_service.create_session(
+                app_name=runner.app_name, user_id="bench"
+            )
+            events = 0
+            error = None
+            try:
+                async for _ in runner.run_async(
+                    user_id="bench", session_id=session.id, new_message=message
+                ):
+                    events += 1
+            except Exception as exc:  # noqa: BLE001 - count failures, keep measuring
+                error = f"{type(exc).__name__}: {exc}"
+            finally:
+                await runner.session_service.delete_session(
+                    app_name=runner.app_name, user_id="bench", session_id=session.id
+                )
+            return {"latency_s": time.perf_counter() - started, "events": events, "error": error}
+
+    return await asyncio.gather(*(_one(message) for message in messages))
+
+
+async def measure(pipeline: str, concurrency: int, requests: int, warmup: int) -> dict[str, Any]:
+    """Benchmark one pipeline at one concurrency level in this process."""
+    from google.adk.artifacts import InMemoryArtifactService
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    from google_adk_test.settings import aclose_http_clients
+
+    runner = Runner(
+        app_name="bench",
+        agent=build_pipeline(pipeline),
+        session_service=InMemorySessionService(),
+        artifact_service=InMemoryArtifactService(),
+    )
+    messages = build_messages(pipeline, warmup + requests)
+    stats_url = os.environ["OPENAI_API_BASE"].removesuffix("/v1") + "/stats"
+
+    await run_requests(runner, messages[:warmup], concurrency)
+    rss_before = current_rss_mb()
+    async with httpx.AsyncClient() as client:
+        backend_before = (await client.get(stats_url)).json()
+        started = time.perf_counter()
+        results = await run_requests(runner, messages[warmup:], concurrency)
+        wall = time.perf_counter() - started
+        backend_after = (await client.get(stats_url)).json()
+    await aclose_http_clients()
+
+    latencies = [result["latency_s"] * 1000 for result in results]
+    errors = [result["error"] for result in results if result["error"]]
+    llm_calls = backend_after["requests"] - backend_before["requests"]
+    model_seconds = backend_after["model_seconds"] - backend_before["model_seconds"]
+    return {
+        "pipeline": pipeline,
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_s": round(wall, 4),
+        "throughput_rps": round(len(results) / wall, 3) if wall else None,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "max": round(max(latencies, default=0.0), 2),
+        },
+        "events_per_request": round(sum(r["events"] for r in results) / len(results), 2),
+        "llm_calls_per_request": round(llm_calls / len(results), 2),
+        "model_ms_per_request": round(model_seconds / len(results) * 1000, 2),
+        "rss_before_mb": round(rss_before, 1) if rss_before is not None else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _int_list(raw: str) -> list[int]:
+    return [int(value) for value in raw.split(",") if value.strip()]
+
+
+@app.command(hidden=True)
+def worker(
+    pipeline: str = typer.Option(..., "--pipeline"),
+    concurrency: int = typer.Option(..., "--concurrency"),
+    requests: int = typer.Option(..., "--requests"),
+    warmup: int = typer.Option(..., "--warmup"),
+) -> None:
+    """Run one configuration and print its result as a JSON line."""
+    from loguru import logger
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    result = asyncio.run(measure(pipeline, concurrency, requests, warmup))
+    print(json.dumps(result), flush=True)
+
+
+@app.command()
+def run(
+    pipelines: str = typer.Option(",".join(PIPELINES), "--pipelines", help="Comma-separated pipelines to run."),
+    concurrency: str = typer.Option("1,4,16", "--concurrency", "-c", help="Comma-separated concurrency levels."),
+    requests: int = typer.Option(40, "--requests", "-n", help="Timed requests per configuration."),
+    warmup: int = typer.Option(2, "--warmup", help="Untimed requests before measuring."),
+    latency: float = typer.Option(0.05, "--latency", help="Mock seconds before the first token."),
+    jitter: float = typer.Option(0.0, "--jitter", help="Extra random mock latency, up to this many seconds."),
+    token_rate: float = typer.Option(200.0, "--token-rate", help="Mock completion tokens per second."),
+    tokens: int = typer.Option(32, "--tokens", help="Length of mock filler replies, in tokens."),
+    script: Path | None = typer.Option(None, "--script", help="JSON reply rules for the mock backend."),
+    llm_cache: bool = typer.Option(False, "--llm-cache/--no-llm-cache", help="Turn the LLM response cache on (LLM_CACHE_PATH, default .cache/llm_responses.sqlite)."),
+    output: Path | None = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="Result file (default .cache/benchmarks/agent_pipelines-<commit>.json).",
+    ),
+) -> None:
+    """Benchmark every pipeline at every concurrency level and write JSON results."""
+    selected = [name.strip() for name in pipelines.split(",") if name.strip()]
+    unknown = sorted(set(selected) - set(PIPELINES))
+    if unknown:
+        raise typer.BadParameter(f"Unknown pipelines {unknown}; choose from {list(PIPELINES)}.")
+    commit = _git_commit()
+    output = output or Path(".cache/benchmarks") / f"agent_pipelines-{commit or 'unknown'}.json"
+
+    mock_command = [
+        sys.executable,
+        str(_MOCK_SCRIPT),
+        "--port", "0",
+        "--latency", str(latency),
+        "--jitter", str(jitter),
+        "--token-rate", str(token_rate),
+        "--tokens", str(tokens),
+    ]
+    if script is not None:
+        mock_command += ["--script", str(script)]
+    mock = subprocess.Popen(mock_command, stdout=subprocess.PIPE, text=True)
+    try:
+        api_base = mock.stdout.readline().strip()
+        if not api_base:
+            raise RuntimeError("The mock LLM backend did not start.")
+        env = dict(os.environ, OPENAI_API_BASE=api_base, OPENAI_API_KEY="mock")
+        if llm_cache:
+            env.setdefault("LLM_CACHE_PATH", ".cache/llm_responses.sqlite")
+        else:
+            env["LLM_CACHE_PATH"] = "off"
+
+        results: list[dict[str, Any]] = []
+        for pipeline in selected:
+            for level in _int_list(concurrency):
+                console.print(f"[cyan]{pipeline}[/] @ concurrency {level} …")
+                completed = subprocess.run(
+                    [
+                        sys.executable,
+                        __file__,
+                        "worker",
+                        "--pipeline", pipeline,
+                        "--concurrency", str(level),
+                        "--requests", str(requests),
+                        "--warmup", str(warmup),
+                    ],
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                )
+                if completed.returncode != 0:
+                    console.print(f"[red]{pipeline} @ {level} failed:[/]\n{completed.stderr[-2000:]}")
+                    continue
+                results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    report = {
+        "meta": {
+            "commit": commit,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pipeline_mode": os.getenv("MATH_PIPELINE_MODE", "sequential"),
+            "mock": {"latency": latency, "jitter": jitter, "token_rate": token_rate, "tokens": tokens},
+            "requests": requests,
+            "warmup": warmup,
+            "llm_cache": llm_cache,
+        },
+        "results": results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print_results(results, title=f"Agent pipelines ({commit or 'unknown commit'})")
+    console.print(f"Results written to {output}")
+
+
+def print_results(results: list[dict[str, Any]], *, title: str) -> None:
+    table = Table(title=title)
+    for column in ("pipeline", "conc", "req/s", "p50 ms", "p95 ms", "p99 ms", "events", "LLM calls", "peak RSS MB", "errors"):
+        table.add_column(column, justify="left" if column == "pipeline" else "right")
+    for result in results:
+        table.add_row(
+            result["pipeline"],
+            str(result["concurrency"]),
+            f"{result['throughput_rps']:.2f}",
+            f"{result['latency_ms']['p50']:.1f}",
+            f"{result['latency_ms']['p95']:.1f}",
+            f"{result['latency_ms']['p99']:.1f}",
+            f"{result['events_per_request']:.1f}",
+            f"{result['llm_calls_per_request']:.1f}",
+            f"{result['peak_rss_mb']:.0f}",
+            str(result["errors"]),
+        )
+    console.print(table)
+
+
+@app.command()
+def compare(
+    baseline: Path = typer.Argument(..., exists=True, help="Earlier result file."),
+    candidate: Path = typer.Argument(..., exists=True, help="Newer result file."),
+) -> None:
+    """Show the relative change of each configuration between two result files."""
+    before = {
+        (r["pipeline"], r["concurrency"]): r
+        for r in json.loads(baseline.read_text(encoding="utf-8"))["results"]
+    }
+    after = json.loads(candidate.read_text(encoding="utf-8"))["results"]
+
+    def _delta(old: float, new: float, *, lower_is_better: bool) -> str:
+        if not old:
+            return "-"
+        change = (new - old) / old
+        worse = change > 0.05 if lower_is_better else change < -0.05
+        better = change < -0.05 if lower_is_better else change > 0.05
+        colour = "red" if worse else "green" if better else "white"
+        return f"[{colour}]{change:+.1%}[/]"
+
+    table = Table(title=f"{baseline.name} → {candidate.name}")
+    for column in ("pipeline", "conc", "req/s", "p50", "p95", "p99", "peak RSS"):
+        table.add_column(column, justify="left" if column == "pipeline" else "right")
+    for result in after:
+        old = before.get((result["pipeline"], result["concurrency"]))
+        if old is None:
+            continue
+        table.add_row(
+            result["pipeline"],
+            str(result["concurrency"]),
+            _delta(old["throughput_rps"], result["throughput_rps"], lower_is_better=False),
+            *(
+                _delta(old["latency_ms"][key], result["latency_ms"][key], lower_is_better=True)
+                for key in ("p50", "p95", "p99")
+            ),
+            _delta(old["peak_rss_mb"], result["peak_rss_mb"], lower_is_better=True),
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
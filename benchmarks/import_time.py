@@ -0,0 +1,128 @@
+"""Cold-start benchmark: how long the CLI, the package and the ADK apps take to import.
+
+Run with ``uv run python benchmarks/import_time.py``. Every target runs in a
+fresh interpreter with ``-X importtime``; the best of ``--repeats`` runs is
+reported together with the slowest top-level imports. ``--max-ms name=ms``
+turns the benchmark into a check that exits non-zero when a target gets slower.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+app = typer.Typer(help="Benchmark cold import and agent construction time.")
+console = Console()
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+TARGETS = {
+    "cli": "import main",
+    "package": "import google_adk_test",
+    "settings": "from google_adk_test import OpenAIConfig",
+    "web-app": "import math_orchestrator",
+    "build-math": (
+        "from google_adk_test import OpenAIConfig, build_math_orchestrator; "
+        "build_math_orchestrator(OpenAIConfig(api_key='benchmark'))"
+    ),
+}
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(statement: str) -> dict:
+    """Run ``statement`` in a fresh interpreter and parse its import-time report."""
+    script = (
+        "import time\n"
+        "_started = time.perf_counter()\n"
+        f"{statement}\n"
+        "print(time.perf_counter() - _started)\n"
+    )
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([str(REPO_ROOT), str(REPO_ROOT / "agents")]),
+        PYTHONWARNINGS="ignore",
+        LLM_CACHE_PATH="off",
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        text=True,
+        cwd=REPO_ROOT,
+        env=env,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    top_level: list[tuple[str, int]] = []
+    modules = 0
+    for match in _LINE_RE.finditer(completed.stderr):
+        modules += 1
+        # Top-level imports are indented by exactly one space after the bar.
+        if len(match.group(3)) == 1:
+            top_level.append((match.group(4), int(match.group(2))))
+    top_level.sort(key=lambda item: -item[1])
+    return {
+        "wall_ms": float(completed.stdout.strip().splitlines()[-1]) * 1000,
+        "modules": modules,
+        "slowest": [{"module": name, "ms": micros / 1000} for name, micros in top_level[:5]],
+    }
+
+
+@app.command()
+def main(
+    targets: str = typer.Option(
+        ",".join(TARGETS), "--targets", help=f"Comma-separated targets: {', '.join(TARGETS)}."
+    ),
+    repeats: int = typer.Option(3, "--repeats", "-r", help="Runs per target; the best is reported."),
+    max_ms: list[str] = typer.Option(
+        [], "--max-ms", help="Budget such as 'cli=1000'; exit 1 when a target is slower."
+    ),
+    output: Path | None = typer.Option(None, "--output", "-o", help="Also write the results as JSON."),
+) -> None:
+    """Time cold imports of the CLI, the package and an ADK web app."""
+    selected = [name.strip() for name in targets.split(",") if name.strip()]
+    unknown = sorted(set(selected) - set(TARGETS))
+    if unknown:
+        raise typer.BadParameter(f"Unknown targets {unknown}; choose from {list(TARGETS)}.")
+    budgets = {}
+    for raw in max_ms:
+        name, _, value = raw.partition("=")
+        budgets[name.strip()] = float(value)
+
+    table = Table(title="Cold start")
+    table.add_column("target")
+    table.add_column("wall (ms)", justify="right")
+    table.add_column("modules", justify="right")
+    table.add_column("slowest top-level imports")
+
+    results: dict[str, dict] = {}
+    failed = []
+    for name in selected:
+        best = min((measure(TARGETS[name]) for _ in range(repeats)), key=lambda run: run["wall_ms"])
+        results[name] = best
+        budget = budgets.get(name)
+        over = budget is not None and best["wall_ms"] > budget
+        if over:
+            failed.append(name)
+        slowest = ", ".join(f"{item['module']} {item['ms']:.0f}ms" for item in best["slowest"][:3])
+        wall = f"{best['wall_ms']:.0f}" + (f" [red](> {budget:.0f})[/]" if over else "")
+        table.add_row(name, wall, str(best["modules"]), slowest)
+
+    console.print(table)
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if failed:
+        console.print(f"[red]Over budget:[/] {', '.join(failed)}")
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,107 @@
+"""Scaling benchmark for the iterative ``compute_basic_math`` evaluator.
+
+Run with ``uv run python benchmarks/math_evaluator.py``.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from typing import Callable
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from google_adk_test.tools import (
+    MathBudget,
+    compute_basic_math,
+    evaluate_expression,
+    get_expression_cache,
+)
+
+
+app = typer.Typer(help="Benchmark the math tool evaluator.")
+console = Console()
+
+
+def _terms(rng: random.Random, count: int) -> str:
+    terms = [f"{rng.randint(1, 999)}.{rng.randint(0, 99):02d}"]
+    for _ in range(count - 1):
+        operator = rng.choice(["+", "+", "-", "*", "/"])
+        terms.append(f" {operator} {rng.randint(1, 999)}.{rng.randint(0, 99):02d}")
+    return "".join(terms)
+
+
+def build_expression(operands: int, seed: int = 0, group: int = 100) -> str:
+    """Generate an invoice-style expression with ``operands`` terms.
+
+    Terms are summed in parenthesised subtotals of ``group`` terms, like a
+    ledger, which keeps the tree shallow enough for ``ast.parse``.
+    """
+    rng = random.Random(seed)
+    if operands <= group:
+        return _terms(rng, operands)
+    sizes = [group] * (operands // group) + ([operands % group] if operands % group else [])
+    return " + ".join(f"({_terms(rng, size)})" for size in sizes)
+
+
+def best_of(repeats: int, func: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@app.command()
+def main(
+    sizes: str = typer.Option(
+        "10,100,1000,10000,100000",
+        "--sizes",
+        help="Comma-separated operand counts to benchmark.",
+    ),
+    repeats: int = typer.Option(3, "--repeats", "-r", help="Runs per size; the best is reported."),
+    tool: bool = typer.Option(
+        False,
+        "--tool",
+        help="Also time compute_basic_math cold (full step trace) and from the expression cache.",
+    ),
+) -> None:
+    """Time evaluation for growing expressions and report per-operand cost."""
+    budget = MathBudget()
+    table = Table(title="compute_basic_math evaluator scaling")
+    table.add_column("operands", justify="right")
+    table.add_column("chars", justify="right")
+    table.add_column("evaluate (ms)", justify="right")
+    table.add_column("µs / operand", justify="right")
+    if tool:
+        table.add_column("tool call (ms)", justify="right")
+        table.add_column("cached call (ms)", justify="right")
+
+    for size in (int(raw) for raw in sizes.split(",")):
+        expression = build_expression(size)
+        elapsed = best_of(repeats, lambda: evaluate_expression(expression, budget))
+        row = [
+            f"{size:,}",
+            f"{len(expression):,}",
+            f"{elapsed * 1e3:.2f}",
+            f"{elapsed / size * 1e6:.2f}",
+        ]
+        if tool:
+            cache = get_expression_cache()
+
+            def cold_call() -> None:
+                cache.clear()
+                compute_basic_math(expression)
+
+            row.append(f"{best_of(repeats, cold_call) * 1e3:.2f}")
+            row.append(f"{best_of(repeats, lambda: compute_basic_math(expression)) * 1e3:.3f}")
+        table.add_row(*row)
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
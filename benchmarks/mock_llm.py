@@ -0,0 +1,395 @@
+"""Local OpenAI-compatible stand-in for benchmarking the agent pipelines offline.
+
+Run with ``uv run python benchmarks/mock_llm.py --port 8765`` and point
+``OPENAI_API_BASE`` at ``http://127.0.0.1:8765/v1``. ``benchmarks/agent_pipelines.py``
+starts one automatically.
+
+Every ``/v1/chat/completions`` request waits ``--latency`` seconds (plus
+``--jitter``), then produces ``--tokens`` completion tokens at ``--token-rate``
+tokens per second, streamed or not. What it answers is decided by a script of
+rules (``DEFAULT_SCRIPT`` or a JSON file passed with ``--script``), tried in order:
+
+* ``{"tool": name, "args": {...}}`` calls ``name`` if the request offers that tool
+  and it has not been called since the last user message;
+* ``{"text": "..."}`` replies with that text;
+* ``"when"`` / ``"when_prompt"`` restrict a rule to requests whose system
+  instruction / latest user prompt contain the given text (case-insensitive).
+
+``{prompt}`` and ``{expression}`` (the arithmetic found in the prompt) are
+substituted in tool arguments and texts. When no rule matches, the reply is
+filler text. ``GET /stats`` returns request counts and simulated model time.
+
+To exercise retries and hedging, ``--error-rate`` answers that fraction of
+requests with ``429`` (and a ``Retry-After`` of ``--retry-after`` seconds),
+``--rpm`` rejects requests beyond that many per rolling minute the same way, and
+``--slow-rate`` adds ``--slow-latency`` seconds to that fraction of requests.
+``--fault-model`` (repeatable) limits those faults to requests for the given
+models, e.g. to make a primary model fail while its fallback stays healthy.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import typer
+
+DEFAULT_SCRIPT: list[dict[str, Any]] = [
+    # Math specialist (directly or inside the reasoning orchestrator's AgentTool).
+    {"tool": "compute_basic_math", "args": {"expression": "{expression}"}},
+    # Reasoning orchestrator: math tool, poem only when asked for, then hand off.
+    {"tool": "math_agent", "args": {"request": "{prompt}"}},
+    {"tool": "poetry_agent", "when_prompt": "poem", "args": {"request": "{prompt}"}},
+    {
+        "tool": "transfer_to_agent",
+        "when": "delegating the final answer",
+        "args": {"agent_name": "synthesizer_agent"},
+    },
+    # Intent classifier used by the parallel pipeline.
+    {"when": "yes or no", "when_prompt": "poem", "text": "yes"},
+    {"when": "yes or no", "text": "no"},
+    # OCR agent and its per-tile calls.
+    {"when": "Detected Text", "text": "Detected Text:\n{filler}\n\nNotes:\nNone"},
+    {"when": "horizontal strip", "text": "{filler}"},
+]
+
+_OTHER_AGENT_PREFIX = "For context:"
+_EXPRESSION_RE = re.compile(r"[\d(][\d\s.+\-*/()]*[\d)]")
+_FILLER_WORDS = "the result of the computation is shown below with every step".split()
+
+
+@dataclass(slots=True)
+class MockSettings:
+    """Timing model and reply script of the mock backend."""
+
+    latency: float = 0.05
+    jitter: float = 0.0
+    token_rate: float = 200.0
+    tokens: int = 32
+    script: list[dict[str, Any]] = field(default_factory=lambda: list(DEFAULT_SCRIPT))
+    seed: int = 0
+    error_rate: float = 0.0
+    retry_after: float = 1.0
+    rpm: int = 0
+    slow_rate: float = 0.0
+    slow_latency: float = 2.0
+    fault_models: tuple[str, ...] = ()
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tool_calls = 0
+        self.model_seconds = 0.0
+        self.rate_limited = 0
+        self.slow = 0
+        self.models: dict[str, int] = {}
+        self._recent: deque[float] = deque()
+
+    def admit(self, rpm: int) -> bool:
+        """Whether one more request fits in ``rpm`` requests per rolling minute."""
+        if not rpm:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and self._recent[0] <= now - 60:
+                self._recent.popleft()
+            if len(self._recent) >= rpm:
+                return False
+            self._recent.append(now)
+            return True
+
+    def record_fault(self, *, rate_limited: bool = False, slow: bool = False) -> None:
+        with self._lock:
+            self.rate_limited += int(rate_limited)
+            self.slow += int(slow)
+
+    def record(self, *, model: str, tool_call: bool, seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.models[model] = self.models.get(model, 0) + 1
+            self.tool_calls += int(tool_call)
+            self.model_seconds += seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "tool_calls": self.tool_calls,
+                "model_seconds": round(self.model_seconds, 4),
+                "rate_limited": self.rate_limited,
+                "slow": self.slow,
+                "models": dict(self.models),
+            }
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def _latest_prompt(messages: list[dict[str, Any]]) -> tuple[str, int]:
+    """Text and index of the latest message typed by the end user."""
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        text = _text(message.get("content")).strip()
+        if message.get("role") == "user" and not text.startswith(_OTHER_AGENT_PREFIX):
+            return text, index
+    return "", 0
+
+
+def _called_tools(messages: list[dict[str, Any]]) -> set[str]:
+    return {
+        call["function"]["name"]
+        for message in messages
+        for call in message.get("tool_calls") or []
+    }
+
+
+def _filler(tokens: int) -> str:
+    return " ".join(_FILLER_WORDS[index % len(_FILLER_WORDS)] for index in range(tokens))
+
+
+def plan_reply(body: dict[str, Any], settings: MockSettings) -> dict[str, Any]:
+    """Pick the scripted reply for one chat completion request.
+
+    Returns ``{"text": ...}`` or ``{"tool": ..., "args": ...}``.
+    """
+    messages = body.get("messages") or []
+    system = " ".join(_text(m.get("content")) for m in messages if m.get("role") == "system")
+    prompt, prompt_index = _latest_prompt(messages)
+    offered = {tool["function"]["name"] for tool in body.get("tools") or []}
+    called = _called_tools(messages[prompt_index:])
+    match = _EXPRESSION_RE.search(prompt)
+    values = {
+        "prompt": prompt,
+        "expression": match.group(0).strip() if match else "1 + 1",
+        "filler": _filler(settings.tokens),
+    }
+
+    def _fill(value: Any) -> Any:
+        if isinstance(value, str):
+            return value.format(**values)
+        if isinstance(value, dict):
+            return {key: _fill(item) for key, item in value.items()}
+        return value
+
+    for rule in settings.script:
+        if rule.get("when") and rule["when"].lower() not in system.lower():
+            continue
+        if rule.get("when_prompt") and rule["when_prompt"].lower() not in prompt.lower():
+            continue
+        if "tool" in rule:
+            if rule["tool"] in offered and rule["tool"] not in called:
+                return {"tool": rule["tool"], "args": _fill(rule.get("args", {}))}
+        elif "text" in rule:
+            return {"text": _fill(rule["text"])}
+    return {"text": values["filler"]}
+
+
+def _chunk(model: str, delta: dict[str, Any], finish: str | None = None) -> bytes:
+    payload = {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+    }
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+def make_handler(settings: MockSettings, stats: _Stats) -> type[BaseHTTPRequestHandler]:
+    rng = random.Random(settings.seed)
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            return
+
+        def _send(
+            self, status: int, payload: bytes, content_type: str, headers: dict[str, str] | None = None
+        ) -> None:
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path.rstrip("/").endswith("/stats"):
+                self._send(200, json.dumps(stats.snapshot()).encode(), "application/json")
+            else:
+                self._send(404, b"{}", "application/json")
+
+        def do_POST(self) -> None:  # noqa: N802
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, b"{}", "application/json")
+                return
+
+            model = body.get("model", "mock")
+            faulty = not settings.fault_models or model in settings.fault_models
+            if faulty and (rng.random() < settings.error_rate or not stats.admit(settings.rpm)):
+                stats.record_fault(rate_limited=True)
+                error = {"error": {"message": "Rate limit reached (mock).", "type": "rate_limit_exceeded"}}
+                self._send(
+                    429,
+                    json.dumps(error).encode(),
+                    "application/json",
+                    {"Retry-After": f"{settings.retry_after:g}"},
+                )
+                return
+
+            reply = plan_reply(body, settings)
+            prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+            completion_tokens = len(reply["text"].split()) if "text" in reply else 16
+            delay = settings.latency + rng.uniform(0, settings.jitter)
+            if faulty and rng.random() < settings.slow_rate:
+                stats.record_fault(slow=True)
+                delay += settings.slow_latency
+            generation = completion_tokens / settings.token_rate if settings.token_rate > 0 else 0.0
+            stats.record(model=model, tool_call="tool" in reply, seconds=delay + generation)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+
+            if "tool" in reply:
+                call = {
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": reply["tool"], "arguments": json.dumps(reply["args"])},
+                }
+                message: dict[str, Any] = {"role": "assistant", "content": None, "tool_calls": [call]}
+                finish = "tool_calls"
+            else:
+                message = {"role": "assistant", "content": reply["text"]}
+                finish = "stop"
+
+            time.sleep(delay)
+            if not body.get("stream"):
+                time.sleep(generation)
+                payload = {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+                    "usage": usage,
+                }
+                self._send(200, json.dumps(payload).encode(), "application/json")
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def _write(data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            if "tool" in reply:
+                call = dict(message["tool_calls"][0], index=0)
+                _write(_chunk(model, {"role": "assistant", "tool_calls": [call]}))
+                time.sleep(generation)
+            else:
+                words = reply["text"].split(" ")
+                for index, word in enumerate(words):
+                    delta = {"content": word if index == 0 else " " + word}
+                    if index == 0:
+                        delta["role"] = "assistant"
+                    _write(_chunk(model, delta))
+                    if settings.token_rate > 0:
+                        time.sleep(1 / settings.token_rate)
+            _write(_chunk(model, {}, finish))
+            _write(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+    return _Handler
+
+
+class MockLlmServer(ThreadingHTTPServer):
+    """Threaded mock server; ``stats`` counts every completion it served."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, settings: MockSettings) -> None:
+        self.stats = _Stats()
+        super().__init__((host, port), make_handler(settings, self.stats))
+
+    @property
+    def api_base(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def load_script(path: Path | None) -> list[dict[str, Any]]:
+    """Read a JSON list of rules, or return ``DEFAULT_SCRIPT``."""
+    if path is None:
+        return list(DEFAULT_SCRIPT)
+    script = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(script, list) or not all(isinstance(rule, dict) for rule in script):
+        raise typer.BadParameter(f"{path} must contain a JSON list of rule objects.")
+    return script
+
+
+def main(
+    host: str = typer.Option("127.0.0.1", "--host"),
+    port: int = typer.Option(8765, "--port", help="Port to listen on (0 picks a free one)."),
+    latency: float = typer.Option(0.05, "--latency", help="Seconds before the first token."),
+    jitter: float = typer.Option(0.0, "--jitter", help="Extra random latency, up to this many seconds."),
+    token_rate: float = typer.Option(200.0, "--token-rate", help="Completion tokens per second (0 = instant)."),
+    tokens: int = typer.Option(32, "--tokens", help="Length of filler replies, in tokens."),
+    script: Path | None = typer.Option(None, "--script", help="JSON file with reply rules."),
+    error_rate: float = typer.Option(0.0, "--error-rate", help="Fraction of requests answered with 429."),
+    retry_after: float = typer.Option(1.0, "--retry-after", help="Retry-After seconds sent with a 429."),
+    rpm: int = typer.Option(0, "--rpm", help="Requests per rolling minute before answering 429 (0 = no limit)."),
+    slow_rate: float = typer.Option(0.0, "--slow-rate", help="Fraction of requests that are slow."),
+    slow_latency: float = typer.Option(2.0, "--slow-latency", help="Extra seconds added to a slow request."),
+    fault_models: list[str] = typer.Option([], "--fault-model", help="Only inject faults for this model."),
+) -> None:
+    """Serve the mock backend until interrupted."""
+    settings = MockSettings(
+        latency=latency,
+        jitter=jitter,
+        token_rate=token_rate,
+        tokens=tokens,
+        script=load_script(script),
+        error_rate=error_rate,
+        retry_after=retry_after,
+        rpm=rpm,
+        slow_rate=slow_rate,
+        slow_latency=slow_latency,
+        fault_models=tuple(fault_models),
+    )
+    server = MockLlmServer(host, port, settings)
+    # The benchmark runner reads this line to learn the (possibly random) port.
+    print(server.api_base, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    typer.run(main)
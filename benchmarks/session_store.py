@@ -0,0 +1,154 @@
+"""Session store benchmark: event throughput and per-turn latency of the ADK session backends.
+
+Run with ``uv run python benchmarks/session_store.py``. Each backend replays
+the same workload without any LLM: ``--sessions`` concurrent conversations of
+``--turns`` turns each, where a turn loads the session (as ``Runner.run_async``
+does) and appends a user event plus ``--events`` agent events carrying a state
+change. Backends:
+
+* ``memory``: ADK's ``InMemorySessionService``;
+* ``memory-bounded``: ``BoundedSessionService`` with the ``SESSION_*`` limits;
+* ``sqlite``: ``SqliteSessionService`` with its default group commit;
+* ``sqlite-sync``: the same, committing on every append;
+* ``sqlite-nocache``: group commit, but every turn deserializes the whole history.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+app = typer.Typer(help="Benchmark the in-memory and SQLite session services.")
+console = Console()
+
+BACKENDS = ("memory", "memory-bounded", "sqlite", "sqlite-sync", "sqlite-nocache")
+
+
+def build_service(backend: str, path: Path):
+    from google.adk.sessions.in_memory_session_service import InMemorySessionService
+
+    from google_adk_test.session_cache import BoundedSessionService
+    from google_adk_test.storage import SqliteSessionService
+
+    if backend == "memory":
+        return InMemorySessionService()
+    if backend == "memory-bounded":
+        return BoundedSessionService()
+    if backend == "sqlite-sync":
+        return SqliteSessionService(path, flush_interval=0)
+    if backend == "sqlite-nocache":
+        return SqliteSessionService(path, max_cached_sessions=0)
+    return SqliteSessionService(path)
+
+
+async def run_workload(service, *, sessions: int, turns: int, events: int, text: str) -> dict:
+    """Drive ``sessions`` conversations concurrently; return throughput and turn latencies."""
+    from google.adk.events import Event, EventActions
+    from google.genai import types
+
+    latencies: list[float] = []
+
+    async def _conversation(index: int) -> None:
+        created = await service.create_session(app_name="bench", user_id="user", session_id=f"s{index}")
+        for turn in range(turns):
+            started = time.perf_counter()
+            session = await service.get_session(app_name="bench", user_id="user", session_id=created.id)
+            invocation = f"{created.id}-{turn}"
+            await service.append_event(
+                session,
+                Event(invocation_id=invocation, author="user", content=types.Content(role="user", parts=[types.Part(text=text)])),
+            )
+            for step in range(events):
+                await service.append_event(
+                    session,
+                    Event(
+                        invocation_id=invocation,
+                        author="agent",
+                        content=types.Content(role="model", parts=[types.Part(text=text)]),
+                        actions=EventActions(state_delta={"turn": turn, "step": step}),
+                    ),
+                )
+            latencies.append(time.perf_counter() - started)
+            # Yield like a real turn waiting on the model would.
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_conversation(index) for index in range(sessions)))
+    if hasattr(service, "flush"):
+        service.flush()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    written = sessions * turns * (events + 1)
+    result = {
+        "events": written,
+        "seconds": round(elapsed, 4),
+        "events_per_s": round(written / elapsed, 1),
+        "turn_p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "turn_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 3),
+    }
+    stats = service.stats() if hasattr(service, "stats") else {}
+    if "events_per_flush" in stats:
+        result["events_per_flush"] = round(stats["events_per_flush"], 1)
+    if "bytes" in stats:
+        result["held_mb"] = round(stats["bytes"] / 1024 / 1024, 2)
+        result["trimmed_events"] = stats["trimmed_events"]
+    return result
+
+
+@app.command()
+def main(
+    backends: str = typer.Option(",".join(BACKENDS), "--backends", help=f"Comma-separated: {', '.join(BACKENDS)}."),
+    sessions: int = typer.Option(32, "--sessions", "-s", min=1, help="Concurrent conversations."),
+    turns: int = typer.Option(20, "--turns", "-t", min=1, help="Turns per conversation."),
+    events: int = typer.Option(6, "--events", "-e", min=0, help="Agent events appended per turn."),
+    text_bytes: int = typer.Option(400, "--text-bytes", help="Text length of every event."),
+    output: Path | None = typer.Option(None, "--output", "-o", help="Also write the results as JSON."),
+) -> None:
+    """Compare events/s and turn latency across session backends."""
+    selected = [name.strip() for name in backends.split(",") if name.strip()]
+    unknown = sorted(set(selected) - set(BACKENDS))
+    if unknown:
+        raise typer.BadParameter(f"Unknown backends {unknown}; choose from {list(BACKENDS)}.")
+    text = ("lorem ipsum " * (text_bytes // 12 + 1))[:text_bytes]
+
+    table = Table(title=f"{sessions} sessions x {turns} turns x {events + 1} events")
+    table.add_column("backend", no_wrap=True)
+    for column in ("events/s", "turn p50 (ms)", "turn p95 (ms)", "events/commit", "held (MB)"):
+        table.add_column(column, justify="right")
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in selected:
+            service = build_service(backend, Path(directory) / f"{backend}.sqlite")
+            result = asyncio.run(
+                run_workload(service, sessions=sessions, turns=turns, events=events, text=text)
+            )
+            if hasattr(service, "close"):
+                service.close()
+            results[backend] = result
+            table.add_row(
+                backend,
+                f"{result['events_per_s']:.0f}",
+                f"{result['turn_p50_ms']:.2f}",
+                f"{result['turn_p95_ms']:.2f}",
+                f"{result['events_per_flush']:.0f}" if "events_per_flush" in result else "-",
+                f"{result['held_mb']:.1f}" if "held_mb" in result else "-",
+            )
+    console.print(table)
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    app()
@@ -1,11 +1,28 @@
-"""Utilities for building the Google ADK math demo."""
+"""Utilities for building the Google ADK math demo.
 
-from .registry import (
-    build_math_orchestrator,
-    build_reasoning_tool_orchestrator,
-    build_ocr_agent,
-)
-from .settings import OpenAIConfig
+Attributes are imported on first access, so ``import google_adk_test`` (or
+``from google_adk_test import OpenAIConfig``) does not load google-adk or LiteLLM.
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .registry import (
+        build_math_orchestrator,
+        build_ocr_agent,
+        build_reasoning_tool_orchestrator,
+    )
+    from .settings import OpenAIConfig
+
+_LAZY_ATTRIBUTES = {
+    "build_math_orchestrator": ".registry",
+    "build_reasoning_tool_orchestrator": ".registry",
+    "build_ocr_agent": ".registry",
+    "OpenAIConfig": ".settings",
+}
 
 __all__ = [
     "build_math_orchestrator",
@@ -13,3 +30,16 @@ __all__ = [
     "build_ocr_agent",
     "OpenAIConfig",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
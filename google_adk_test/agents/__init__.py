@@ -1,14 +1,54 @@
-"""Factory helpers for specialised agents."""
-
-from google_adk_test.agents.math import build_math_agent
-from google_adk_test.agents.orchestrator import build_orchestrator
-from google_adk_test.agents.poetry import build_poetry_agent
-from google_adk_test.agents.ocr import build_ocr_specialist
-from google_adk_test.agents.synthesizer import build_synthesizer_agent
-from google_adk_test.agents.tool_wrappers import (
-    build_math_tool_agent,
-    build_poetry_tool_agent,
-)
+"""Factory helpers for specialised agents.
+
+Attributes are imported on first access, so importing one helper does not
+load every agent module.
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .context import context_pruner, make_context_pruner, prune_contents
+    from .fast_path import fast_path_enabled, fast_path_stats
+    from .handoff import (
+        MATH_RESULT_STATE_KEY,
+        MathResult,
+        handoff_enabled,
+        template_synthesizer_enabled,
+    )
+    from .intent import build_intent_classifier, creativity_gate_callback, wants_creativity
+    from .math import build_math_agent
+    from .orchestrator import build_orchestrator, pipeline_mode_from_env
+    from .poetry import build_poetry_agent
+    from .ocr import build_ocr_specialist
+    from .synthesizer import build_synthesizer_agent
+    from .tool_wrappers import PooledAgentTool, build_math_tool_agent, build_poetry_tool_agent
+
+_LAZY_ATTRIBUTES = {
+    "context_pruner": ".context",
+    "make_context_pruner": ".context",
+    "prune_contents": ".context",
+    "fast_path_enabled": ".fast_path",
+    "fast_path_stats": ".fast_path",
+    "MATH_RESULT_STATE_KEY": ".handoff",
+    "MathResult": ".handoff",
+    "handoff_enabled": ".handoff",
+    "template_synthesizer_enabled": ".handoff",
+    "build_intent_classifier": ".intent",
+    "creativity_gate_callback": ".intent",
+    "wants_creativity": ".intent",
+    "build_math_agent": ".math",
+    "build_orchestrator": ".orchestrator",
+    "pipeline_mode_from_env": ".orchestrator",
+    "build_poetry_agent": ".poetry",
+    "build_ocr_specialist": ".ocr",
+    "build_synthesizer_agent": ".synthesizer",
+    "build_math_tool_agent": ".tool_wrappers",
+    "build_poetry_tool_agent": ".tool_wrappers",
+    "PooledAgentTool": ".tool_wrappers",
+}
 
 __all__ = [
     "build_math_agent",
@@ -17,5 +57,32 @@ __all__ = [
     "build_synthesizer_agent",
     "build_math_tool_agent",
     "build_poetry_tool_agent",
+    "PooledAgentTool",
     "build_orchestrator",
+    "fast_path_enabled",
+    "fast_path_stats",
+    "build_intent_classifier",
+    "creativity_gate_callback",
+    "wants_creativity",
+    "pipeline_mode_from_env",
+    "context_pruner",
+    "make_context_pruner",
+    "prune_contents",
+    "MATH_RESULT_STATE_KEY",
+    "MathResult",
+    "handoff_enabled",
+    "template_synthesizer_enabled",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
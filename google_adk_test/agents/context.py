@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Awaitable, Callable, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from loguru import logger
+
+from google_adk_test.events import content_text
+
+# Rough OpenAI cost of one high-detail image; exact sizes are not known here.
+IMAGE_TOKENS = 765
+# ADK replays other agents' turns as user messages starting with this prefix.
+_OTHER_AGENT_PREFIX = "For context:"
+_SUMMARY_MAX_TOKENS = 200
+_SUMMARY_SNIPPET_CHARS = 80
+
+ContextPruner = Callable[[CallbackContext, LlmRequest], Awaitable[Optional[LlmResponse]]]
+
+
+def context_pruning_enabled() -> bool:
+    """Whether ``CONTEXT_PRUNING`` (default on) allows agents to prune their history."""
+    return os.getenv("CONTEXT_PRUNING", "true").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def estimate_part_tokens(part: types.Part) -> int:
+    """Cheap token estimate (~4 characters per token) for one content part."""
+    if part.text:
+        return len(part.text) // 4 + 1
+    if part.inline_data or part.file_data:
+        return IMAGE_TOKENS
+    if part.function_call:
+        return len(json.dumps(part.function_call.args or {}, default=str)) // 4 + 8
+    if part.function_response:
+        return len(json.dumps(part.function_response.response or {}, default=str)) // 4 + 8
+    return 1
+
+
+def estimate_tokens(contents: list[types.Content]) -> int:
+    """Estimated prompt tokens for ``contents``, including per-message overhead."""
+    return sum(
+        4 + sum(estimate_part_tokens(part) for part in content.parts or [])
+        for content in contents
+    )
+
+
+def _is_user_turn(content: types.Content) -> bool:
+    """True for a message the end user typed (not a tool result or another agent's reply)."""
+    if content.role != "user" or not content.parts:
+        return False
+    if any(part.function_response for part in content.parts):
+        return False
+    return not content_text(content).strip().startswith(_OTHER_AGENT_PREFIX)
+
+
+def _strip_images(content: types.Content) -> types.Content:
+    if not any(part.inline_data or part.file_data for part in content.parts or []):
+        return content
+    return types.Content(
+        role=content.role,
+        parts=[
+            types.Part(text="[image omitted]") if part.inline_data or part.file_data else part
+            for part in content.parts
+        ],
+    )
+
+
+def _summarize_dropped(turns: list[list[types.Content]], budget: int) -> types.Content:
+    text = f"[{len(turns)} earlier turn(s) omitted to fit the context budget.]"
+    requests: list[str] = []
+    remaining = min(budget, _SUMMARY_MAX_TOKENS) * 4 - len(text)
+    for turn in reversed(turns):
+        snippet = " ".join(content_text(turn[0]).split())[:_SUMMARY_SNIPPET_CHARS]
+        if not snippet or len(snippet) + 4 > remaining:
+            break
+        requests.append(f'"{snippet}"')
+        remaining -= len(snippet) + 4
+    if requests:
+        text += " Most recent earlier requests: " + "; ".join(requests) + "."
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def prune_contents(
+    contents: list[types.Content], budget: int, *, keep_images: bool = False
+) -> list[types.Content]:
+    """Fit ``contents`` into ``budget`` tokens without touching the current turn.
+
+    Everything from the latest end-user message onwards is kept verbatim.
+    Older history is dropped a whole turn at a time (oldest first, so tool
+    calls stay paired with their results) and replaced by a short note that
+    quotes the dropped requests. Unless ``keep_images`` is set, images in
+    older turns are replaced by a placeholder.
+    """
+    start = next(
+        (index for index in range(len(contents) - 1, -1, -1) if _is_user_turn(contents[index])),
+        0,
+    )
+    current = contents[start:]
+    older = contents[:start]
+    if not keep_images:
+        older = [_strip_images(content) for content in older]
+
+    turns: list[list[types.Content]] = []
+    for content in older:
+        if _is_user_turn(content) or not turns:
+            turns.append([content])
+        else:
+            turns[-1].append(content)
+
+    remaining = budget - estimate_tokens(current)
+    kept: list[list[types.Content]] = []
+    for turn in reversed(turns):
+        cost = estimate_tokens(turn)
+        if cost > remaining:
+            break
+        kept.append(turn)
+        remaining -= cost
+    kept.reverse()
+    dropped = turns[: len(turns) - len(kept)]
+
+    pruned: list[types.Content] = []
+    if dropped:
+        pruned.append(_summarize_dropped(dropped, max(remaining, 0)))
+    for turn in kept:
+        pruned.extend(turn)
+    pruned.extend(current)
+    return pruned
+
+
+def make_context_pruner(budget: int, *, keep_images: bool = False) -> ContextPruner:
+    """Build a ``before_model_callback`` that keeps each request within ``budget`` tokens.
+
+    The system instruction lives in the request config and is never pruned.
+    """
+
+    async def _prune_context(
+        callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        before = estimate_tokens(llm_request.contents)
+        llm_request.contents = prune_contents(
+            llm_request.contents, budget, keep_images=keep_images
+        )
+        after = estimate_tokens(llm_request.contents)
+        logger.debug(
+            "Context for {}: ~{} -> ~{} tokens (budget {})",
+            callback_context.agent_name,
+            before,
+            after,
+            budget,
+        )
+        return None
+
+    return _prune_context
+
+
+def context_pruner(budget: int | None, *, keep_images: bool = False) -> ContextPruner | None:
+    """Return a pruner for ``budget``, or ``None`` when pruning is off for this agent."""
+    if budget is None or not context_pruning_enabled():
+        return None
+    return make_context_pruner(budget, keep_images=keep_images)
+
+
+def combine_callbacks(*callbacks: Any) -> list[Any] | None:
+    """Drop disabled (``None``) callbacks; ADK runs a list of callbacks in order."""
+    active = [callback for callback in callbacks if callback is not None]
+    return active or None
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+from loguru import logger
+
+from google_adk_test.events import content_text
+from google_adk_test.tools import MathToolError, compute_basic_math
+
+# A prompt qualifies only if, after an optional lead-in such as "what is" and
+# trailing punctuation, it consists solely of arithmetic characters.
+_PLAIN_EXPRESSION_RE = re.compile(
+    r"^\s*(?:(?:what\s+is|what's|compute|calculate|evaluate)\s*:?\s*)?"
+    r"(?P<expression>[-+*/().\d\s_eE]*\d[-+*/().\d\s_eE]*?)"
+    r"\s*[=?.!]*\s*$",
+    re.IGNORECASE,
+)
+
+
+def fast_path_enabled() -> bool:
+    """Whether ``MATH_FAST_PATH`` opts the math pipeline into the fast path."""
+    return os.getenv("MATH_FAST_PATH", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+@dataclass
+class FastPathStats:
+    """Running counters for fast-path decisions."""
+
+    checks: int = 0
+    hits: int = 0
+    hit_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, *, hit: bool, seconds: float = 0.0) -> None:
+        with self._lock:
+            self.checks += 1
+            if hit:
+                self.hits += 1
+                self.hit_seconds += seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "checks": self.checks,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.checks if self.checks else 0.0,
+                "avg_hit_ms": self.hit_seconds / self.hits * 1e3 if self.hits else 0.0,
+            }
+
+
+fast_path_stats = FastPathStats()
+
+
+def extract_plain_expression(prompt: str) -> str | None:
+    """Return the arithmetic expression if ``prompt`` is nothing more than one."""
+    match = _PLAIN_EXPRESSION_RE.match(prompt)
+    if match is None:
+        return None
+    return match.group("expression").strip() or None
+
+
+def render_fast_path_answer(result: dict[str, Any]) -> str:
+    """Template the final answer the synthesizer would otherwise write."""
+    steps = "\n".join(
+        f"  {number}. {step}" for number, step in enumerate(result["steps"], start=1)
+    )
+    omitted = result.get("steps_omitted", 0)
+    if omitted:
+        steps += f"\n  … {omitted} more steps"
+    last_steps = result.get("last_steps", [])
+    if last_steps:
+        first = len(result["steps"]) + omitted + 1
+        steps += "\n" + "\n".join(
+            f"  {number}. {step}" for number, step in enumerate(last_steps, start=first)
+        )
+    return (
+        f"{result['expression']} = {result['result']}\n\n"
+        f"Steps:\n{steps}\n\n"
+        f"Operations performed: {result['operations_count']}. "
+        "No poem was requested."
+    )
+
+
+async def math_fast_path_callback(
+    callback_context: CallbackContext,
+) -> Optional[types.Content]:
+    """Answer plain arithmetic prompts locally and skip every LLM in the pipeline."""
+    started = time.perf_counter()
+    expression = extract_plain_expression(content_text(callback_context.user_content))
+    if expression is None:
+        fast_path_stats.record(hit=False)
+        return None
+
+    try:
+        result = compute_basic_math(expression, summarize_steps=True)
+    except MathToolError:
+        # Let the LLM pipeline explain invalid input in plain language.
+        fast_path_stats.record(hit=False)
+        return None
+
+    answer = render_fast_path_answer(result)
+    elapsed = time.perf_counter() - started
+    fast_path_stats.record(hit=True, seconds=elapsed)
+    logger.info(
+        "Math fast path answered '{}' in {:.2f} ms ({})",
+        expression,
+        elapsed * 1e3,
+        fast_path_stats.snapshot(),
+    )
+    return types.Content(role="model", parts=[types.Part(text=answer)])
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Optional, TypedDict
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+from loguru import logger
+
+from google_adk_test.agents.fast_path import render_fast_path_answer
+from google_adk_test.events import content_text
+
+MATH_RESULT_STATE_KEY = "math_result"
+MATH_REPLY_STATE_KEY = "math_reply"
+POEM_STATE_KEY = "poem"
+# Set by the creativity gate: ``False`` when it skipped the poetry agent.
+POEM_REQUESTED_STATE_KEY = "poem_requested"
+HANDOFF_STATE_KEYS = (
+    MATH_RESULT_STATE_KEY,
+    MATH_REPLY_STATE_KEY,
+    POEM_STATE_KEY,
+    POEM_REQUESTED_STATE_KEY,
+)
+
+# Long traces are summarised in state; the tool response itself keeps every step.
+MAX_HANDOFF_STEPS = 20
+
+
+class MathResult(TypedDict, total=False):
+    """Shape of ``state["math_result"]``: the math tool's result, with capped steps."""
+
+    expression: str
+    result: float
+    operations_count: int
+    steps: list[str]
+    steps_omitted: int
+    last_steps: list[str]
+
+
+def handoff_enabled() -> bool:
+    """Whether ``MATH_STATE_HANDOFF`` (default off) passes results through state."""
+    raw = os.getenv("MATH_STATE_HANDOFF", "").strip().lower()
+    return raw in {"1", "true", "yes", "on"}
+
+
+def template_synthesizer_enabled() -> bool:
+    """Whether ``MATH_TEMPLATE_SYNTHESIZER`` lets a template replace the synthesizer LLM."""
+    raw = os.getenv("MATH_TEMPLATE_SYNTHESIZER", "").strip().lower()
+    return raw in {"1", "true", "yes", "on"}
+
+
+def compact_math_result(tool_response: dict[str, Any]) -> MathResult:
+    steps = list(tool_response.get("steps", []))
+    omitted = tool_response.get("steps_omitted", 0) + max(len(steps) - MAX_HANDOFF_STEPS, 0)
+    result = MathResult(
+        expression=tool_response["expression"],
+        result=tool_response["result"],
+        operations_count=tool_response["operations_count"],
+        steps=steps[:MAX_HANDOFF_STEPS],
+    )
+    if omitted:
+        result["steps_omitted"] = omitted
+    if tool_response.get("last_steps"):
+        result["last_steps"] = list(tool_response["last_steps"])
+    return result
+
+
+def has_poem(state: Any) -> bool:
+    """True unless the creativity gate skipped the poetry agent or no poem was stored.
+
+    Without a gate (the sequential pipeline) the poetry agent's reply counts
+    as a poem, even if it declines in prose.
+    """
+    return state.get(POEM_REQUESTED_STATE_KEY) is not False and bool(state.get(POEM_STATE_KEY))
+
+
+async def reset_handoff_state(callback_context: CallbackContext) -> None:
+    """Clear the previous turn's hand-off values before the pipeline runs."""
+    for key in HANDOFF_STATE_KEYS:
+        if callback_context.state.get(key) is not None:
+            callback_context.state[key] = None
+    return None
+
+
+def store_math_result(
+    tool: BaseTool,
+    args: dict[str, Any],
+    tool_context: ToolContext,
+    tool_response: Any,
+) -> Optional[dict[str, Any]]:
+    """``after_tool_callback`` that writes the math result into state.
+
+    The agent's follow-up narration is skipped: downstream agents read the
+    structured result from state, so that LLM call would only repeat it.
+    """
+    if tool.name != "compute_basic_math" or not isinstance(tool_response, dict):
+        return None
+    if "result" not in tool_response:
+        return None
+    tool_context.state[MATH_RESULT_STATE_KEY] = compact_math_result(tool_response)
+    tool_context.actions.skip_summarization = True
+    return None
+
+
+def handoff_view(context: ReadonlyContext, keys: tuple[str, ...]) -> str:
+    """Compact JSON of the user's request plus the requested state keys."""
+    view: dict[str, Any] = {"request": content_text(context.user_content)}
+    for key in keys:
+        value = context.state.get(key)
+        if value not in (None, ""):
+            view[key] = value
+    return json.dumps(view, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def with_handoff_view(instruction: str, keys: tuple[str, ...]):
+    """Instruction provider that appends the hand-off JSON to ``instruction``."""
+
+    def _provider(context: ReadonlyContext) -> str:
+        return (
+            f"{instruction}\n\n"
+            "Use this pipeline state (JSON) instead of earlier conversation turns:\n"
+            f"{handoff_view(context, keys)}"
+        )
+
+    return _provider
+
+
+async def template_synthesizer_callback(
+    callback_context: CallbackContext,
+) -> Optional[types.Content]:
+    """Answer from a template instead of the synthesizer LLM when no poem was produced."""
+    result = callback_context.state.get(MATH_RESULT_STATE_KEY)
+    if not result or has_poem(callback_context.state):
+        return None
+    logger.debug("Synthesizer answered from template for '{}'", result["expression"])
+    return types.Content(role="model", parts=[types.Part(text=render_fast_path_answer(result))])
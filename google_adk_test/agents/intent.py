@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import re
+from textwrap import dedent
+from typing import Optional
+
+from google.adk import Agent
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+from loguru import logger
+
+from google_adk_test.agents.context import context_pruner
+from google_adk_test.agents.handoff import POEM_REQUESTED_STATE_KEY
+from google_adk_test.events import content_text
+from google_adk_test.llm_cache import build_llm
+from google_adk_test.scheduling import Priority
+from google_adk_test.settings import OpenAIConfig
+from google_adk_test.telemetry import instrument_agent
+
+CREATIVITY_STATE_KEY = "creativity_requested"
+
+_CREATIVITY_RE = re.compile(
+    r"\b(?:poem|poetry|poetic|verse|rhym|haiku|limerick|sonnet|ode|song|lyric"
+    r"|creativ|celebrat|whimsical|story)\w*",
+    re.IGNORECASE,
+)
+
+
+def wants_creativity(prompt: str) -> bool:
+    """Cheap rule-based check for an explicit request for verse or celebration."""
+    return _CREATIVITY_RE.search(prompt) is not None
+
+
+async def creativity_gate_callback(
+    callback_context: CallbackContext,
+) -> Optional[types.Content]:
+    """Skip the poetry agent's LLM call when no creativity was requested.
+
+    Uses the intent classifier's yes/no verdict from session state when one
+    was produced this turn, otherwise falls back to :func:`wants_creativity`.
+    """
+    verdict = str(callback_context.state.get(CREATIVITY_STATE_KEY) or "").strip().lower()
+    if verdict.startswith(("yes", "no")):
+        requested = verdict.startswith("yes")
+    else:
+        requested = wants_creativity(content_text(callback_context.user_content))
+    callback_context.state[POEM_REQUESTED_STATE_KEY] = requested
+    if requested:
+        return None
+
+    logger.debug("Skipping poetry agent: no creativity requested.")
+    return types.Content(role="model", parts=[types.Part(text="No poem was requested.")])
+
+
+async def _prefilter_verdict(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Answer "no" without an LLM call when the prompt has no creative cue at all.
+
+    The classifier only has to weed out false positives of :func:`wants_creativity`
+    (e.g. a "story problem"), so the common non-creative path costs no extra call.
+    """
+    if wants_creativity(content_text(callback_context.user_content)):
+        # Drop the previous turn's verdict so a failed classification falls back to rules.
+        callback_context.state[CREATIVITY_STATE_KEY] = None
+        return None
+    callback_context.state[CREATIVITY_STATE_KEY] = "no"
+    return types.Content(role="model", parts=[types.Part(text="no")])
+
+
+def build_intent_classifier(
+    config: OpenAIConfig, *, cache: bool = True, context_budget: int | None = 500
+) -> Agent:
+    """Small yes/no classifier that runs alongside the math agent.
+
+    It is skipped, with a "no" verdict, unless the rule-based check sees a
+    creative cue in the prompt.
+    """
+    agent = Agent(
+        name="intent_classifier",
+        description="Decides whether the user asked for a poem or other creative flourish.",
+        instruction=dedent(
+            """
+            Decide whether the latest user message explicitly asks for creativity: a poem, verse, rhyme, song, story, or a celebration of the result.
+            Reply with exactly one word: yes or no.
+            """
+        ).strip(),
+        model=build_llm(
+            config,
+            agent="intent_classifier",
+            cache=cache,
+            priority=Priority.HIGH,
+            temperature=0.0,
+            max_tokens=2,
+        ),
+        output_key=CREATIVITY_STATE_KEY,
+        before_agent_callback=_prefilter_verdict,
+        before_model_callback=context_pruner(context_budget),
+        disallow_transfer_to_parent=True,
+        disallow_transfer_to_peers=True,
+    )
+    return instrument_agent(agent)
@@ -3,18 +3,33 @@ from __future__ import annotations
 from textwrap import dedent
 
 from google.adk import Agent
-from google.adk.models.lite_llm import LiteLlm
 from google.adk.tools.function_tool import FunctionTool
 
+from google_adk_test.agents.context import context_pruner
+from google_adk_test.agents.handoff import MATH_REPLY_STATE_KEY, store_math_result
+from google_adk_test.llm_cache import build_llm
 from google_adk_test.settings import OpenAIConfig
-from google_adk_test.tools import compute_basic_math
+from google_adk_test.telemetry import instrument_agent
+from google_adk_test.tools import compute_basic_math, compute_batch_math
 
 
-def build_math_agent(config: OpenAIConfig) -> Agent:
-    """Factory for the reusable math specialist."""
-    llm_kwargs = {"temperature": config.temperature}
+def build_math_agent(
+    config: OpenAIConfig,
+    *,
+    cache: bool = True,
+    context_budget: int | None = 4000,
+    handoff: bool = False,
+) -> Agent:
+    """Factory for the reusable math specialist.
 
-    return Agent(
+    ``cache`` serves repeated requests from the shared LLM response cache;
+    ``context_budget`` caps the conversation tokens sent per call (``None`` = no cap).
+    With ``handoff`` the tool result is written to ``state["math_result"]`` and
+    the agent ends its turn without narrating it; keep it off when the agent's
+    text reply is consumed directly (a plain ``AgentTool``; ``PooledAgentTool``
+    with ``structured_result`` returns the tool result instead).
+    """
+    agent = Agent(
         name="math_agent",
         description=(
             "Solves arithmetic expressions (add, subtract, multiply, divide) "
@@ -25,13 +40,18 @@ def build_math_agent(config: OpenAIConfig) -> Agent:
             You are a meticulous math specialist.
             - Carefully rewrite the user request as an arithmetic expression using only +, -, *, /, numbers, and parentheses.
             - You MUST call the tool `compute_basic_math(expression=<expression>)` exactly once for every math request. Do not attempt to answer until the tool returns.
+            - When the same formula must be applied to many rows of values (inline lists or a CSV/JSONL file), instead call `compute_batch_math` once with the formula written using the variable names, then report its `summary` and any per-row `errors`.
             - After the tool responds, summarize the normalized expression, walk through each item in `steps`, and present the final result with the `operations_count`. Explicitly address the orchestrator so it can continue the workflow. Make it clear that you are not addressing the end user.
             - If the request cannot be satisfied with the supported operations, explain the limitation.
             - When you are done, explicitly say "math agent complete" so the orchestrator knows you have finished.
             """
         ).strip(),
-        tools=[FunctionTool(compute_basic_math)],
-        model=LiteLlm(model=config.model, **llm_kwargs),
+        tools=[FunctionTool(compute_basic_math), FunctionTool(compute_batch_math)],
+        model=build_llm(config, agent="math_agent", cache=cache, temperature=config.temperature),
         disallow_transfer_to_parent=False,
         disallow_transfer_to_peers=True,
+        before_model_callback=context_pruner(context_budget),
+        after_tool_callback=store_math_result if handoff else None,
+        output_key=MATH_REPLY_STATE_KEY if handoff else None,
     )
+    return instrument_agent(agent)
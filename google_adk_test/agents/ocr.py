@@ -1,71 +1,243 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 from textwrap import dedent
+from typing import Any, Optional
 
 from google.adk import Agent
-from google.adk.models.lite_llm import LiteLlm
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
 from google.genai import types
+from loguru import logger
+from PIL import Image
 
+from google_adk_test.agents.context import combine_callbacks, context_pruner
+from google_adk_test.imaging import (
+    ImageSettings,
+    PreparedImage,
+    prepare_image,
+    stitch_tiles,
+    warm_image_pool,
+)
+from google_adk_test.llm_cache import build_llm
 from google_adk_test.settings import OpenAIConfig
+from google_adk_test.telemetry import instrument_agent
 
+# Only {"sha256", "mime_type"} (or {"file_uri", "mime_type"}) references live in
+# state; the bytes are stored once as artifacts.
+OCR_IMAGES_STATE_KEY = "ocr_latest_images"
 
-def build_ocr_specialist(config: OpenAIConfig) -> Agent:
-    """Factory for the OCR transcription agent."""
-    llm_kwargs = {"temperature": config.temperature}
-
-    state_key = "ocr_latest_image_parts"
-
-    def _extract_image_parts(contents: list[types.Content]) -> list[types.Part]:
-        images: list[types.Part] = []
-        for content in contents:
-            for part in content.parts:
-                if part.inline_data and (
-                    not part.inline_data.mime_type
-                    or part.inline_data.mime_type.startswith("image")
-                ):
-                    images.append(part)
-                elif part.file_data and (
-                    not part.file_data.mime_type
-                    or part.file_data.mime_type.startswith("image")
-                ):
-                    images.append(part)
-        return images
-
-    async def _before_model_callback(ctx, llm_request):
-        image_parts = _extract_image_parts(llm_request.contents)
-
-        if image_parts:
-            ctx.state[state_key] = [
-                part.model_dump(mode="json") for part in image_parts
-            ]
-            return None
+_TILE_INSTRUCTION = (
+    "You transcribe one horizontal strip of a larger document. Reply with only the "
+    "verbatim text visible in the strip, preserving line breaks. Do not add commentary."
+)
 
-        stored_parts = ctx.state.get(state_key)
-        if not stored_parts:
-            return None
 
-        # Ensure we only append if the request currently lacks image data.
-        if _extract_image_parts(llm_request.contents):
-            return None
+def image_artifact_name(digest: str) -> str:
+    """Artifact filename for an image with the given SHA-256 digest.
 
-        restored = [types.Part.model_validate(blob) for blob in stored_parts]
-        if not restored:
-            return None
+    The ``user:`` prefix scopes it to the user, so re-uploading the same image
+    in any of their sessions reuses the stored copy.
+    """
+    return f"user:ocr-image-{digest}"
+
+
+def _is_image(mime_type: str | None) -> bool:
+    return not mime_type or mime_type.startswith("image")
+
+
+def _extract_image_parts(contents: list[types.Content]) -> list[types.Part]:
+    images: list[types.Part] = []
+    for content in contents:
+        for part in content.parts or []:
+            if part.inline_data and _is_image(part.inline_data.mime_type):
+                images.append(part)
+            elif part.file_data and _is_image(part.file_data.mime_type):
+                images.append(part)
+    return images
+
+
+async def _remember_image(
+    callback_context: CallbackContext, part: types.Part, known: set[str]
+) -> dict[str, Any]:
+    if part.file_data:
+        return {"file_uri": part.file_data.file_uri, "mime_type": part.file_data.mime_type}
+
+    blob = part.inline_data
+    digest = hashlib.sha256(blob.data or b"").hexdigest()
+    filename = image_artifact_name(digest)
+    if filename not in known:
+        await callback_context.save_artifact(
+            filename, types.Part(inline_data=types.Blob(data=blob.data, mime_type=blob.mime_type))
+        )
+        known.add(filename)
+    return {"sha256": digest, "mime_type": blob.mime_type}
+
+
+async def _load_image(callback_context: CallbackContext, ref: dict[str, Any]) -> types.Part | None:
+    if "file_uri" in ref:
+        return types.Part(
+            file_data=types.FileData(file_uri=ref["file_uri"], mime_type=ref["mime_type"])
+        )
+    part = await callback_context.load_artifact(image_artifact_name(ref["sha256"]))
+    if part is None:
+        logger.warning("OCR image {} is no longer in the artifact store.", ref["sha256"][:12])
+    return part
+
+
+async def _remember_or_restore_images(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> bool:
+    """Record image references in state, or re-attach them; True if restored."""
+    image_parts = _extract_image_parts(llm_request.contents)
+
+    if image_parts:
+        try:
+            known = set(await callback_context.list_artifacts())
+            refs: list[dict[str, Any]] = []
+            for part in image_parts:
+                ref = await _remember_image(callback_context, part, known)
+                if ref not in refs:
+                    refs.append(ref)
+        except ValueError:
+            logger.debug("No artifact service configured; OCR images will not be remembered.")
+            return False
+        # Skip the state delta when the same images are already referenced.
+        if callback_context.state.get(OCR_IMAGES_STATE_KEY) != refs:
+            callback_context.state[OCR_IMAGES_STATE_KEY] = refs
+        return False
 
-        llm_request.contents.append(
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_text(
-                        "Image previously uploaded for OCR transcription."
-                    ),
-                    *restored,
-                ],
+    refs = callback_context.state.get(OCR_IMAGES_STATE_KEY)
+    if not refs:
+        return False
+
+    # Bytes are only loaded here, when a follow-up turn needs the earlier image.
+    restored = [part for part in [await _load_image(callback_context, ref) for ref in refs] if part]
+    if not restored:
+        return False
+
+    llm_request.contents.append(
+        types.Content(
+            role="user",
+            parts=[
+                types.Part.from_text(text="Image previously uploaded for OCR transcription."),
+                *restored,
+            ],
+        )
+    )
+    return True
+
+
+async def _preprocess_images(
+    llm_request: LlmRequest, settings: ImageSettings, *, allow_tiling: bool
+) -> PreparedImage | None:
+    """Swap every inline image for its preprocessed copy.
+
+    Returns the prepared image to tile when the newest user message carries an
+    image that was split into more than one strip.
+    """
+    contents: list[types.Content] = []
+    tiled: PreparedImage | None = None
+    last = len(llm_request.contents) - 1
+    for index, content in enumerate(llm_request.contents):
+        parts: list[types.Part] = []
+        for part in content.parts or []:
+            blob = part.inline_data
+            if not blob or not blob.data or not _is_image(blob.mime_type):
+                parts.append(part)
+                continue
+            digest = hashlib.sha256(blob.data).hexdigest()
+            try:
+                prepared = await prepare_image(blob.data, settings, digest=digest)
+            except (OSError, Image.DecompressionBombError) as exc:
+                logger.warning("Sending OCR image {} unprocessed: {}", digest[:12], exc)
+                parts.append(part)
+                continue
+            parts.append(
+                types.Part(inline_data=types.Blob(data=prepared.data, mime_type=prepared.mime_type))
             )
+            if allow_tiling and index == last and content.role == "user" and prepared.tiles:
+                tiled = prepared
+        # Build new Content objects so the session's own events stay untouched.
+        contents.append(types.Content(role=content.role, parts=parts))
+    llm_request.contents = contents
+    return tiled
+
+
+async def _transcribe_tiles(
+    model: BaseLlm, llm_request: LlmRequest, prepared: PreparedImage
+) -> LlmResponse:
+    async def _transcribe(tile: bytes) -> str:
+        request = LlmRequest(
+            model=llm_request.model or model.model,
+            config=types.GenerateContentConfig(system_instruction=_TILE_INSTRUCTION),
+            contents=[
+                types.Content(
+                    role="user",
+                    parts=[
+                        types.Part.from_text(text="Transcribe this strip."),
+                        types.Part(inline_data=types.Blob(data=tile, mime_type="image/jpeg")),
+                    ],
+                )
+            ],
         )
-        return None
+        text = ""
+        async for response in model.generate_content_async(request):
+            if response.error_code:
+                raise RuntimeError(response.error_message or response.error_code)
+            if response.content and response.content.parts:
+                text = "".join(part.text for part in response.content.parts if part.text)
+        return text
+
+    texts = await asyncio.gather(*(_transcribe(tile) for tile in prepared.tiles))
+    width = prepared.tile_sizes[0][0]
+    answer = (
+        f"Detected Text:\n{stitch_tiles(texts)}\n\n"
+        f"Notes:\nTranscribed from {len(texts)} overlapping strips of a {width}px wide image; "
+        "lines cut by a strip boundary may be incomplete."
+    )
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=answer)]))
+
+
+def build_ocr_specialist(
+    config: OpenAIConfig,
+    *,
+    cache: bool = True,
+    image_settings: ImageSettings | None = None,
+    context_budget: int | None = 8000,
+) -> Agent:
+    """Factory for the OCR transcription agent.
+
+    ``cache`` serves repeated requests (same image and prompt) from the shared
+    LLM response cache. Images are downscaled and re-encoded according to
+    ``image_settings`` (default: ``ImageSettings.from_env()``); tall uploads
+    can be split into strips that are transcribed concurrently.
+
+    ``context_budget`` caps the conversation tokens sent per call. Images in
+    older turns are pruned too; the latest one is re-attached from the
+    artifact store when the current turn has none.
+    """
+    settings = image_settings or ImageSettings.from_env()
+    warm_image_pool(settings)
+    model = build_llm(config, agent="ocr_agent", cache=cache, temperature=config.temperature)
+
+    async def _before_model_callback(
+        callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        restored = await _remember_or_restore_images(callback_context, llm_request)
+        tiled = await _preprocess_images(llm_request, settings, allow_tiling=not restored)
+        if tiled is None:
+            return None
+        try:
+            return await _transcribe_tiles(model, llm_request, tiled)
+        except Exception as exc:  # pragma: no cover - network failures
+            logger.warning("Tiled OCR failed ({}); sending the whole image instead.", exc)
+            return None
 
-    return Agent(
+    agent = Agent(
         name="ocr_agent",
         description="Extracts textual content from uploaded images using the configured OpenAI model.",
         instruction=dedent(
@@ -83,8 +255,11 @@ def build_ocr_specialist(config: OpenAIConfig) -> Agent:
             - Never invent text you cannot clearly see. If a region is unreadable, note that explicitly instead of guessing.
             """
         ).strip(),
-        model=LiteLlm(model=config.model, **llm_kwargs),
+        model=model,
         disallow_transfer_to_parent=False,
         disallow_transfer_to_peers=True,
-        before_model_callback=_before_model_callback,
+        before_model_callback=combine_callbacks(
+            context_pruner(context_budget), _before_model_callback
+        ),
     )
+    return instrument_agent(agent)
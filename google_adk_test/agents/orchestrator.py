@@ -1,18 +1,85 @@
 from __future__ import annotations
 
+import os
+
 from google.adk import Agent
+from google.adk.agents.base_agent import BaseAgent
+from google.adk.agents.parallel_agent import ParallelAgent
 from google.adk.agents.sequential_agent import SequentialAgent
 
+from google_adk_test.agents.context import combine_callbacks
+from google_adk_test.agents.fast_path import math_fast_path_callback
+from google_adk_test.agents.handoff import reset_handoff_state
+from google_adk_test.agents.intent import build_intent_classifier
 from google_adk_test.settings import OpenAIConfig
+from google_adk_test.telemetry import instrument_agent
+
+PIPELINE_MODES = ("sequential", "conditional", "parallel")
+
+
+def pipeline_mode_from_env() -> str:
+    """Read ``MATH_PIPELINE_MODE``, defaulting to the plain sequential pipeline."""
+    mode = os.getenv("MATH_PIPELINE_MODE", "sequential").strip().lower()
+    if mode not in PIPELINE_MODES:
+        raise ValueError(
+            f"MATH_PIPELINE_MODE must be one of {', '.join(PIPELINE_MODES)}, got '{mode}'."
+        )
+    return mode
+
+
+def build_orchestrator(
+    config: OpenAIConfig,
+    *,
+    sub_agents: list[Agent],
+    fast_path: bool = False,
+    mode: str = "sequential",
+    handoff: bool = False,
+) -> SequentialAgent:
+    """Run the math specialist first, then (optionally) the poetry specialist.
 
+    With ``fast_path`` enabled, prompts that are already a plain arithmetic
+    expression are answered locally before any sub-agent (and LLM) runs.
 
-def build_orchestrator(config: OpenAIConfig, *, sub_agents: list[Agent]) -> SequentialAgent:
-    """Run the math specialist first, then (optionally) the poetry specialist."""
-    return SequentialAgent(
+    ``mode`` selects how the stages are scheduled:
+
+    - ``sequential``: math, poetry and synthesizer always run in order.
+    - ``conditional``: same order, but the caller gates the poetry agent with
+      :func:`creativity_gate_callback` so it is skipped unless requested.
+    - ``parallel``: like ``conditional``, but a prompt that the rule-based check
+      flags is confirmed by an intent classifier running concurrently with the
+      math agent, whose verdict gates the poetry agent. Other prompts skip
+      the classifier's LLM call as well as the poetry agent's.
+
+    With ``handoff`` the previous turn's structured results are cleared from
+    session state before the stages run.
+    """
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown pipeline mode '{mode}'.")
+
+    stages: list[BaseAgent] = list(sub_agents)
+    if mode == "parallel":
+        math_agent, *rest = stages
+        stages = [
+            instrument_agent(
+                ParallelAgent(
+                    name="math_and_intent",
+                    description="Runs the math agent and the creativity classifier concurrently.",
+                    sub_agents=[math_agent, build_intent_classifier(config)],
+                )
+            ),
+            *rest,
+        ]
+
+    pipeline = SequentialAgent(
         name="math_poetry_pipeline",
         description=(
             "Sequential pipeline that always executes the math agent before the poetry agent. "
             "If the user does not request creativity, the poetry agent should acknowledge that and exit quickly."
         ),
-        sub_agents=sub_agents,
+        sub_agents=stages,
+        before_agent_callback=combine_callbacks(
+            reset_handoff_state if handoff else None,
+            math_fast_path_callback if fast_path else None,
+        ),
     )
+    return instrument_agent(pipeline)
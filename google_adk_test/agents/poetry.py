@@ -1,30 +1,71 @@
 from __future__ import annotations
 
 from textwrap import dedent
+from typing import Any
 
 from google.adk import Agent
-from google.adk.models.lite_llm import LiteLlm
 
+from google_adk_test.agents.context import context_pruner
+from google_adk_test.agents.handoff import (
+    MATH_REPLY_STATE_KEY,
+    MATH_RESULT_STATE_KEY,
+    POEM_STATE_KEY,
+    with_handoff_view,
+)
+from google_adk_test.llm_cache import build_llm
+from google_adk_test.scheduling import Priority
 from google_adk_test.settings import OpenAIConfig
+from google_adk_test.telemetry import instrument_agent
 
 
-def build_poetry_agent(config: OpenAIConfig) -> Agent:
-    """Factory for the poetry specialist."""
-    llm_kwargs = {"temperature": max(config.temperature, 0.6)}
+def build_poetry_agent(
+    config: OpenAIConfig,
+    *,
+    before_agent_callback: Any = None,
+    cache: bool = False,
+    context_budget: int | None = 2000,
+    handoff: bool = False,
+) -> Agent:
+    """Factory for the poetry specialist.
 
-    return Agent(
+    ``before_agent_callback`` lets pipelines skip the LLM call, e.g. when no
+    creativity was requested. Poems should vary between runs, so responses are
+    not cached unless ``cache`` is set. ``context_budget`` caps the conversation
+    tokens sent per call (``None`` = no cap).
+
+    With ``handoff`` the agent reads the math result from session state instead
+    of the conversation and stores its poem under ``state["poem"]``.
+    """
+    instruction = dedent(
+        """
+        You are a whimsical poetry specialist.
+        - You will receive context describing a completed math computation (original request, final result, operations_count).
+        - If the user explicitly asked for creativity, verse, or celebration, create a concise uplifting poem (3–5 lines) referencing both the math outcome and the operations count.
+        - If the user did not ask for creativity, reply briefly that no poem was requested and end your turn.
+        - If key information is missing, ask for clarification instead of inventing numbers.
+        """
+    ).strip()
+    if handoff:
+        instruction = with_handoff_view(
+            instruction, (MATH_RESULT_STATE_KEY, MATH_REPLY_STATE_KEY)
+        )
+
+    agent = Agent(
         name="poetry_agent",
         description="Composes short poems that celebrate math results.",
-        instruction=dedent(
-            """
-            You are a whimsical poetry specialist.
-            - You will receive context describing a completed math computation (original request, final result, operations_count).
-            - If the user explicitly asked for creativity, verse, or celebration, create a concise uplifting poem (3–5 lines) referencing both the math outcome and the operations count.
-            - If the user did not ask for creativity, reply briefly that no poem was requested and end your turn.
-            - If key information is missing, ask for clarification instead of inventing numbers.
-            """
-        ).strip(),
-        model=LiteLlm(model=config.model, **llm_kwargs),
+        instruction=instruction,
+        model=build_llm(
+            config,
+            agent="poetry_agent",
+            cache=cache,
+            priority=Priority.LOW,
+            temperature=max(config.temperature, 0.6),
+        ),
         disallow_transfer_to_parent=False,
         disallow_transfer_to_peers=True,
+        before_agent_callback=before_agent_callback,
+        before_model_callback=context_pruner(context_budget),
+        include_contents="none" if handoff else "default",
+        output_key=POEM_STATE_KEY if handoff else None,
     )
+    return instrument_agent(agent)
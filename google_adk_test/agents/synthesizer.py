@@ -3,28 +3,64 @@ from __future__ import annotations
 from textwrap import dedent
 
 from google.adk import Agent
-from google.adk.models.lite_llm import LiteLlm
 
+from google_adk_test.agents.context import context_pruner
+from google_adk_test.agents.handoff import (
+    HANDOFF_STATE_KEYS,
+    template_synthesizer_callback,
+    with_handoff_view,
+)
+from google_adk_test.llm_cache import build_llm
+from google_adk_test.scheduling import Priority
 from google_adk_test.settings import OpenAIConfig
+from google_adk_test.telemetry import instrument_agent
 
 
-def build_synthesizer_agent(config: OpenAIConfig) -> Agent:
-    """Produces a final user-facing answer using math + poetry context."""
-    llm_kwargs = {"temperature": config.temperature}
+def build_synthesizer_agent(
+    config: OpenAIConfig,
+    *,
+    cache: bool = True,
+    context_budget: int | None = 3000,
+    handoff: bool = False,
+    template: bool = False,
+) -> Agent:
+    """Produces a final user-facing answer using math + poetry context.
 
-    return Agent(
+    ``cache`` serves repeated requests from the shared LLM response cache;
+    ``context_budget`` caps the conversation tokens sent per call (``None`` = no cap).
+    Only the latest turn matters here, so older history is pruned first.
+
+    With ``handoff`` the agent reads the math result and poem from session
+    state instead of the conversation; ``template`` additionally answers from a
+    deterministic template, without an LLM call, whenever no poem was produced.
+    """
+    instruction = dedent(
+        """
+        You are the final narrator.
+        - Review the latest replies from math_agent and poetry_agent (if present).
+        - Provide a clear numeric summary of the math result, mentioning the number of operations when available.
+        - If a poem was provided, quote or paraphrase it in a friendly way; otherwise simply mention that no poem was requested.
+        - Close with actionable or encouraging language so the user has a complete answer in one message.
+        """
+    ).strip()
+    if handoff:
+        instruction = with_handoff_view(instruction, HANDOFF_STATE_KEYS)
+
+    agent = Agent(
         name="synthesizer_agent",
         description="Aggregates outputs from other agents and produces the final human-friendly response.",
-        instruction=dedent(
-            """
-            You are the final narrator.
-            - Review the latest replies from math_agent and poetry_agent (if present).
-            - Provide a clear numeric summary of the math result, mentioning the number of operations when available.
-            - If a poem was provided, quote or paraphrase it in a friendly way; otherwise simply mention that no poem was requested.
-            - Close with actionable or encouraging language so the user has a complete answer in one message.
-            """
-        ).strip(),
-        model=LiteLlm(model=config.model, **llm_kwargs),
+        instruction=instruction,
+        model=build_llm(
+            config,
+            agent="synthesizer_agent",
+            cache=cache,
+            priority=Priority.HIGH,
+            temperature=config.temperature,
+        ),
         disallow_transfer_to_parent=False,
         disallow_transfer_to_peers=True,
+        before_model_callback=context_pruner(context_budget),
+        before_agent_callback=template_synthesizer_callback if handoff and template else None,
+        include_contents="none" if handoff else "default",
     )
+    return instrument_agent(agent)
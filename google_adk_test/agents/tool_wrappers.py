@@ -1,19 +1,132 @@
 from __future__ import annotations
 
-from google.adk import Agent
+import weakref
+from typing import Any
+
+from google.adk import Agent, Runner
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.plugins.plugin_manager import PluginManager
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
 from google.adk.tools.agent_tool import AgentTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
 
 from google_adk_test.agents.math import build_math_agent
 from google_adk_test.agents.poetry import build_poetry_agent
 from google_adk_test.settings import OpenAIConfig
 
 
+class PooledAgentTool(AgentTool):
+    """``AgentTool`` that reuses one inner Runner and session store across calls.
+
+    ADK's ``AgentTool`` builds a Runner with fresh in-memory services and copies
+    the caller's whole state into a new session on every call. This wrapper
+    keeps one Runner per parent Runner, seeds each call's short-lived session with
+    only ``state_keys`` and deletes it afterwards. State changes made by the
+    inner agent are still forwarded to the caller.
+
+    With ``structured_result``, a function response that ends the inner run
+    (because the inner agent skipped summarising its tool) is returned as the
+    tool result, so the caller gets the JSON without an extra narration turn.
+    Inner agents get no artifact service.
+    """
+
+    def __init__(
+        self,
+        agent: Agent,
+        *,
+        skip_summarization: bool = False,
+        structured_result: bool = False,
+        state_keys: tuple[str, ...] = (),
+    ) -> None:
+        super().__init__(agent, skip_summarization=skip_summarization)
+        self.structured_result = structured_result
+        self.state_keys = state_keys
+        # Keyed on the parent Runner's plugin manager, so each inner Runner is
+        # dropped together with its parent.
+        self._runners: weakref.WeakKeyDictionary[PluginManager, tuple[tuple[Any, ...], Runner]] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _runner_for(self, invocation: InvocationContext) -> Runner:
+        plugins = list(invocation.plugin_manager.plugins)
+        # Services and plugins compare by identity; the key holds them, so their
+        # ids cannot be reused by other objects while the entry lives.
+        key = (invocation.app_name, invocation.credential_service, *plugins)
+        entry = self._runners.get(invocation.plugin_manager)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        runner = Runner(
+            app_name=invocation.app_name or self.agent.name,
+            agent=self.agent,
+            session_service=InMemorySessionService(),
+            credential_service=invocation.credential_service,
+            plugins=plugins,
+        )
+        self._runners[invocation.plugin_manager] = (key, runner)
+        return runner
+
+    def _request(self, args: dict[str, Any]) -> types.Content:
+        if isinstance(self.agent, Agent) and self.agent.input_schema:
+            text = self.agent.input_schema.model_validate(args).model_dump_json(exclude_none=True)
+        else:
+            text = args["request"]
+        return types.Content(role="user", parts=[types.Part.from_text(text=text)])
+
+    def _result(self, event: Event | None) -> Any:
+        if event is None:
+            return ""
+        responses = event.get_function_responses()
+        if self.structured_result and responses:
+            if len(responses) == 1:
+                return responses[0].response
+            return {response.name: response.response for response in responses}
+        text = "\n".join(part.text for part in event.content.parts or [] if part.text)
+        if isinstance(self.agent, Agent) and self.agent.output_schema:
+            return self.agent.output_schema.model_validate_json(text).model_dump(exclude_none=True)
+        return text
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext) -> Any:
+        if self.skip_summarization:
+            tool_context.actions.skip_summarization = True
+
+        runner = self._runner_for(tool_context._invocation_context)
+        user_id = tool_context._invocation_context.user_id
+        state = {
+            key: tool_context.state.get(key)
+            for key in self.state_keys
+            if tool_context.state.get(key) is not None
+        }
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id=user_id, state=state
+        )
+        last_event = None
+        try:
+            async for event in runner.run_async(
+                user_id=user_id, session_id=session.id, new_message=self._request(args)
+            ):
+                if event.actions.state_delta:
+                    tool_context.state.update(event.actions.state_delta)
+                if event.content:
+                    last_event = event
+        finally:
+            # Each call gets a clean history; keep the shared store from growing.
+            await runner.session_service.delete_session(
+                app_name=runner.app_name, user_id=user_id, session_id=session.id
+            )
+        return self._result(last_event)
+
+
 def build_math_tool_agent(config: OpenAIConfig) -> AgentTool:
-    """Wrap math agent as a tool for orchestration."""
-    return AgentTool(build_math_agent(config), skip_summarization=False)
+    """Wrap math agent as a tool that returns the math JSON directly.
+
+    The inner agent ends its turn once ``compute_basic_math`` answers, so the
+    caller gets the structured result without the narration LLM call.
+    """
+    return PooledAgentTool(build_math_agent(config, handoff=True), structured_result=True)
 
 
 def build_poetry_tool_agent(config: OpenAIConfig) -> AgentTool:
     """Wrap poetry agent as a tool."""
-    return AgentTool(build_poetry_agent(config), skip_summarization=False)
-
+    return PooledAgentTool(build_poetry_agent(config))
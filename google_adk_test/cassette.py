@@ -0,0 +1,307 @@
+"""Record every LLM call to a cassette file and replay it offline.
+
+Set ``LLM_CASSETTE`` to a file and ``LLM_CASSETTE_MODE`` to ``record`` to
+capture the requests and final responses of every agent built by
+``google_adk_test.registry``; ``replay`` (the default) answers the same
+requests from the file without LiteLLM or the network, and ``auto`` replays
+what it has and records the rest. Requests are keyed by
+:func:`~google_adk_test.llm_cache.request_cache_key`, so a prompt, instruction
+or tool change yields a miss, reported with how the request drifted from the
+closest recorded one.
+
+The cassette is gzip-compressed JSON Lines, one call per line. Inline image
+bytes in the stored requests are replaced by their SHA-256 digest; the
+responses are stored whole. A key recorded more than once (e.g. a sampled
+poem) is replayed in recording order, repeating its last answer.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from loguru import logger
+
+from google_adk_test.llm_cache import payload_key, replay_responses, request_payload
+from google_adk_test.settings import OpenAIConfig
+
+# Longest excerpt of a differing request part quoted in a drift report.
+_SNIPPET_CHARS = 120
+# Drift reports kept for ``stats``; the first ones are the useful ones.
+_MAX_DRIFTS = 50
+
+
+class CassetteMissError(RuntimeError):
+    """A replayed request has no recorded response."""
+
+
+def _compact(value: Any) -> Any:
+    """Replace inline image bytes in a request payload with their digest and size."""
+    if isinstance(value, list):
+        return [_compact(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if isinstance(value.get("data"), str) and "mime_type" in value:
+        return {
+            "mime_type": value["mime_type"],
+            "sha256": hashlib.sha256(value["data"].encode("ascii")).hexdigest(),
+            "size": len(value["data"]),
+        }
+    return {key: _compact(item) for key, item in value.items()}
+
+
+def _snippet(value: Any) -> str:
+    text = json.dumps(value, sort_keys=True, default=str)
+    return text if len(text) <= _SNIPPET_CHARS else text[: _SNIPPET_CHARS - 3] + "..."
+
+
+def describe_drift(recorded: dict[str, Any], request: dict[str, Any]) -> list[str]:
+    """Human-readable differences between a recorded request payload and a new one."""
+    changes: list[str] = []
+    for field in ("model", "params"):
+        if recorded.get(field) != request.get(field):
+            changes.append(f"{field}: {_snippet(recorded.get(field))} -> {_snippet(request.get(field))}")
+    old_config, new_config = recorded.get("config") or {}, request.get("config") or {}
+    for field in sorted(set(old_config) | set(new_config)):
+        if old_config.get(field) != new_config.get(field):
+            changes.append(
+                f"config.{field}: {_snippet(old_config.get(field))} -> {_snippet(new_config.get(field))}"
+            )
+    old_contents, new_contents = recorded.get("contents") or [], request.get("contents") or []
+    for index, (old, new) in enumerate(zip(old_contents, new_contents)):
+        if old != new:
+            changes.append(f"contents[{index}]: {_snippet(old)} -> {_snippet(new)}")
+            break
+    else:
+        if len(old_contents) != len(new_contents):
+            changes.append(f"contents: {len(old_contents)} -> {len(new_contents)} messages")
+    return changes
+
+
+def _similarity(recorded: dict[str, Any], request: dict[str, Any]) -> tuple[int, ...]:
+    old_config, new_config = recorded.get("config") or {}, request.get("config") or {}
+    prefix = 0
+    for old, new in zip(recorded.get("contents") or [], request.get("contents") or []):
+        if old != new:
+            break
+        prefix += 1
+    return (
+        old_config.get("system_instruction") == new_config.get("system_instruction"),
+        prefix,
+        old_config.get("tools") == new_config.get("tools"),
+        recorded.get("params") == request.get("params"),
+    )
+
+
+class Cassette:
+    """Recorded LLM calls of one file, shared by every agent in the process.
+
+    Recording keeps new calls in memory until :meth:`save`, which merges them
+    into the file: keys recorded by this process replace their old episodes,
+    all other keys are kept. Record from one process at a time.
+    """
+
+    def __init__(self, path: str | Path, *, mode: str) -> None:
+        self.path = Path(path)
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._episodes = self._load() if self.path.exists() else {}
+        self._recorded: dict[str, list[dict[str, Any]]] = {}
+        self._cursors: dict[str, int] = {}
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self.drifts: list[dict[str, Any]] = []
+        if mode == "replay" and not self._episodes:
+            logger.warning("Cassette {} is empty or missing; every LLM call will fail", self.path)
+
+    def lookup(self, key: str) -> dict[str, Any] | None:
+        """The next recorded episode for ``key``, or ``None`` (counted as a miss)."""
+        with self._lock:
+            episodes = self._episodes.get(key)
+            if not episodes:
+                self.misses += 1
+                return None
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            self.hits += 1
+            return episodes[min(cursor, len(episodes) - 1)]
+
+    def record(self, key: str, episode: dict[str, Any]) -> None:
+        with self._lock:
+            self._recorded.setdefault(key, []).append(episode)
+            self._episodes[key] = self._recorded[key]
+            self._unsaved += 1
+            self.recorded += 1
+
+    def drift(self, agent: str, key: str, request: dict[str, Any]) -> list[str]:
+        """Describe how ``request`` differs from the closest call ``agent`` recorded, and log it."""
+        with self._lock:
+            candidates = [
+                episodes[0] for episodes in self._episodes.values() if episodes[0].get("agent") == agent
+            ]
+        if candidates:
+            nearest = max(candidates, key=lambda episode: _similarity(episode["request"], request))
+            changes = describe_drift(nearest["request"], request) or ["identical after compaction"]
+        else:
+            changes = [f"no calls recorded for {agent}"]
+        with self._lock:
+            if len(self.drifts) < _MAX_DRIFTS:
+                self.drifts.append({"agent": agent, "key": key, "changes": changes})
+        logger.warning("Prompt drift for {} ({}): {}", agent, key[:12], "; ".join(changes))
+        return changes
+
+    def save(self) -> None:
+        """Merge the calls recorded by this process into the file."""
+        with self._lock:
+            if not self._unsaved:
+                return
+            merged = self._load() if self.path.exists() else {}
+            merged.update(self._recorded)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+            with gzip.open(temporary, "wt", encoding="utf-8") as handle:
+                for key, episodes in merged.items():
+                    for episode in episodes:
+                        handle.write(json.dumps(dict(episode, key=key), separators=(",", ":")) + "\n")
+            os.replace(temporary, self.path)
+            saved, self._unsaved = self._unsaved, 0
+        logger.info("Saved {} recorded LLM calls to {}", saved, self.path)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "mode": self.mode,
+                "keys": len(self._episodes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+                "drifts": list(self.drifts),
+            }
+
+    def _load(self) -> dict[str, list[dict[str, Any]]]:
+        episodes: dict[str, list[dict[str, Any]]] = {}
+        with gzip.open(self.path, "rt", encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    episode = json.loads(line)
+                    episodes.setdefault(episode.pop("key"), []).append(episode)
+        return episodes
+
+
+# One cassette per file, shared by every agent in the process.
+_CASSETTES: dict[Path, Cassette] = {}
+
+
+def get_cassette(config: OpenAIConfig) -> Cassette:
+    """Return the shared cassette for ``config.cassette_path``."""
+    path = Path(config.cassette_path).expanduser().resolve()
+    cassette = _CASSETTES.get(path)
+    if cassette is None:
+        cassette = _CASSETTES[path] = Cassette(path, mode=config.cassette_mode)
+        logger.info("{} LLM calls with cassette {}", config.cassette_mode.capitalize(), path)
+        if config.cassette_mode != "replay":
+            # Entry points close cassettes explicitly; this covers ``adk web`` and scripts.
+            atexit.register(cassette.save)
+    return cassette
+
+
+def cassette_stats() -> list[dict[str, Any]]:
+    """Counters for every cassette opened in this process."""
+    return [cassette.stats() for cassette in _CASSETTES.values()]
+
+
+def close_cassettes() -> None:
+    """Write what was recorded; call once when the process shuts down."""
+    for cassette in _CASSETTES.values():
+        cassette.save()
+
+
+class CassetteLlm(BaseLlm):
+    """Answer from a :class:`Cassette`, calling and recording ``inner`` when allowed.
+
+    In ``replay`` mode ``inner`` is ``None`` and a miss raises
+    :class:`CassetteMissError` after reporting the drift. Replayed answers are
+    tagged with ``custom_metadata={"cassette_hit": True}`` and, with
+    ``latency_scale`` above ``0``, delayed by that fraction of the recorded
+    latency (first token first, when streaming).
+    """
+
+    inner: BaseLlm | None = None
+    cassette: Cassette
+    agent: str
+    params: dict[str, Any] = {}
+    latency_scale: float = 0.0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        payload = request_payload(llm_request, self.params)
+        key = payload_key(payload)
+        episode = None if self.cassette.mode == "record" else self.cassette.lookup(key)
+        if episode is not None:
+            async for response in self._replay(episode, stream):
+                yield response
+            return
+        if self.inner is None:
+            changes = self.cassette.drift(self.agent, key, _compact(payload))
+            raise CassetteMissError(
+                f"No recorded response for {self.agent} in {self.cassette.path}: {'; '.join(changes)}"
+            )
+        if self.cassette.mode == "auto":
+            self.cassette.drift(self.agent, key, _compact(payload))
+
+        started = time.perf_counter()
+        first_token: float | None = None
+        final: list[LlmResponse] = []
+        failed = False
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            if response.error_code:
+                failed = True
+            elif not response.partial and response.content:
+                final.append(response.model_copy(deep=True, update={"custom_metadata": None}))
+            yield response
+        if final and not failed:
+            self.cassette.record(
+                key,
+                {
+                    "agent": self.agent,
+                    "model": self.model,
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "first_token_ms": round((first_token or 0.0) * 1000, 1),
+                    "request": _compact(payload),
+                    "responses": [
+                        response.model_dump(mode="json", exclude_none=True) for response in final
+                    ],
+                },
+            )
+
+    async def _replay(self, episode: dict[str, Any], stream: bool) -> AsyncGenerator[LlmResponse, None]:
+        responses = [LlmResponse.model_validate(item) for item in episode["responses"]]
+        first_token = episode["first_token_ms"] / 1000 * self.latency_scale
+        remaining = episode["latency_ms"] / 1000 * self.latency_scale - first_token
+        if not stream:
+            first_token, remaining = 0.0, first_token + remaining
+        replayed = replay_responses(responses, stream=stream, metadata={"cassette_hit": True})
+        for index, response in enumerate(replayed):
+            if index == 0 and first_token > 0:
+                await asyncio.sleep(first_token)
+            if not response.partial and remaining > 0:
+                await asyncio.sleep(remaining)
+                remaining = 0.0
+            yield response
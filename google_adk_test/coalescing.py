@@ -0,0 +1,217 @@
+"""Single-flight execution: identical concurrent requests share one pipeline run."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncGenerator
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from google.adk import Runner
+    from google.adk.agents.run_config import RunConfig
+    from google.adk.events import Event
+    from google.genai import types
+
+DEFAULT_SINGLE_FLIGHT_APPS = ("math_orchestrator", "reasoning_tool_orchestrator")
+
+
+def single_flight_enabled(app: str) -> bool:
+    """Whether ``SINGLE_FLIGHT_APPS`` (default: the math and reasoning orchestrators) lists ``app``."""
+    raw = os.getenv("SINGLE_FLIGHT_APPS")
+    if raw is None:
+        return app in DEFAULT_SINGLE_FLIGHT_APPS
+    return app in {name.strip() for name in raw.split(",")}
+
+
+@dataclass
+class SingleFlightStats:
+    """Running counters of requests and the pipeline executions they needed, per app."""
+
+    requests: dict[str, int] = field(default_factory=dict)
+    coalesced: dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, app: str, *, coalesced: bool) -> None:
+        with self._lock:
+            self.requests[app] = self.requests.get(app, 0) + 1
+            self.coalesced[app] = self.coalesced.get(app, 0) + int(coalesced)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "app": app,
+                    "requests": requests,
+                    "executions": requests - self.coalesced[app],
+                    "coalesced": self.coalesced[app],
+                    "coalescing_ratio": self.coalesced[app] / requests,
+                }
+                for app, requests in self.requests.items()
+            ]
+
+
+single_flight_stats = SingleFlightStats()
+
+
+class _Flight:
+    """Events of one in-flight execution, replayable by any number of followers."""
+
+    def __init__(self) -> None:
+        self.events: list[Event] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def publish(self, event: Event) -> None:
+        self.events.append(event)
+        self._wake()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.done = True
+        self.error = error
+        self._wake()
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncGenerator[Event, None]:
+        index = 0
+        while True:
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class CoalescingRunner:
+    """``Runner`` wrapper whose ``run_async`` shares one execution among identical requests.
+
+    A request joins an in-flight execution when its session has no events yet,
+    its state (including ``user:`` and ``app:`` state) matches, and its message
+    is text with the same whitespace-normalised prompt (and the same streaming
+    mode). Anything else goes straight to the runner. Flights are
+    tracked per wrapper, so only requests for the same agents and model config
+    are merged, and a flight ends with its execution: this is not a cache.
+
+    The execution runs in the first request's session. Every follower gets its
+    own user event plus a copy of each non-partial event appended to its
+    session, so its history and state look as if it had run the pipeline.
+    Other attributes are forwarded to the wrapped runner.
+    """
+
+    def __init__(self, runner: Runner, *, app: str | None = None, enabled: bool | None = None) -> None:
+        self.runner = runner
+        self.app = app or runner.app_name
+        self.enabled = single_flight_enabled(self.app) if enabled is None else enabled
+        self._flights: dict[str, _Flight] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.runner, name)
+
+    async def run_async(
+        self,
+        *,
+        user_id: str,
+        session_id: str,
+        new_message: types.Content,
+        run_config: RunConfig | None = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[Event, None]:
+        """Same contract as ``Runner.run_async``."""
+        run_kwargs = dict(user_id=user_id, session_id=session_id, new_message=new_message, run_config=run_config)
+        key = None
+        if self.enabled and not kwargs:
+            key = await self._flight_key(user_id, session_id, new_message, run_config)
+        if key is None:
+            async for event in self.runner.run_async(**run_kwargs, **kwargs):
+                yield event
+            return
+
+        flight = self._flights.get(key)
+        single_flight_stats.record(self.app, coalesced=flight is not None)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.create_task(self._lead(key, flight, run_kwargs))
+            async for event in flight.follow():
+                yield event
+            return
+
+        logger.debug("Coalesced request in session {} onto an in-flight {} run", session_id, self.app)
+        async for event in self._follow(flight, user_id, session_id, new_message):
+            yield event
+
+    async def _flight_key(
+        self,
+        user_id: str,
+        session_id: str,
+        message: types.Content,
+        run_config: RunConfig | None,
+    ) -> str | None:
+        parts = message.parts or []
+        if not parts or any(part.text is None for part in parts):
+            return None
+        session = await self.runner.session_service.get_session(
+            app_name=self.runner.app_name, user_id=user_id, session_id=session_id
+        )
+        # Earlier turns shape the answer.
+        if session is None or session.events:
+            return None
+        # So does preset state; the service merges user- and app-scoped keys into it.
+        state = json.dumps(session.state, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha256(state.encode()).hexdigest()
+        prompt = " ".join(" ".join(part.text for part in parts).split())
+        streaming = run_config.streaming_mode if run_config is not None else None
+        return f"{streaming}\0{digest}\0{prompt}"
+
+    async def _lead(self, key: str, flight: _Flight, run_kwargs: dict[str, Any]) -> None:
+        # Runs as its own task so followers still finish if the first caller goes away.
+        try:
+            async for event in self.runner.run_async(**run_kwargs):
+                flight.publish(event)
+        except Exception as exc:  # noqa: BLE001 - re-raised in every waiter
+            flight.finish(exc)
+        else:
+            flight.finish()
+        finally:
+            self._flights.pop(key, None)
+
+    async def _follow(
+        self,
+        flight: _Flight,
+        user_id: str,
+        session_id: str,
+        message: types.Content,
+    ) -> AsyncGenerator[Event, None]:
+        from google.adk.agents.invocation_context import new_invocation_context_id
+        from google.adk.events import Event
+
+        service = self.runner.session_service
+        session = await service.get_session(
+            app_name=self.runner.app_name, user_id=user_id, session_id=session_id
+        )
+        invocation_id = new_invocation_context_id()
+        await service.append_event(
+            session=session,
+            event=Event(invocation_id=invocation_id, author="user", content=message),
+        )
+        async for event in flight.follow():
+            if event.partial:
+                yield event
+                continue
+            copy = event.model_copy(
+                deep=True, update={"id": Event.new_id(), "invocation_id": invocation_id}
+            )
+            await service.append_event(session=session, event=copy)
+            yield copy
@@ -0,0 +1,39 @@
+"""Helpers that turn ADK events into plain text and JSON-friendly dicts."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable
+
+if TYPE_CHECKING:
+    from google.genai import types
+
+
+def iter_text_parts(content: types.Content | None) -> Iterable[str]:
+    """Yield text fragments from an event content."""
+    if not content or not content.parts:
+        return
+    for part in content.parts:
+        if part.text:
+            yield part.text
+
+
+def content_text(content: types.Content | None) -> str:
+    """Join the text parts of ``content``, e.g. a callback's ``user_content``."""
+    return "".join(iter_text_parts(content))
+
+
+def summarize_event(event) -> dict[str, Any]:
+    """Reduce an ADK event to the JSON-friendly fields batch output needs."""
+    summary: dict[str, Any] = {"author": event.author}
+    text = " ".join(segment.strip() for segment in iter_text_parts(event.content) if segment)
+    if text:
+        summary["text"] = text
+    calls = event.get_function_calls()
+    if calls:
+        summary["function_calls"] = [{"name": call.name, "args": call.args} for call in calls]
+    responses = event.get_function_responses()
+    if responses:
+        summary["function_responses"] = [
+            {"name": response.name, "response": response.response} for response in responses
+        ]
+    return summary
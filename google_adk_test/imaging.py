@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import math
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from loguru import logger
+from PIL import Image, ImageOps
+
+
+@dataclass(frozen=True, slots=True)
+class ImageSettings:
+    """How OCR images are shrunk and split before they are sent to the model.
+
+    ``tile_height`` of ``0`` disables tiling; otherwise images taller than
+    ``tile_height * 1.5`` (after downscaling) are cut into horizontal strips
+    that overlap by ``tile_overlap`` pixels. ``workers`` of ``0`` runs the work
+    on a thread instead of the process pool.
+    """
+
+    max_side: int = 2048
+    quality: int = 85
+    grayscale: bool = True
+    tile_height: int = 0
+    tile_overlap: int = 64
+    workers: int = 2
+
+    @classmethod
+    def from_env(cls) -> "ImageSettings":
+        """Build settings from the ``OCR_*`` environment variables."""
+        values: dict[str, Any] = {}
+        for name, env in (
+            ("max_side", "OCR_MAX_SIDE"),
+            ("quality", "OCR_JPEG_QUALITY"),
+            ("tile_height", "OCR_TILE_HEIGHT"),
+            ("tile_overlap", "OCR_TILE_OVERLAP"),
+            ("workers", "OCR_WORKERS"),
+        ):
+            raw = os.getenv(env)
+            if raw is None:
+                continue
+            try:
+                values[name] = int(raw)
+            except ValueError as exc:
+                raise ValueError(f"{env} must be an integer, got '{raw}'.") from exc
+        if (raw := os.getenv("OCR_GRAYSCALE")) is not None:
+            values["grayscale"] = raw.strip().lower() in {"1", "true", "yes", "on"}
+        return cls(**values)
+
+
+@dataclass(slots=True)
+class PreparedImage:
+    """A downscaled image (plus optional tiles) and what preprocessing saved."""
+
+    data: bytes
+    mime_type: str
+    size: tuple[int, int]
+    original_bytes: int
+    original_size: tuple[int, int]
+    grayscale: bool = False
+    tiles: list[bytes] = field(default_factory=list)
+    tile_sizes: list[tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+    @property
+    def tokens_before(self) -> int:
+        return estimate_vision_tokens(*self.original_size)
+
+    @property
+    def tokens_after(self) -> int:
+        if self.tiles:
+            return sum(estimate_vision_tokens(*size) for size in self.tile_sizes)
+        return estimate_vision_tokens(*self.size)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "original_size": self.original_size,
+            "size": self.size,
+            "grayscale": self.grayscale,
+            "tiles": len(self.tiles),
+            "bytes_before": self.original_bytes,
+            "bytes_after": len(self.data),
+            "bytes_saved": self.bytes_saved,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+def estimate_vision_tokens(width: int, height: int) -> int:
+    """Approximate OpenAI high-detail image cost: 85 + 170 per 512px tile.
+
+    Images are first fit into 2048x2048, then scaled so the short side is at
+    most 768px, mirroring what the API does server-side.
+    """
+    scale = min(1.0, 2048 / max(width, height, 1))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / max(min(width, height), 1))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def _is_effectively_gray(image: Image.Image) -> bool:
+    """True when no meaningful colour would be lost by dropping chroma."""
+    if image.mode in {"1", "L", "LA", "I", "F"}:
+        return True
+    sample = np.asarray(image.convert("RGB").resize((64, 64)), dtype=np.int16)
+    chroma = sample.max(axis=2) - sample.min(axis=2)
+    return float(np.percentile(chroma, 98)) < 24
+
+
+def _encode(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def preprocess_image(data: bytes, settings: ImageSettings) -> PreparedImage:
+    """Downscale, optionally grayscale, re-encode and tile one image.
+
+    Pure and picklable so it can run in a worker process. If re-encoding
+    would not make the image smaller, the original bytes are kept. ``data``
+    always fits in ``max_side``; only the tiles come from a taller copy.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        original_format = (source.format or "PNG").upper()
+        image = ImageOps.exif_transpose(source)
+        original_size = image.size
+
+        if image.mode in {"RGBA", "LA", "P"}:
+            # JPEG has no alpha; flatten onto white like a scanned page.
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, "white")
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        gray = settings.grayscale and _is_effectively_gray(image)
+        image = image.convert("L" if gray else "RGB")
+        # With tiling on, tiles are cut from a copy bounded only in width so
+        # tall pages keep legible text. The whole image, sent when tiling is
+        # skipped or fails, stays within ``max_side``.
+        page = image
+        if settings.tile_height:
+            page = image.copy()
+            page.thumbnail((settings.max_side, 1 << 16), Image.Resampling.LANCZOS)
+        image.thumbnail((settings.max_side, settings.max_side), Image.Resampling.LANCZOS)
+
+        encoded = _encode(image, settings.quality)
+        if len(encoded) < len(data) or image.size != original_size:
+            prepared = PreparedImage(
+                data=encoded,
+                mime_type="image/jpeg",
+                size=image.size,
+                original_bytes=len(data),
+                original_size=original_size,
+                grayscale=gray,
+            )
+        else:
+            prepared = PreparedImage(
+                data=data,
+                mime_type=Image.MIME.get(original_format, "image/png"),
+                size=original_size,
+                original_bytes=len(data),
+                original_size=original_size,
+            )
+
+        width, height = page.size
+        if settings.tile_height and height > settings.tile_height * 1.5:
+            step = max(settings.tile_height - settings.tile_overlap, 1)
+            top = 0
+            while True:
+                bottom = min(top + settings.tile_height, height)
+                tile = page.crop((0, top, width, bottom))
+                prepared.tiles.append(_encode(tile, settings.quality))
+                prepared.tile_sizes.append(tile.size)
+                if bottom >= height:
+                    break
+                top += step
+        return prepared
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_prepared: OrderedDict[tuple[str, ImageSettings], PreparedImage] = OrderedDict()
+_PREPARED_MAX_ENTRIES = 64
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # The pool may first be needed under a running server, whose threads
+            # make ``fork`` unsafe. Forkserver workers start from a clean process
+            # that has only this module (numpy and Pillow) preloaded.
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _pool
+
+
+def warm_image_pool(settings: ImageSettings) -> None:
+    """Start the preprocessing workers now so the first upload does not wait for them."""
+    if settings.workers > 0:
+        _get_pool(settings.workers).submit(int).result()
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next call starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_image_pool() -> None:
+    """Stop the preprocessing workers (they are restarted on next use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+async def prepare_image(
+    data: bytes, settings: ImageSettings, *, digest: str | None = None
+) -> PreparedImage:
+    """Preprocess ``data`` off the event loop, reusing results for known digests.
+
+    If a pool worker dies (e.g. killed for memory), the pool is rebuilt for
+    later calls and this image is preprocessed on a thread instead.
+    """
+    key = (digest, settings) if digest else None
+    if key is not None and key in _prepared:
+        _prepared.move_to_end(key)
+        return _prepared[key]
+
+    prepared: PreparedImage | None = None
+    if settings.workers > 0:
+        pool = _get_pool(settings.workers)
+        try:
+            prepared = await asyncio.get_running_loop().run_in_executor(
+                pool, preprocess_image, data, settings
+            )
+        except BrokenProcessPool as exc:
+            logger.warning("OCR preprocessing pool broke ({}); restarting it", exc)
+            _discard_pool(pool)
+    if prepared is None:
+        prepared = await asyncio.to_thread(preprocess_image, data, settings)
+
+    logger.info("Preprocessed OCR image {}: {}", (digest or "")[:12], prepared.report())
+    if key is not None:
+        _prepared[key] = prepared
+        while len(_prepared) > _PREPARED_MAX_ENTRIES:
+            _prepared.popitem(last=False)
+    return prepared
+
+
+def stitch_tiles(texts: list[str]) -> str:
+    """Join per-tile transcriptions in order, dropping lines repeated by the overlap."""
+    lines: list[str] = []
+    for text in texts:
+        tile_lines = [line.rstrip() for line in text.strip().splitlines()]
+        # The overlap can repeat up to a few trailing lines of the previous tile.
+        for size in range(min(len(lines), len(tile_lines), 5), 0, -1):
+            if [line.strip() for line in lines[-size:]] == [
+                line.strip() for line in tile_lines[:size]
+            ]:
+                tile_lines = tile_lines[size:]
+                break
+        lines.extend(tile_lines)
+    return "\n".join(lines)
@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from loguru import logger
+
+from google_adk_test.routing import FallbackLlm, endpoint_health
+from google_adk_test.scheduling import Priority, ScheduledLlm, get_scheduler
+from google_adk_test.settings import ModelProfile, OpenAIConfig
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+# Request config fields that never change what the model answers.
+_IGNORED_CONFIG_FIELDS = {"http_options", "labels"}
+# A hit refreshes its LRU timestamp (and commits) at most this often.
+_TOUCH_INTERVAL = 60.0
+# Puts between two eviction passes; the table may overshoot ``max_entries`` by this much.
+_EVICT_EVERY = 64
+
+
+class ResponseCache:
+    """SQLite-backed store of final LLM responses with TTL and LRU eviction.
+
+    Entries older than ``ttl_seconds`` are treated as misses and purged; once
+    more than ``max_entries`` are stored, the least recently read ones go.
+    Safe to share across threads and, thanks to WAL mode, across processes.
+    Calls block on SQLite, so async code runs them in a worker thread.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        ttl_seconds: float = 86_400.0,
+        max_entries: int = 10_000,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._puts_since_evict = 0
+
+    def get(self, key: str) -> list[LlmResponse] | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at, accessed_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            if now - row[2] > _TOUCH_INTERVAL:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            self.hits += 1
+        return [LlmResponse.model_validate(item) for item in json.loads(row[0])]
+
+    def put(self, key: str, model: str, responses: list[LlmResponse]) -> None:
+        if self.max_entries <= 0:
+            return
+        payload = json.dumps(
+            [response.model_dump(mode="json", exclude_none=True) for response in responses]
+        )
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, model, payload, now, now),
+            )
+            self.stores += 1
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= _EVICT_EVERY:
+                self._puts_since_evict = 0
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        expired = self._conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        (size,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        overflow = self._conn.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+            (max(size - self.max_entries, 0),),
+        ).rowcount
+        self.evictions += expired + overflow
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "path": str(self.path),
+                "size": size,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# One cache per database file, shared by every agent in the process.
+_CACHES: dict[Path, ResponseCache] = {}
+
+
+def get_response_cache(config: OpenAIConfig) -> ResponseCache | None:
+    """Return the shared cache for ``config``, or ``None`` when caching is disabled."""
+    if not config.response_cache_path:
+        return None
+    path = Path(config.response_cache_path).expanduser().resolve()
+    cache = _CACHES.get(path)
+    if cache is None:
+        cache = ResponseCache(
+            path,
+            ttl_seconds=config.response_cache_ttl,
+            max_entries=config.response_cache_max_entries,
+        )
+        _CACHES[path] = cache
+    return cache
+
+
+def response_cache_stats() -> list[dict[str, Any]]:
+    """Counters for every response cache opened in this process."""
+    return [cache.stats() for cache in _CACHES.values()]
+
+
+def _normalize_part(part: types.Part) -> dict[str, Any]:
+    data = part.model_dump(mode="json", exclude_none=True)
+    if "text" in data:
+        data["text"] = " ".join(data["text"].split())
+    # Call ids are minted per run, so they must not split otherwise equal requests.
+    for field in ("function_call", "function_response"):
+        if field in data:
+            data[field].pop("id", None)
+    data.pop("thought_signature", None)
+    return data
+
+
+def _normalize_content(content: types.Content) -> dict[str, Any]:
+    parts = [_normalize_part(part) for part in content.parts or []]
+    return {"role": content.role, "parts": [part for part in parts if part.get("text") != ""]}
+
+
+def request_payload(
+    llm_request: LlmRequest, params: dict[str, Any], *, endpoint: str | None = None
+) -> dict[str, Any]:
+    """The model, sampling params, config (instruction, tools, ...) and normalized contents.
+
+    ``endpoint`` (the API base the request goes to) is included when given, so
+    answers of a mock or local server never stand in for the real API's.
+    """
+    config = llm_request.config
+    payload = {
+        "model": llm_request.model,
+        "params": params,
+        "config": (
+            config.model_dump(mode="json", exclude_none=True, exclude=_IGNORED_CONFIG_FIELDS)
+            if config
+            else None
+        ),
+        "contents": [_normalize_content(content) for content in llm_request.contents],
+    }
+    if endpoint is not None:
+        payload["endpoint"] = endpoint
+    return payload
+
+
+def payload_key(payload: dict[str, Any]) -> str:
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def request_cache_key(
+    llm_request: LlmRequest, params: dict[str, Any], *, endpoint: str | None = None
+) -> str:
+    """Hash the endpoint, model, sampling params, instruction, tools and normalized contents."""
+    return payload_key(request_payload(llm_request, params, endpoint=endpoint))
+
+
+def replay_responses(
+    responses: list[LlmResponse], *, stream: bool, metadata: dict[str, Any]
+) -> list[LlmResponse]:
+    """Stored final responses tagged with ``metadata``, each preceded by a partial text chunk when streaming."""
+    replayed: list[LlmResponse] = []
+    for response in responses:
+        response.custom_metadata = {**(response.custom_metadata or {}), **metadata}
+        parts = response.content.parts if response.content else None
+        text = "".join(part.text for part in parts or [] if part.text)
+        if stream and text:
+            replayed.append(
+                LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text=text)]),
+                    partial=True,
+                    custom_metadata=response.custom_metadata,
+                )
+            )
+        replayed.append(response)
+    return replayed
+
+
+class CachedLlm(BaseLlm):
+    """Serve repeated requests from a :class:`ResponseCache` before calling ``inner``.
+
+    Only complete, error-free answers of the primary model are stored. A hit
+    is replayed as the same ``LlmResponse`` objects (preceded by a partial text
+    chunk when streaming), tagged with ``custom_metadata={"cache_hit": True}``.
+    Keys include ``endpoint``, so each API base has its own entries.
+    """
+
+    inner: BaseLlm
+    cache: ResponseCache
+    endpoint: str
+    params: dict[str, Any] = {}
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        key = request_cache_key(llm_request, self.params, endpoint=self.endpoint)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            logger.debug("LLM cache hit for {} ({})", self.model, key[:12])
+            for response in replay_responses(cached, stream=stream, metadata={"cache_hit": True}):
+                yield response
+            return
+
+        final: list[LlmResponse] = []
+        failed = False
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            # A fallback model's answer is not what the primary would have cached.
+            if response.error_code or (response.custom_metadata or {}).get("fallback_model"):
+                failed = True
+            elif not response.partial and response.content:
+                # Per-call metadata (queue wait, retries) does not describe a replay.
+                final.append(response.model_copy(deep=True, update={"custom_metadata": None}))
+            yield response
+
+        if final and not failed:
+            await asyncio.to_thread(self.cache.put, key, self.model, final)
+
+
+def build_llm(
+    config: OpenAIConfig,
+    *,
+    agent: str | None = None,
+    cache: bool = False,
+    priority: int = Priority.NORMAL,
+    **params: Any,
+) -> BaseLlm:
+    """Build the ``LiteLlm`` for an agent, optionally behind the shared response cache.
+
+    ``params`` (temperature, max_tokens, ...) go to LiteLLM and are part of the
+    cache key. Agents whose output should vary between calls keep ``cache=False``.
+    Calls that miss the cache go through the process-wide request scheduler,
+    which admits higher ``priority`` calls first when the rate budget is short.
+
+    ``agent`` selects the model profile (``config.profile``): its model and
+    temperature replace the defaults, and with fallback models configured
+    calls are routed by :class:`FallbackLlm`.
+
+    With ``config.cassette_path`` set, calls are recorded to or replayed from
+    a cassette instead, and the response cache is bypassed; a pure replay
+    builds no LiteLLM model at all.
+    """
+    profile = config.profile(agent)
+    if profile.temperature is not None:
+        params["temperature"] = profile.temperature
+    if config.cassette_path:
+        from google_adk_test.cassette import CassetteLlm, get_cassette
+
+        return CassetteLlm(
+            model=profile.model,
+            inner=None if config.replaying else _build_routed_llm(config, profile, priority, params),
+            cassette=get_cassette(config),
+            agent=agent or profile.model,
+            params=params,
+            latency_scale=config.cassette_latency,
+        )
+    llm = _build_routed_llm(config, profile, priority, params)
+    response_cache = get_response_cache(config) if cache else None
+    if response_cache is None:
+        return llm
+    return CachedLlm(
+        model=llm.model,
+        inner=llm,
+        cache=response_cache,
+        # The default OpenAI endpoint has no api_base.
+        endpoint=config.api_base or "openai",
+        params=params,
+    )
+
+
+def _build_routed_llm(
+    config: OpenAIConfig, profile: ModelProfile, priority: int, params: dict[str, Any]
+) -> BaseLlm:
+    # Imported on first use: loading LiteLLM takes seconds.
+    from google.adk.models.lite_llm import LiteLlm
+
+    routes: list[BaseLlm] = []
+    for model in (profile.model, *profile.fallback):
+        llm = LiteLlm(model=model, **params, **config.litellm_kwargs())
+        routes.append(
+            ScheduledLlm(
+                model=llm.model,
+                inner=llm,
+                scheduler=get_scheduler(config, model),
+                priority=priority,
+                max_retries=config.max_retries,
+                hedge=config.hedge,
+            )
+        )
+    llm = routes[0]
+    if len(routes) > 1:
+        llm = FallbackLlm(
+            model=llm.model,
+            routes=routes,
+            health=[endpoint_health(config.api_base, route.model) for route in routes],
+            slo_p95_ms=config.slo_p95_ms,
+            slo_error_rate=config.slo_error_rate,
+        )
+    return llm
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import mimetypes
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+import pypdfium2
+from google.adk.runners import Runner
+from google.genai import types
+from loguru import logger
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+PDF_RENDER_DPI = 200
+
+_SECTION_RE = re.compile(
+    r"Detected Text:\s*(?P<text>.*?)(?:\n\s*Notes:\s*(?P<notes>.*))?\s*$", re.S
+)
+
+
+class _PdfSource:
+    """One PDF whose pages are rendered to PNG on demand.
+
+    The document is opened on the first render and closed once every page
+    has been released, so a backfill holds only the PDFs it is working on.
+    PDFium is not thread-safe, so rendering is serialized per document.
+    """
+
+    def __init__(self, path: Path, dpi: int) -> None:
+        self.path = path
+        self.scale = dpi / 72
+        document = pypdfium2.PdfDocument(path)
+        try:
+            self.pages = len(document)
+        finally:
+            document.close()
+        self._document: pypdfium2.PdfDocument | None = None
+        self._unreleased = self.pages
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.pages
+
+    def render(self, index: int) -> bytes:
+        with self._lock:
+            if self._document is None:
+                self._document = pypdfium2.PdfDocument(self.path)
+            bitmap = self._document[index].render(scale=self.scale, grayscale=True)
+            image = bitmap.to_pil()
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def release(self) -> None:
+        """Mark one page as done; the last one closes the document."""
+        with self._lock:
+            self._unreleased -= 1
+            if self._unreleased <= 0 and self._document is not None:
+                self._document.close()
+                self._document = None
+
+
+@dataclass(slots=True)
+class OcrPage:
+    """A single image to transcribe: an image file or one page of a PDF."""
+
+    id: str
+    path: Path
+    page: int | None = None
+    pdf: _PdfSource | None = None
+
+    async def load(self) -> tuple[bytes, str]:
+        """Read (or render) the page off the event loop; returns bytes and mime type."""
+        if self.pdf is not None:
+            return await asyncio.to_thread(self.pdf.render, self.page), "image/png"
+        mime_type = mimetypes.guess_type(self.path.name)[0] or "image/png"
+        return await asyncio.to_thread(self.path.read_bytes), mime_type
+
+    def release(self) -> None:
+        """Call once the page is done (or skipped) so its PDF can be closed."""
+        if self.pdf is not None:
+            self.pdf.release()
+
+
+def iter_pages(path: Path, *, dpi: int = PDF_RENDER_DPI) -> list[OcrPage]:
+    """List the pages under ``path``: an image, a PDF, or a directory of either.
+
+    Page ids are relative to ``path`` (``scan.pdf#3`` for PDF pages) so they
+    stay stable across runs and can be used as checkpoint keys.
+    """
+    if path.is_dir():
+        files = sorted(
+            candidate
+            for candidate in path.rglob("*")
+            if candidate.is_file() and candidate.suffix.lower() in IMAGE_SUFFIXES | {".pdf"}
+        )
+        root = path
+    else:
+        files = [path]
+        root = path.parent
+
+    pages: list[OcrPage] = []
+    for file in files:
+        name = file.relative_to(root).as_posix()
+        if file.suffix.lower() == ".pdf":
+            pdf = _PdfSource(file, dpi)
+            pages.extend(
+                OcrPage(id=f"{name}#{index + 1}", path=file, page=index, pdf=pdf)
+                for index in range(len(pdf))
+            )
+        elif file.suffix.lower() in IMAGE_SUFFIXES:
+            pages.append(OcrPage(id=name, path=file))
+        else:
+            raise ValueError(f"Unsupported OCR input '{file}'. Expected an image or a PDF.")
+    return pages
+
+
+class OcrCheckpoint:
+    """Append-only record of page ids that were transcribed successfully."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.done: set[str] = set()
+        if path.exists():
+            self.done = {line.strip() for line in path.read_text(encoding="utf-8").splitlines()}
+            self.done.discard("")
+        self._handle = path.open("a", encoding="utf-8")
+
+    def mark(self, page_id: str) -> None:
+        self.done.add(page_id)
+        self._handle.write(page_id + "\n")
+        self._handle.flush()
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+def parse_ocr_answer(text: str | None) -> dict[str, str | None]:
+    """Split the OCR agent's "Detected Text / Notes" answer into its two sections."""
+    match = _SECTION_RE.search(text or "")
+    if match is None:
+        return {"detected_text": text, "notes": None}
+    notes = match.group("notes")
+    return {
+        "detected_text": match.group("text").strip(),
+        "notes": notes.strip() if notes else None,
+    }
+
+
+async def transcribe_page(runner: Runner, page: OcrPage, *, user: str) -> dict[str, Any]:
+    """Run the OCR agent on one page in a throwaway session."""
+    started = time.perf_counter()
+    final: str | None = None
+    error: str | None = None
+
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user)
+    try:
+        data, mime_type = await page.load()
+        message = types.Content(
+            role="user",
+            parts=[
+                types.Part(text="Transcribe this page."),
+                types.Part(inline_data=types.Blob(data=data, mime_type=mime_type)),
+            ],
+        )
+        async for event in runner.run_async(
+            user_id=user, session_id=session.id, new_message=message
+        ):
+            if event.author != "user" and event.content and event.content.parts:
+                text = "".join(part.text for part in event.content.parts if part.text)
+                final = text or final
+    except Exception as exc:  # noqa: BLE001 - one bad page must not stop the backfill
+        logger.warning("OCR page {} failed: {}", page.id, exc)
+        error = f"{type(exc).__name__}: {exc}"
+    finally:
+        await runner.session_service.delete_session(
+            app_name=runner.app_name, user_id=user, session_id=session.id
+        )
+
+    sections = parse_ocr_answer(final)
+    if error is None and not sections["detected_text"]:
+        # Retried like an error instead of being checkpointed as done.
+        error = "EmptyTranscription: the agent returned no text."
+    return {
+        "id": page.id,
+        "source": str(page.path),
+        "page": None if page.page is None else page.page + 1,
+        "latency_s": round(time.perf_counter() - started, 4),
+        **sections,
+        "error": error,
+    }
+
+
+def drop_results(output: Path, page_ids: set[str]) -> int:
+    """Remove earlier result lines for ``page_ids`` from ``output``; returns how many.
+
+    Lines that are not valid JSON, such as one cut short by a crash, are
+    dropped too so the next append starts on a clean line.
+    """
+    if not page_ids or not output.exists():
+        return 0
+    dropped = 0
+    partial = output.with_name(output.name + ".tmp")
+    with output.open(encoding="utf-8") as source, partial.open("w", encoding="utf-8") as target:
+        for line in source:
+            try:
+                page_id = json.loads(line).get("id")
+            except (json.JSONDecodeError, AttributeError):
+                page_id = None
+            if page_id is None or page_id in page_ids:
+                dropped += 1
+                continue
+            target.write(line if line.endswith("\n") else line + "\n")
+    os.replace(partial, output)
+    return dropped
+
+
+async def run_ocr_batch(
+    runner: Runner,
+    pages: Iterable[OcrPage],
+    *,
+    user: str,
+    output: Path,
+    checkpoint: OcrCheckpoint,
+    concurrency: int,
+) -> dict[str, int]:
+    """Transcribe pages with ``concurrency`` workers, appending each result to ``output``.
+
+    Pages already in ``checkpoint`` are skipped, and a page is only marked done
+    once its result line has been flushed, so an interrupted run can resume.
+    Lines left by earlier attempts at the remaining pages are removed first,
+    so ``output`` holds one line per page. Results are only written to
+    ``output``; the counts of ``transcribed`` and ``failed`` pages are returned.
+    Pages with an empty transcription count as failed.
+    """
+    todo: list[OcrPage] = []
+    for page in pages:
+        if page.id in checkpoint.done:
+            page.release()
+        else:
+            todo.append(page)
+    if dropped := drop_results(output, {page.id for page in todo}):
+        logger.info("Removed {} earlier result lines for pages being retried", dropped)
+    pending = iter(todo)
+    counts = {"transcribed": 0, "failed": 0}
+
+    with output.open("a", encoding="utf-8") as handle:
+
+        async def _worker() -> None:
+            # Workers pull from one shared iterator, so only `concurrency` pages are in memory.
+            for page in pending:
+                try:
+                    result = await transcribe_page(runner, page, user=user)
+                finally:
+                    page.release()
+                handle.write(json.dumps(result, ensure_ascii=False) + "\n")
+                handle.flush()
+                if result["error"] is None:
+                    checkpoint.mark(page.id)
+                counts["failed" if result["error"] else "transcribed"] += 1
+                logger.debug("OCR page {} finished in {:.2f}s", page.id, result["latency_s"])
+
+        await asyncio.gather(*(_worker() for _ in range(concurrency)))
+    return counts
@@ -3,11 +3,16 @@ from __future__ import annotations
 from textwrap import dedent
 
 from google.adk import Agent
-from google.adk.models.lite_llm import LiteLlm
 
 
 from google_adk_test.agents import (
     build_math_agent,
+    context_pruner,
+    creativity_gate_callback,
+    fast_path_enabled,
+    handoff_enabled,
+    pipeline_mode_from_env,
+    template_synthesizer_enabled,
     build_orchestrator,
     build_poetry_agent,
     build_ocr_specialist,
@@ -15,23 +20,60 @@ from google_adk_test.agents import (
     build_math_tool_agent,
     build_poetry_tool_agent,
 )
+from google_adk_test.llm_cache import build_llm
 from google_adk_test.settings import OpenAIConfig
+from google_adk_test.telemetry import instrument_agent
 
 
-def _build_specialists(config: OpenAIConfig) -> tuple[Agent, Agent, Agent]:
-    math_agent = build_math_agent(config)
-    poetry_agent = build_poetry_agent(config)
-    synth_agent = build_synthesizer_agent(config)
+def _build_specialists(
+    config: OpenAIConfig,
+    *,
+    gate_poetry: bool = False,
+    handoff: bool = False,
+    template: bool = False,
+) -> tuple[Agent, Agent, Agent]:
+    math_agent = build_math_agent(config, handoff=handoff)
+    poetry_agent = build_poetry_agent(
+        config,
+        before_agent_callback=creativity_gate_callback if gate_poetry else None,
+        handoff=handoff,
+    )
+    synth_agent = build_synthesizer_agent(config, handoff=handoff, template=template)
     return math_agent, poetry_agent, synth_agent
 
 
-def build_math_orchestrator(config: OpenAIConfig) -> Agent:
-    """Deterministic math → poetry → synthesizer pipeline."""
+def build_math_orchestrator(
+    config: OpenAIConfig,
+    *,
+    fast_path: bool | None = None,
+    mode: str | None = None,
+    handoff: bool | None = None,
+    template: bool | None = None,
+) -> Agent:
+    """Deterministic math → poetry → synthesizer pipeline.
+
+    ``fast_path`` defaults to the ``MATH_FAST_PATH`` environment variable,
+    ``mode`` (sequential, conditional or parallel) to ``MATH_PIPELINE_MODE``,
+    ``handoff`` (structured results in session state) to ``MATH_STATE_HANDOFF``
+    and ``template`` (template synthesizer when there is no poem, requires
+    ``handoff``) to ``MATH_TEMPLATE_SYNTHESIZER``.
+    """
     config.apply()
-    math_agent, poetry_agent, synth_agent = _build_specialists(config)
+    mode = mode or pipeline_mode_from_env()
+    handoff = handoff_enabled() if handoff is None else handoff
+    template = template_synthesizer_enabled() if template is None else template
+    math_agent, poetry_agent, synth_agent = _build_specialists(
+        config,
+        gate_poetry=mode != "sequential",
+        handoff=handoff,
+        template=template,
+    )
     return build_orchestrator(
         config,
         sub_agents=[math_agent, poetry_agent, synth_agent],
+        fast_path=fast_path_enabled() if fast_path is None else fast_path,
+        mode=mode,
+        handoff=handoff,
     )
 
 
@@ -43,7 +85,7 @@ def build_reasoning_tool_orchestrator(config: OpenAIConfig) -> Agent:
     poetry_tool = build_poetry_tool_agent(config)
     synth_agent = build_synthesizer_agent(config)
 
-    return Agent(
+    agent = Agent(
         name="reasoning_tool_orchestrator",
         description="Uses math/poetry tools and delegates final messaging to the synthesizer agent.",
         instruction=dedent(
@@ -62,13 +104,11 @@ def build_reasoning_tool_orchestrator(config: OpenAIConfig) -> Agent:
         ).strip(),
         tools=[math_tool, poetry_tool],
         sub_agents=[synth_agent],
-        model=LiteLlm(
-            model=config.model,
-            temperature=config.temperature,
-            http_client=None,
-        ),
+        model=build_llm(config, agent="reasoning_tool_orchestrator", cache=True, temperature=config.temperature),
         disallow_transfer_to_parent=True,
+        before_model_callback=context_pruner(6000),
     )
+    return instrument_agent(agent)
 
 
 def build_ocr_agent(config: OpenAIConfig) -> Agent:
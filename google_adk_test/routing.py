@@ -0,0 +1,158 @@
+"""Latency- and error-aware failover between the models configured for an agent."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from loguru import logger
+
+# Health is judged on the calls of the last minute, once there are enough of them.
+WINDOW_SECONDS = 60.0
+MIN_SAMPLES = 10
+# A model that breached its SLO gets no traffic for this long, then a fresh window.
+COOLDOWN_SECONDS = 30.0
+
+
+class EndpointHealth:
+    """Rolling latency and error rate of one model endpoint, with a circuit breaker.
+
+    When the window's p95 latency or error rate breaches the SLO the endpoint
+    is tripped: routers skip it for ``COOLDOWN_SECONDS`` and then try it again
+    with an empty window.
+    """
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self._lock = threading.Lock()
+        self._samples: deque[tuple[float, float, bool]] = deque(maxlen=500)
+        self.calls = 0
+        self.errors = 0
+        self.trips = 0
+        self.tripped_until = 0.0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.tripped_until
+
+    def record(self, seconds: float, ok: bool, *, slo_p95_ms: float, slo_error_rate: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.calls += 1
+            self.errors += not ok
+            self._samples.append((now, seconds, ok))
+            self._expire(now)
+            if len(self._samples) < MIN_SAMPLES:
+                return
+            p95, error_rate = self._window()
+            if p95 * 1000 <= slo_p95_ms and error_rate <= slo_error_rate:
+                return
+            self.trips += 1
+            self.tripped_until = now + COOLDOWN_SECONDS
+            self._samples.clear()
+        logger.warning(
+            "Model {} breached its SLO (p95 {:.0f} ms, {:.0%} errors); failing over for {:.0f}s",
+            self.model,
+            p95 * 1000,
+            error_rate,
+            COOLDOWN_SECONDS,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._expire(time.monotonic())
+            p95, error_rate = self._window() if self._samples else (0.0, 0.0)
+            return {
+                "model": self.model,
+                "calls": self.calls,
+                "errors": self.errors,
+                "window_p95_ms": round(p95 * 1000, 2),
+                "window_error_rate": round(error_rate, 4),
+                "trips": self.trips,
+                "tripped": not self.available(),
+            }
+
+    def _expire(self, now: float) -> None:
+        while self._samples and self._samples[0][0] < now - WINDOW_SECONDS:
+            self._samples.popleft()
+
+    def _window(self) -> tuple[float, float]:
+        latencies = sorted(seconds for _, seconds, _ in self._samples)
+        failures = sum(not ok for _, _, ok in self._samples)
+        return latencies[int(0.95 * (len(latencies) - 1))], failures / len(self._samples)
+
+
+# Shared by every agent using the same endpoint and model, so all of them see an outage.
+_ENDPOINTS: dict[tuple[str | None, str], EndpointHealth] = {}
+
+
+def endpoint_health(api_base: str | None, model: str) -> EndpointHealth:
+    """Return the process-wide health tracker for ``model`` at ``api_base``."""
+    health = _ENDPOINTS.get((api_base, model))
+    if health is None:
+        health = _ENDPOINTS[(api_base, model)] = EndpointHealth(model)
+    return health
+
+
+def routing_stats() -> list[dict[str, Any]]:
+    """Health counters for every model endpoint used in this process."""
+    return [health.stats() for health in _ENDPOINTS.values()]
+
+
+class FallbackLlm(BaseLlm):
+    """Send each call to the first healthy model in ``routes``, failing over on errors.
+
+    ``routes[0]`` is the agent's primary model and the rest are fallbacks, in
+    order. Models whose :class:`EndpointHealth` is tripped are tried last. A
+    call that raises before producing any output moves on to the next model.
+    Answers from a fallback are tagged with ``custom_metadata["fallback_model"]``.
+    """
+
+    routes: list[BaseLlm]
+    health: list[EndpointHealth]
+    slo_p95_ms: float
+    slo_error_rate: float
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        order = sorted(range(len(self.routes)), key=lambda index: not self.health[index].available())
+        for position, index in enumerate(order):
+            route, health = self.routes[index], self.health[index]
+            started = time.perf_counter()
+            produced = False
+            queue_wait = 0.0
+            try:
+                async for response in route.generate_content_async(llm_request, stream=stream):
+                    if not response.partial:
+                        # Waiting for the local rate budget says nothing about the endpoint.
+                        queue_wait = (response.custom_metadata or {}).get("queue_wait_ms", 0) / 1000
+                        if index:
+                            response.custom_metadata = {
+                                **(response.custom_metadata or {}),
+                                "fallback_model": route.model,
+                            }
+                    produced = True
+                    yield response
+            except Exception as exc:
+                health.record(
+                    time.perf_counter() - started,
+                    False,
+                    slo_p95_ms=self.slo_p95_ms,
+                    slo_error_rate=self.slo_error_rate,
+                )
+                if produced or position == len(order) - 1:
+                    raise
+                logger.warning("Model {} failed ({}); falling back to the next model", route.model, exc)
+                continue
+            health.record(
+                time.perf_counter() - started - queue_wait,
+                True,
+                slo_p95_ms=self.slo_p95_ms,
+                slo_error_rate=self.slo_error_rate,
+            )
+            return
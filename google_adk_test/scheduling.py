@@ -0,0 +1,402 @@
+"""Process-wide request scheduling for LLM calls: rate budgets, priority, retries, hedging."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from loguru import logger
+from pydantic import PrivateAttr
+
+from google_adk_test.settings import OpenAIConfig
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# Full-jitter exponential backoff: attempt n sleeps up to min(cap, base * 2**n).
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+# Hedge only once this many latencies are known, and only this often at most.
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MAX_FRACTION = 0.1
+# Output tokens assumed for the TPM budget when the request sets no limit.
+DEFAULT_OUTPUT_TOKENS = 512
+_LATENCY_SAMPLES = 200
+_BURST_SECONDS = 6.0
+_MIN_SCALE = 0.1
+# A burst of 429s from calls already in flight counts as one signal.
+_BACKOFF_WINDOW = 1.0
+
+
+class Priority(IntEnum):
+    """Order in which queued calls are admitted; lower runs first."""
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class _TokenBucket:
+    """Refills ``per_minute`` units a minute, holding at most ``_BURST_SECONDS`` worth.
+
+    A small burst keeps any rolling minute within ~110% of the budget; a full
+    minute's burst plus refill would allow twice the rate.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * _BURST_SECONDS)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float, scale: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate * scale)
+        self.updated = now
+
+    def delay(self, amount: float, scale: float) -> float:
+        """Seconds until ``amount`` is available (0 when it is already)."""
+        # A request larger than the whole burst waits for a full bucket instead of forever.
+        missing = min(amount, self.capacity) - self.level
+        return 0.0 if missing <= 0 else missing / (self.rate * scale)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    sequence: int
+    tokens: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+
+class RequestScheduler:
+    """Admits LLM calls under requests/tokens-per-minute budgets, highest priority first.
+
+    Budgets are token buckets (``0`` = unlimited). Admission is strictly by
+    priority, then arrival. A 429 cuts the admitted rate by a quarter (at most
+    once a second) and pauses admission for the server's ``Retry-After``;
+    every success wins back 2% of the configured rate. Waiters can belong to different event loops: each
+    is woken on its own loop.
+    """
+
+    def __init__(self, *, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = _TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._queue: list[_Waiter] = []
+        self._sequence = itertools.count()
+        self._scale = 1.0
+        self._paused_until = 0.0
+        self._slowed_at = -math.inf
+        self._timer_at = math.inf
+        self.admitted = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._waits: deque[float] = deque(maxlen=2_048)
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    async def acquire(self, tokens: int, priority: int = Priority.NORMAL) -> float:
+        """Wait for a slot and return the seconds spent queueing."""
+        started = time.monotonic()
+        waiter = _Waiter(priority, next(self._sequence), tokens, asyncio.get_running_loop().create_future())
+        with self._lock:
+            heapq.heappush(self._queue, waiter)
+            self._admit()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                waiter.cancelled = True
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._refund(waiter.tokens)
+                self._admit()
+            raise
+        waited = time.monotonic() - started
+        with self._lock:
+            self._waits.append(waited)
+        return waited
+
+    def settle(self, estimated: int, actual: int | None) -> None:
+        """Correct the token budget once the real usage of a call is known."""
+        if self._tokens is None or actual is None:
+            return
+        with self._lock:
+            self._tokens.level -= actual - estimated
+            self._admit()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._scale = min(1.0, self._scale + 0.02)
+
+    def record_failure(self, exc: BaseException, attempt: int) -> float | None:
+        """Backoff before retrying ``exc``, or ``None`` when it is not retryable."""
+        status = getattr(exc, "status_code", None)
+        transient = isinstance(exc, (asyncio.TimeoutError, ConnectionError))
+        if status not in RETRYABLE_STATUS_CODES and not transient:
+            return None
+        retry_after = _retry_after(exc)
+        with self._lock:
+            self.retries += 1
+            if status == 429:
+                self.rate_limited += 1
+                now = time.monotonic()
+                if now - self._slowed_at >= _BACKOFF_WINDOW:
+                    self._slowed_at = now
+                    self._scale = max(_MIN_SCALE, self._scale * 0.75)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+        backoff = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+        return max(backoff, retry_after or 0.0)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "admitted": self.admitted,
+                "queued": len(self._queue),
+                "queue_wait_p50_ms": round(waits[len(waits) // 2] * 1000, 2) if waits else 0.0,
+                "queue_wait_p95_ms": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 2) if waits else 0.0,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "rate_scale": round(self._scale, 3),
+            }
+
+    def _refund(self, tokens: int) -> None:
+        if self._requests is not None:
+            self._requests.level += 1
+        if self._tokens is not None:
+            self._tokens.level += tokens
+
+    def _delay(self, waiter: _Waiter, now: float) -> float:
+        delay = self._paused_until - now
+        for bucket, amount in ((self._requests, 1), (self._tokens, waiter.tokens)):
+            if bucket is not None:
+                bucket.refill(now, self._scale)
+                delay = max(delay, bucket.delay(amount, self._scale))
+        return delay
+
+    def _admit(self) -> None:
+        # Called with the lock held whenever budgets or the queue change.
+        now = time.monotonic()
+        while self._queue:
+            head = self._queue[0]
+            if head.cancelled or head.future.done():
+                heapq.heappop(self._queue)
+                continue
+            delay = self._delay(head, now)
+            if delay > 0:
+                self._wake_at(now + delay, head.future.get_loop())
+                return
+            heapq.heappop(self._queue)
+            if self._requests is not None:
+                self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= head.tokens
+            self.admitted += 1
+            head.future.get_loop().call_soon_threadsafe(_resolve, head.future)
+
+    def _wake_at(self, when: float, loop: asyncio.AbstractEventLoop) -> None:
+        if when >= self._timer_at > time.monotonic():
+            return
+        self._timer_at = when
+        loop.call_soon_threadsafe(loop.call_later, max(when - time.monotonic(), 0), self._on_timer)
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer_at = math.inf
+            self._admit()
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    for name, scale in (("retry-after-ms", 1000), ("retry-after", 1)):
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value) / scale
+            except ValueError:
+                return None
+    return None
+
+
+def estimate_tokens(llm_request: LlmRequest) -> int:
+    """Rough prompt + completion token count (4 characters per token) for the TPM budget."""
+    characters = sum(
+        len(part.text or "") for content in llm_request.contents for part in content.parts or []
+    )
+    config = llm_request.config
+    if config is not None and isinstance(config.system_instruction, str):
+        characters += len(config.system_instruction)
+    output = (config.max_output_tokens if config is not None else None) or DEFAULT_OUTPUT_TOKENS
+    return characters // 4 + output
+
+
+# One scheduler per API key, endpoint and model: that is what providers rate-limit.
+_SCHEDULERS: dict[tuple[Any, ...], RequestScheduler] = {}
+
+
+def get_scheduler(config: OpenAIConfig, model: str | None = None) -> RequestScheduler:
+    """Return the process-wide scheduler for ``config``'s key and endpoint and ``model``.
+
+    ``model`` defaults to ``config.model``.
+    """
+    key = (config.api_key, config.api_base, model or config.model)
+    scheduler = _SCHEDULERS.get(key)
+    if scheduler is None:
+        scheduler = RequestScheduler(
+            requests_per_minute=config.requests_per_minute,
+            tokens_per_minute=config.tokens_per_minute,
+        )
+        _SCHEDULERS[key] = scheduler
+    return scheduler
+
+
+def scheduler_stats() -> list[dict[str, Any]]:
+    """Counters for every scheduler created in this process."""
+    return [dict(scheduler.stats(), model=key[2]) for key, scheduler in _SCHEDULERS.items()]
+
+
+class ScheduledLlm(BaseLlm):
+    """Run ``inner`` calls through a :class:`RequestScheduler`, retrying transient errors.
+
+    Each attempt waits for a slot at ``priority``. Rate limits, timeouts and 5xx
+    answers are retried up to ``max_retries`` times with jittered backoff, unless
+    a streamed response already produced chunks. With ``hedge``, a non-streaming
+    call still running after this agent's p95 latency gets a duplicate request;
+    the first answer wins. The final response's ``custom_metadata`` records
+    ``queue_wait_ms``, ``retries`` and ``hedged``.
+    """
+
+    inner: BaseLlm
+    scheduler: RequestScheduler
+    priority: int = Priority.NORMAL
+    max_retries: int = 4
+    hedge: bool = False
+    _latencies: deque = PrivateAttr(default_factory=lambda: deque(maxlen=_LATENCY_SAMPLES))
+    # Hedge-eligible calls and the hedges they caused, both for this agent only.
+    _calls: int = PrivateAttr(default=0)
+    _hedges: int = PrivateAttr(default=0)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        estimate = estimate_tokens(llm_request)
+        queue_wait = 0.0
+        attempt = 0
+        while True:
+            queue_wait += await self.scheduler.acquire(estimate, self.priority)
+            started = time.perf_counter()
+            produced = False
+            hedged = False
+            try:
+                if self.hedge and not stream:
+                    responses, hedged = await self._hedged(llm_request, estimate)
+                else:
+                    responses = self.inner.generate_content_async(llm_request, stream=stream)
+                async for response in _iterate(responses):
+                    if not response.partial:
+                        usage = response.usage_metadata
+                        self.scheduler.settle(estimate, usage.total_token_count if usage else None)
+                        response.custom_metadata = {
+                            **(response.custom_metadata or {}),
+                            "queue_wait_ms": round(queue_wait * 1000, 3),
+                            "retries": attempt,
+                            "hedged": hedged,
+                        }
+                    produced = True
+                    yield response
+            except Exception as exc:
+                delay = self.scheduler.record_failure(exc, attempt)
+                if produced or delay is None or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                logger.warning(
+                    "{} call failed ({}); retry {}/{} in {:.2f}s",
+                    self.model,
+                    getattr(exc, "status_code", type(exc).__name__),
+                    attempt,
+                    self.max_retries,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+                continue
+            if not stream:
+                self._latencies.append(time.perf_counter() - started)
+            self.scheduler.record_success()
+            return
+
+    def _hedge_delay(self) -> float | None:
+        if len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    async def _collect(self, llm_request: LlmRequest) -> list[LlmResponse]:
+        return [response async for response in self.inner.generate_content_async(llm_request)]
+
+    async def _hedged(self, llm_request: LlmRequest, estimate: int) -> tuple[list[LlmResponse], bool]:
+        """Run the call, duplicating it if it outlives the p95 latency."""
+        self._calls += 1
+        primary = asyncio.create_task(self._collect(llm_request))
+        delay = self._hedge_delay()
+        if delay is None:
+            return await primary, False
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        # No hedge when calls are already queueing for budget, or hedges exceed their share.
+        if done or self.scheduler.queued or self._hedges >= HEDGE_MAX_FRACTION * self._calls:
+            return await primary, False
+
+        async def _duplicate() -> list[LlmResponse]:
+            await self.scheduler.acquire(estimate, self.priority)
+            return await self._collect(llm_request.model_copy(deep=True))
+
+        self._hedges += 1
+        self.scheduler.hedges += 1
+        hedge = asyncio.create_task(_duplicate())
+        try:
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.scheduler.hedge_wins += task is hedge
+                        return task.result(), True
+            return primary.result(), True
+        finally:
+            for task in (primary, hedge):
+                task.cancel()
+
+
+async def _iterate(responses: Any) -> AsyncGenerator[LlmResponse, None]:
+    if isinstance(responses, list):
+        for response in responses:
+            yield response
+    else:
+        async for response in responses:
+            yield response
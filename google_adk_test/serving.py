@@ -0,0 +1,544 @@
+"""Serve the ADK apps over HTTP from a pool of worker processes.
+
+``main.py serve`` runs a FastAPI front end in the parent process and spawns
+``workers`` processes that each build their agents and Runners once at boot.
+Sessions live in the worker that created them, so a request is routed by a
+hash of its app, user and session ids and follow-up turns land on the same
+worker. The parent only validates JSON and forwards it: running agents,
+decoding images and serialising events happen in the workers, one core each.
+
+A worker runs up to ``concurrency`` requests at once and holds at most
+``queue_depth`` more; beyond that, and while the server drains on shutdown,
+requests are refused with 503 and ``Retry-After``. A worker that dies is
+replaced, and the requests it held fail with 502; a request without an
+answer after ``request_timeout`` fails with 504.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import uuid
+import zlib
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, Response
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from google_adk_test.coalescing import CoalescingRunner, single_flight_stats
+from google_adk_test.events import summarize_event
+from google_adk_test.settings import OpenAIConfig, aclose_http_clients
+
+if TYPE_CHECKING:
+    from multiprocessing.process import BaseProcess
+    from multiprocessing.queues import Queue
+
+    from google.adk import Runner
+
+# App name -> factory exported by ``google_adk_test``.
+SERVED_APPS = {
+    "math_orchestrator": "build_math_orchestrator",
+    "reasoning_tool_orchestrator": "build_reasoning_tool_orchestrator",
+    "ocr_transcriber": "build_ocr_agent",
+}
+# Apps that take images: pages are one-shot, so they get no artifact store,
+# and a text warm-up prompt would only waste an LLM call on them.
+_IMAGE_APPS = {"ocr_transcriber"}
+_WARMUP_USER = "warmup"
+# How often workers report their session store counters to ``/healthz``.
+_STATS_INTERVAL = 10.0
+# How often the parent checks that its workers are still alive.
+_LIVENESS_INTERVAL = 0.5
+
+
+@dataclass(slots=True)
+class ServeSettings:
+    """Shape of the worker pool behind ``main.py serve``."""
+
+    apps: tuple[str, ...] = tuple(SERVED_APPS)
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    # Requests one worker runs at once, and how many more it may hold waiting.
+    concurrency: int = 16
+    queue_depth: int = 32
+    boot_timeout: float = 180.0
+    drain_timeout: float = 30.0
+    # Seconds a request may wait for its worker's answer.
+    request_timeout: float = 300.0
+    warmup_prompt: str | None = None
+    # SQLite file shared by all workers; ``None`` keeps each worker's sessions in memory.
+    session_db: str | None = None
+    # OCR preprocessing processes per worker (``OCR_WORKERS``); ``0`` uses a thread,
+    # since the workers already spread requests over the cores.
+    image_workers: int = 0
+    debug: bool = False
+
+    @property
+    def max_pending(self) -> int:
+        return self.concurrency + self.queue_depth
+
+
+class PoolBusyError(RuntimeError):
+    """The worker owning a session has no free slot, or the pool is draining."""
+
+
+class WorkerCrashedError(RuntimeError):
+    """The worker running a request exited before answering."""
+
+
+class RequestTimeoutError(RuntimeError):
+    """The worker running a request did not answer within ``request_timeout``."""
+
+
+def _build_runners(apps: tuple[str, ...], session_db: str | None = None) -> dict[str, CoalescingRunner]:
+    import google_adk_test
+    from google.adk import Runner
+    from google.adk.artifacts.in_memory_artifact_service import InMemoryArtifactService
+    from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
+
+    from google_adk_test.session_cache import BoundedSessionService
+    from google_adk_test.telemetry import TracingPlugin
+
+    config = OpenAIConfig.from_env()
+    if session_db:
+        from google_adk_test.storage import open_session_store
+
+        session_service, artifact_service = open_session_store(session_db)
+    else:
+        # One service for all apps, so the ``SESSION_*`` memory budget covers the whole worker.
+        session_service, artifact_service = BoundedSessionService(), InMemoryArtifactService()
+    runners = {}
+    for name in apps:
+        agent = getattr(google_adk_test, SERVED_APPS[name])(config)
+        runner = Runner(
+            app_name=name,
+            agent=agent,
+            session_service=session_service,
+            artifact_service=None if name in _IMAGE_APPS else artifact_service,
+            memory_service=InMemoryMemoryService(),
+            plugins=[TracingPlugin()],
+        )
+        # Coalescing is per worker; ``WorkerPool.new_session_id`` keeps identical
+        # prompts on one worker so they can meet.
+        runners[name] = CoalescingRunner(runner)
+    return runners
+
+
+async def _run_job(runner: Runner, job: dict[str, Any]) -> dict[str, Any]:
+    """Run one request on ``runner``, creating its session on first use."""
+    from google.genai import types
+
+    started = time.perf_counter()
+    service = runner.session_service
+    user, session_id = job["user_id"], job["session_id"]
+    if await service.get_session(app_name=runner.app_name, user_id=user, session_id=session_id) is None:
+        await service.create_session(app_name=runner.app_name, user_id=user, session_id=session_id)
+
+    parts = [types.Part(text=job["message"])] if job["message"] else []
+    for image in job["images"]:
+        blob = types.Blob(data=base64.b64decode(image["data"]), mime_type=image["mime_type"])
+        parts.append(types.Part(inline_data=blob))
+
+    events = []
+    async for event in runner.run_async(
+        user_id=user,
+        session_id=session_id,
+        new_message=types.Content(role="user", parts=parts),
+    ):
+        if event.author != "user":
+            events.append(summarize_event(event))
+    final = next((event["text"] for event in reversed(events) if "text" in event), None)
+    return {
+        "session_id": session_id,
+        "final_response": final,
+        "events": events,
+        "latency_s": round(time.perf_counter() - started, 4),
+    }
+
+
+async def _warm_up(runners: dict[str, Runner], prompt: str | None) -> None:
+    """Touch the session store and the request path so the first caller is not slower."""
+    for name, runner in runners.items():
+        session = await runner.session_service.create_session(app_name=name, user_id=_WARMUP_USER)
+        if prompt and name not in _IMAGE_APPS:
+            job = {"user_id": _WARMUP_USER, "session_id": session.id, "message": prompt, "images": []}
+            result = await _run_job(runner, job)
+            logger.debug("Warm-up of {} took {:.2f}s", name, result["latency_s"])
+        await runner.session_service.delete_session(
+            app_name=name, user_id=_WARMUP_USER, session_id=session.id
+        )
+
+
+def _next_job(inbox: Queue) -> dict[str, Any] | None:
+    """Block for the next job; ``None`` means stop, also sent if the parent died."""
+    # Workers are not daemonic (OCR preprocessing may use its own process pool),
+    # so they watch the parent instead of relying on being killed with it.
+    parent = multiprocessing.parent_process()
+    while True:
+        try:
+            return inbox.get(timeout=1.0)
+        except queue.Empty:
+            if parent is not None and not parent.is_alive():
+                return None
+
+
+async def _report_sessions(index: int, service: Any, outbox: Queue) -> None:
+    while True:
+        outbox.put(("stats", index, service.stats()))
+        await asyncio.sleep(_STATS_INTERVAL)
+
+
+async def _worker_loop(index: int, settings: ServeSettings, inbox: Queue, outbox: Queue) -> None:
+    started = time.perf_counter()
+    runners = _build_runners(settings.apps, settings.session_db)
+    await _warm_up(runners, settings.warmup_prompt)
+    logger.info("Worker {} (pid {}) ready in {:.1f}s", index, os.getpid(), time.perf_counter() - started)
+    outbox.put(("ready", index, os.getpid()))
+
+    semaphore = asyncio.Semaphore(settings.concurrency)
+    tasks: set[asyncio.Task] = set()
+    service = next(iter(runners.values())).session_service
+    reporter = asyncio.create_task(_report_sessions(index, service, outbox))
+
+    async def _serve(job: dict[str, Any]) -> None:
+        async with semaphore:
+            try:
+                result = await _run_job(runners[job["app"]], job)
+                # Serialised here so the front end only copies bytes.
+                outbox.put(("done", job["id"], json.dumps(dict(result, worker=index), default=str)))
+            except Exception as exc:  # noqa: BLE001 - report to the caller, keep serving
+                logger.warning("Worker {} request {} failed: {}", index, job["id"], exc)
+                outbox.put(("failed", job["id"], f"{type(exc).__name__}: {exc}"))
+
+    try:
+        while (job := await asyncio.to_thread(_next_job, inbox)) is not None:
+            task = asyncio.create_task(_serve(job))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+    finally:
+        reporter.cancel()
+        await aclose_http_clients()
+        if (cassette := sys.modules.get("google_adk_test.cassette")) is not None:
+            cassette.close_cassettes()
+        if settings.session_db:
+            from google_adk_test.storage import close_session_stores
+
+            close_session_stores()
+    for flight in single_flight_stats.snapshot():
+        logger.info(
+            "Worker {} coalesced {:.1%} of {} {} requests",
+            index,
+            flight["coalescing_ratio"],
+            flight["requests"],
+            flight["app"],
+        )
+    if "bytes" in (sessions := service.stats()):
+        logger.info(
+            "Worker {} held {} sessions in {:.1f} MB; {} expired, {} evicted, {} events trimmed",
+            index,
+            sessions["sessions"],
+            sessions["bytes"] / 1024 / 1024,
+            sessions["expired_sessions"],
+            sessions["evicted_sessions"],
+            sessions["trimmed_events"],
+        )
+    outbox.put(("stopped", index, None))
+
+
+def _worker_main(index: int, settings: ServeSettings, inbox: Queue, outbox: Queue) -> None:
+    # Ctrl+C reaches the whole process group; the parent drains and then stops us.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if settings.debug else "INFO")
+    # Read by ``ImageSettings.from_env`` when the OCR agent is built; this
+    # process's environment only, so each worker gets its own small pool.
+    os.environ["OCR_WORKERS"] = str(settings.image_workers)
+    asyncio.run(_worker_loop(index, settings, inbox, outbox))
+
+
+@dataclass(slots=True, eq=False)
+class _Worker:
+    index: int
+    process: BaseProcess
+    inbox: Queue
+    ready: threading.Event = field(default_factory=threading.Event)
+    pending: int = 0
+    restarts: int = 0
+    sessions: dict[str, Any] = field(default_factory=dict)
+
+
+class WorkerPool:
+    """Worker processes plus the routing and bookkeeping in front of them.
+
+    Futures are only touched on the event loop; the reader thread hands
+    results over with ``call_soon_threadsafe``.
+    """
+
+    def __init__(self, settings: ServeSettings) -> None:
+        self.settings = settings
+        self._context = multiprocessing.get_context("spawn")
+        self._outbox: Queue = self._context.Queue()
+        self._workers: list[_Worker] = []
+        self._futures: dict[int, tuple[_Worker, asyncio.Future]] = {}
+        self._ids = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._reader: threading.Thread | None = None
+        self._started = False
+        self._stopping = threading.Event()
+        self._draining = False
+
+    @property
+    def draining(self) -> bool:
+        return self._draining
+
+    def _spawn(self, index: int, restarts: int = 0) -> _Worker:
+        inbox = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.settings, inbox, self._outbox),
+            name=f"adk-worker-{index}",
+        )
+        process.start()
+        return _Worker(index=index, process=process, inbox=inbox, restarts=restarts)
+
+    async def start(self) -> None:
+        """Spawn the workers and wait until every one has built its agents."""
+        self._loop = asyncio.get_running_loop()
+        self._workers = [self._spawn(index) for index in range(self.settings.workers)]
+        self._reader = threading.Thread(target=self._read_results, name="adk-pool-reader", daemon=True)
+        self._reader.start()
+        logger.info("Starting {} workers for {}", len(self._workers), ", ".join(self.settings.apps))
+
+        deadline = time.monotonic() + self.settings.boot_timeout
+        try:
+            for worker in self._workers:
+                while not await asyncio.to_thread(worker.ready.wait, 0.5):
+                    if not worker.process.is_alive():
+                        raise RuntimeError(
+                            f"Worker {worker.index} exited with code {worker.process.exitcode} "
+                            "while starting; see its log above."
+                        )
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(
+                            f"Worker {worker.index} did not start within {self.settings.boot_timeout}s."
+                        )
+        except BaseException:
+            self._stopping.set()
+            self._join(time.monotonic())
+            raise
+        self._started = True
+
+    def route(self, app: str, user_id: str, session_id: str) -> _Worker:
+        """The worker that owns this session (stable for the pool's lifetime)."""
+        key = f"{app}\0{user_id}\0{session_id}".encode()
+        return self._workers[zlib.crc32(key) % len(self._workers)]
+
+    def new_session_id(self, app: str, user_id: str, message: str) -> str:
+        """A fresh session id owned by the worker that handles ``message``.
+
+        New sessions with the same prompt land on the same worker, where
+        single-flight coalescing can merge them.
+        """
+        normalized = " ".join(message.split()).encode()
+        target = self._workers[zlib.crc32(normalized) % len(self._workers)]
+        for _ in range(64 * len(self._workers)):
+            session_id = uuid.uuid4().hex
+            if self.route(app, user_id, session_id) is target:
+                return session_id
+        return session_id
+
+    async def submit(self, app: str, request: dict[str, Any]) -> str:
+        """Run a request on its session's worker and return the JSON response body."""
+        if self._draining:
+            raise PoolBusyError("Server is shutting down.")
+        worker = self.route(app, request["user_id"], request["session_id"])
+        if not worker.ready.is_set():
+            raise PoolBusyError(f"Worker {worker.index} is restarting.")
+        if worker.pending >= self.settings.max_pending:
+            raise PoolBusyError(f"Worker {worker.index} has {worker.pending} requests queued.")
+
+        job_id = next(self._ids)
+        future = self._loop.create_future()
+        self._futures[job_id] = (worker, future)
+        worker.pending += 1
+        try:
+            worker.inbox.put(dict(request, app=app, id=job_id))
+            return await asyncio.wait_for(future, self.settings.request_timeout)
+        except TimeoutError as exc:
+            raise RequestTimeoutError(
+                f"Worker {worker.index} did not answer within {self.settings.request_timeout}s."
+            ) from exc
+        finally:
+            worker.pending -= 1
+            self._futures.pop(job_id, None)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "worker": worker.index,
+                "pid": worker.process.pid,
+                "alive": worker.process.is_alive(),
+                "ready": worker.ready.is_set(),
+                "pending": worker.pending,
+                "restarts": worker.restarts,
+                "sessions": worker.sessions,
+            }
+            for worker in self._workers
+        ]
+
+    async def close(self) -> None:
+        """Stop taking requests, let in-flight ones finish, then stop the workers."""
+        self._draining = True
+        deadline = time.monotonic() + self.settings.drain_timeout
+        if self._futures:
+            logger.info("Draining {} in-flight requests", len(self._futures))
+        while self._futures and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._stopping.set()
+        for worker in self._workers:
+            worker.inbox.put(None)
+        await asyncio.to_thread(self._join, deadline)
+        if self._reader is not None:
+            self._reader.join()
+
+    def _join(self, deadline: float) -> None:
+        for worker in self._workers:
+            worker.process.join(max(deadline - time.monotonic(), 1.0))
+            if worker.process.is_alive():
+                logger.warning("Worker {} did not stop in time; terminating", worker.index)
+                worker.process.terminate()
+                worker.process.join()
+
+    def _read_results(self) -> None:
+        next_check = time.monotonic()
+        while not (self._stopping.is_set() and not any(w.process.is_alive() for w in self._workers)):
+            # Checked on a timer, not only when the outbox is idle: stats and
+            # answers from the other workers must not hide a dead one.
+            if time.monotonic() >= next_check:
+                next_check = time.monotonic() + _LIVENESS_INTERVAL
+                if self._started and not self._stopping.is_set():
+                    self._replace_dead_workers()
+            try:
+                kind, key, payload = self._outbox.get(timeout=_LIVENESS_INTERVAL)
+            except queue.Empty:
+                continue
+            if kind == "ready":
+                self._workers[key].ready.set()
+            elif kind == "stats":
+                self._workers[key].sessions = payload
+            elif kind in {"done", "failed"}:
+                self._loop.call_soon_threadsafe(self._resolve, key, kind, payload)
+
+    def _resolve(self, job_id: int, kind: str, payload: str) -> None:
+        entry = self._futures.get(job_id)
+        if entry is None or entry[1].done():
+            return
+        if kind == "done":
+            entry[1].set_result(payload)
+        else:
+            entry[1].set_exception(RuntimeError(payload))
+
+    def _replace_dead_workers(self) -> None:
+        for worker in list(self._workers):
+            if worker.process.is_alive():
+                continue
+            logger.error("Worker {} exited with code {}; restarting", worker.index, worker.process.exitcode)
+            self._workers[worker.index] = self._spawn(worker.index, worker.restarts + 1)
+            self._loop.call_soon_threadsafe(self._fail_pending, worker)
+
+    def _fail_pending(self, dead: _Worker) -> None:
+        # Matched by identity: the replacement reuses the index and may already hold requests.
+        for worker, future in self._futures.values():
+            if worker is dead and not future.done():
+                future.set_exception(WorkerCrashedError(f"Worker {dead.index} exited during the request."))
+
+
+class ImageInput(BaseModel):
+    data: str = Field(description="Base64-encoded image bytes.")
+    mime_type: str = "image/png"
+
+
+class RunRequest(BaseModel):
+    message: str = ""
+    user_id: str = "api-user"
+    session_id: str | None = Field(
+        default=None, description="Continue this session; a new one is created when omitted."
+    )
+    images: list[ImageInput] = Field(default_factory=list)
+
+
+def create_server(settings: ServeSettings) -> FastAPI:
+    """FastAPI app whose lifespan starts and drains a ``WorkerPool``."""
+    unknown = sorted(set(settings.apps) - set(SERVED_APPS))
+    if unknown:
+        raise ValueError(f"Unknown apps {unknown}; choose from {sorted(SERVED_APPS)}.")
+    pool = WorkerPool(settings)
+
+    @asynccontextmanager
+    async def lifespan(_server: FastAPI):
+        await pool.start()
+        try:
+            yield
+        finally:
+            await pool.close()
+
+    server = FastAPI(title="ADK agents", lifespan=lifespan)
+    server.state.pool = pool
+
+    @server.get("/healthz")
+    async def healthz() -> dict[str, Any]:
+        workers = pool.snapshot()
+        ready = all(worker["ready"] for worker in workers)
+        status = "draining" if pool.draining else "ok" if ready else "degraded"
+        return {"status": status, "apps": list(settings.apps), "workers": workers}
+
+    @server.post("/apps/{app_name}/run")
+    async def run_app(app_name: str, request: RunRequest) -> Response:
+        if app_name not in settings.apps:
+            raise HTTPException(status_code=404, detail=f"Unknown app '{app_name}'.")
+        if not request.message and not request.images:
+            raise HTTPException(status_code=422, detail="Send a message, images, or both.")
+        payload = request.model_dump()
+        payload["session_id"] = request.session_id or pool.new_session_id(
+            app_name, request.user_id, request.message
+        )
+        try:
+            body = await pool.submit(app_name, payload)
+        except PoolBusyError as exc:
+            return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"})
+        except WorkerCrashedError as exc:
+            raise HTTPException(status_code=502, detail=str(exc)) from exc
+        except RequestTimeoutError as exc:
+            raise HTTPException(status_code=504, detail=str(exc)) from exc
+        except RuntimeError as exc:
+            raise HTTPException(status_code=500, detail=str(exc)) from exc
+        return Response(body, media_type="application/json")
+
+    return server
+
+
+def serve(settings: ServeSettings, *, host: str, port: int) -> None:
+    """Run the front end with uvicorn until interrupted, then drain."""
+    import uvicorn
+
+    uvicorn.run(
+        create_server(settings),
+        host=host,
+        port=port,
+        log_level="debug" if settings.debug else "info",
+        timeout_graceful_shutdown=int(settings.drain_timeout),
+    )
@@ -0,0 +1,313 @@
+"""Bounded in-memory sessions: idle expiry, LRU eviction and byte budgets.
+
+ADK's ``InMemorySessionService`` keeps every session and its whole event
+history for the life of the process, including the inline images of OCR
+uploads, so long-running servers grow until they run out of memory.
+:class:`BoundedSessionService` is a drop-in replacement that enforces
+:class:`SessionLimits`; :class:`SessionBoundsPlugin` applies the same limits
+to the in-memory service ``adk web`` creates for the ``agents/`` apps.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.adk.sessions.session import Session
+from loguru import logger
+
+_MB = 1024 * 1024
+
+_SessionKey = tuple[str, str, str]
+
+
+@dataclass(slots=True)
+class SessionLimits:
+    """How much session history an in-memory service may hold; ``0`` disables a limit.
+
+    Sessions idle for ``ttl_seconds`` are dropped. Each session keeps at most
+    ``max_events`` events and ``max_session_bytes`` of events plus state, and
+    all sessions together at most ``max_total_bytes``; beyond that the least
+    recently used sessions are evicted. Sizes are estimated from the JSON
+    form of events and session state.
+    """
+
+    ttl_seconds: float = 3600.0
+    max_events: int = 500
+    max_session_bytes: int = 16 * _MB
+    max_total_bytes: int = 512 * _MB
+
+    @classmethod
+    def from_env(cls) -> "SessionLimits":
+        """Build limits from ``SESSION_TTL``, ``SESSION_MAX_EVENTS``, ``SESSION_MAX_MB`` and ``SESSION_CACHE_MB``."""
+        values: dict[str, Any] = {}
+        for name, env, scale in (
+            ("ttl_seconds", "SESSION_TTL", 1),
+            ("max_events", "SESSION_MAX_EVENTS", 1),
+            ("max_session_bytes", "SESSION_MAX_MB", _MB),
+            ("max_total_bytes", "SESSION_CACHE_MB", _MB),
+        ):
+            raw = os.getenv(env)
+            if raw is None:
+                continue
+            try:
+                value = float(raw) * scale
+            except ValueError as exc:
+                raise ValueError(f"{env} must be numeric, got '{raw}'.") from exc
+            values[name] = value if name == "ttl_seconds" else int(value)
+        return cls(**values)
+
+
+def _event_bytes(event: Event) -> int:
+    return len(event.model_dump_json(exclude_none=True))
+
+
+def _state_bytes(state: dict[str, Any]) -> int:
+    return len(json.dumps(state, default=str)) if state else 0
+
+
+@dataclass
+class _Entry:
+    """What the ledger knows about one stored session."""
+
+    touched: float
+    state_bytes: int = 0
+    events_bytes: int = 0
+    # Parallel to the stored session's ``events``.
+    event_bytes: list[int] = field(default_factory=list)
+
+    @property
+    def bytes(self) -> int:
+        return self.state_bytes + self.events_bytes
+
+
+class SessionLedger:
+    """Byte accounting and LRU order for the sessions of one ``InMemorySessionService``.
+
+    Works on the service's own storage (``service.sessions``): :meth:`sync`
+    measures events appended since the last call, trims the session and then
+    evicts other sessions until the limits hold again.
+    """
+
+    def __init__(self, service: InMemorySessionService, limits: SessionLimits) -> None:
+        self.service = service
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[_SessionKey, _Entry] = OrderedDict()
+        self.total_bytes = 0
+        self.trimmed_events = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def touch(self, key: _SessionKey) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.touched = time.monotonic()
+                self._entries.move_to_end(key)
+
+    def sync(self, key: _SessionKey, *, state_changed: bool = True) -> None:
+        """Account for ``key``'s new events (and state), then enforce every limit."""
+        stored = self._stored(key)
+        with self._lock:
+            if stored is None:
+                self._drop_entry(key)
+                return
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(touched=0.0)
+            entry.touched = time.monotonic()
+            self._entries.move_to_end(key)
+            before = entry.bytes
+            if len(entry.event_bytes) > len(stored.events):
+                # Something else removed events; measure the history again.
+                entry.event_bytes.clear()
+                entry.events_bytes = 0
+            added = [_event_bytes(event) for event in stored.events[len(entry.event_bytes) :]]
+            entry.event_bytes += added
+            entry.events_bytes += sum(added)
+            if state_changed:
+                entry.state_bytes = _state_bytes(stored.state)
+            self._trim(stored, entry)
+            self.total_bytes += entry.bytes - before
+            self._evict(now=entry.touched, keep=key)
+
+    def sweep(self) -> None:
+        """Drop sessions idle for longer than the TTL."""
+        with self._lock:
+            self._evict(now=time.monotonic(), keep=None)
+
+    def forget(self, key: _SessionKey) -> None:
+        with self._lock:
+            self._drop_entry(key)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._entries),
+                "events": sum(len(entry.event_bytes) for entry in self._entries.values()),
+                "bytes": self.total_bytes,
+                "largest_session_bytes": max((entry.bytes for entry in self._entries.values()), default=0),
+                "trimmed_events": self.trimmed_events,
+                "expired_sessions": self.expired,
+                "evicted_sessions": self.evicted,
+            }
+
+    def _stored(self, key: _SessionKey) -> Session | None:
+        app_name, user_id, session_id = key
+        return self.service.sessions.get(app_name, {}).get(user_id, {}).get(session_id)
+
+    def _trim(self, stored: Session, entry: _Entry) -> None:
+        """Drop the oldest whole invocations past the event and byte caps; the latest one stays."""
+        limits = self.limits
+        events = stored.events
+        latest = events[-1].invocation_id if events else None
+        size = entry.bytes
+        cut = 0
+        while cut < len(events) and events[cut].invocation_id != latest:
+            over_events = limits.max_events and len(events) - cut > limits.max_events
+            over_bytes = limits.max_session_bytes and size > limits.max_session_bytes
+            if not over_events and not over_bytes:
+                break
+            # Keep an invocation's events together so tool calls never lose their responses.
+            invocation = events[cut].invocation_id
+            while cut < len(events) and events[cut].invocation_id == invocation:
+                size -= entry.event_bytes[cut]
+                cut += 1
+        if cut:
+            del events[:cut]
+            entry.events_bytes -= sum(entry.event_bytes[:cut])
+            del entry.event_bytes[:cut]
+            self.trimmed_events += cut
+
+    def _evict(self, *, now: float, keep: _SessionKey | None) -> None:
+        limits = self.limits
+        for key in list(self._entries):
+            if key == keep:
+                continue
+            entry = self._entries[key]
+            if limits.ttl_seconds and now - entry.touched > limits.ttl_seconds:
+                self.expired += 1
+            elif limits.max_total_bytes and self.total_bytes > limits.max_total_bytes:
+                self.evicted += 1
+            else:
+                # Entries are in LRU order: once one is fresh and within budget, so are the rest.
+                break
+            self._delete_stored(key)
+            self._drop_entry(key)
+
+    def _drop_entry(self, key: _SessionKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.bytes
+
+    def _delete_stored(self, key: _SessionKey) -> None:
+        app_name, user_id, session_id = key
+        users = self.service.sessions.get(app_name, {})
+        sessions = users.get(user_id, {})
+        sessions.pop(session_id, None)
+        if not sessions:
+            users.pop(user_id, None)
+        logger.debug("Evicted session '{}' of user '{}' from memory", session_id, user_id)
+
+
+class BoundedSessionService(InMemorySessionService):
+    """``InMemorySessionService`` that enforces :class:`SessionLimits` on every write.
+
+    Expired sessions are dropped as they are found on reads. Trimming only
+    touches the stored history; a session object already handed to a
+    running invocation keeps its events until that invocation ends.
+    """
+
+    def __init__(self, limits: SessionLimits | None = None) -> None:
+        super().__init__()
+        self.limits = limits or SessionLimits.from_env()
+        self.ledger = SessionLedger(self, self.limits)
+        _LEDGERS[id(self)] = self.ledger
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = await super().create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        self.ledger.sync((app_name, user_id, session.id))
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        self.ledger.sweep()
+        session = await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is not None:
+            self.ledger.touch((app_name, user_id, session_id))
+        return session
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        self.ledger.forget((app_name, user_id, session_id))
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session, event)
+        if not event.partial:
+            self.ledger.sync(
+                (session.app_name, session.user_id, session.id),
+                state_changed=bool(event.actions and event.actions.state_delta),
+            )
+        return event
+
+    def stats(self) -> dict[str, Any]:
+        return self.ledger.stats()
+
+
+# One ledger per bounded service, keyed by ``id(service)``; ledgers keep their service alive.
+_LEDGERS: dict[int, SessionLedger] = {}
+
+
+def session_cache_stats() -> list[dict[str, Any]]:
+    """Memory counters of every bounded in-memory session service in this process."""
+    return [ledger.stats() for ledger in _LEDGERS.values()]
+
+
+class SessionBoundsPlugin(BasePlugin):
+    """Enforce :class:`SessionLimits` on a plain ``InMemorySessionService`` after each run.
+
+    For runners whose session service is created elsewhere, such as the one
+    ``adk web`` builds. Other session services are left alone.
+    """
+
+    def __init__(self, limits: SessionLimits | None = None) -> None:
+        super().__init__(name="session_bounds")
+        self.limits = limits
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        service = invocation_context.session_service
+        if type(service) is not InMemorySessionService:
+            return
+        ledger = _LEDGERS.get(id(service))
+        if ledger is None:
+            ledger = _LEDGERS[id(service)] = SessionLedger(service, self.limits or SessionLimits.from_env())
+        session = invocation_context.session
+        ledger.sync((session.app_name, session.user_id, session.id))
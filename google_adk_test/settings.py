@@ -1,12 +1,106 @@
 from __future__ import annotations
 
+import json
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-import litellm
+import httpx
+from loguru import logger
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 DEFAULT_MODEL = "gpt-4o-mini"
 DEFAULT_TEMPERATURE = 0.2
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_RESPONSE_CACHE_TTL = 86_400.0
+DEFAULT_RESPONSE_CACHE_MAX_ENTRIES = 10_000
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_SLO_P95_MS = 20_000.0
+DEFAULT_SLO_ERROR_RATE = 0.25
+CASSETTE_MODES = ("record", "replay", "auto")
+# ``OPENAI_MODEL_POETRY_AGENT=gpt-4o-mini`` sets the model of ``poetry_agent``.
+_AGENT_MODEL_PREFIX = "OPENAI_MODEL_"
+
+# One pooled client per distinct endpoint/pool configuration, shared process-wide.
+_HTTP_CLIENTS: dict[tuple[Any, ...], AsyncOpenAI] = {}
+
+
+def _env_number(name: str, default: float, cast: type = float) -> Any:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return cast(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be numeric, got '{raw}'.") from exc
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_path(name: str, default: str) -> str | None:
+    raw = os.getenv(name, default).strip()
+    # An empty value (or an explicit "off") disables the feature.
+    if raw.lower() in {"", "0", "false", "no", "off"}:
+        return None
+    return raw
+
+
+def _env_list(name: str) -> tuple[str, ...]:
+    return tuple(item.strip() for item in os.getenv(name, "").split(",") if item.strip())
+
+
+@dataclass(slots=True)
+class ModelProfile:
+    """Model settings for one agent; ``None`` / empty fields use the global config."""
+
+    model: str | None = None
+    temperature: float | None = None
+    fallback: tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ModelProfile":
+        fallback = data.get("fallback") or ()
+        return cls(
+            model=data.get("model"),
+            temperature=data.get("temperature"),
+            fallback=(fallback,) if isinstance(fallback, str) else tuple(fallback),
+        )
+
+
+def load_model_profiles(path: str | None = None) -> dict[str, ModelProfile]:
+    """Read agent profiles from a JSON file, then apply ``OPENAI_MODEL_<AGENT>`` overrides.
+
+    The file maps agent names to ``{"model", "temperature", "fallback"}``
+    objects; ``path`` defaults to ``MODEL_PROFILES``.
+    """
+    path = path or os.getenv("MODEL_PROFILES")
+    profiles: dict[str, ModelProfile] = {}
+    if path:
+        try:
+            data = json.loads(Path(path).expanduser().read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise ValueError(f"MODEL_PROFILES must point to a JSON file, got '{path}': {exc}") from exc
+        if not isinstance(data, dict) or not all(isinstance(item, dict) for item in data.values()):
+            raise ValueError(f"{path} must map agent names to profile objects.")
+        profiles = {name: ModelProfile.from_dict(item) for name, item in data.items()}
+    for name, value in os.environ.items():
+        if name.startswith(_AGENT_MODEL_PREFIX) and value.strip():
+            agent = name.removeprefix(_AGENT_MODEL_PREFIX).lower()
+            profiles.setdefault(agent, ModelProfile()).model = value.strip()
+    return profiles
+
 
 @dataclass(slots=True)
 class OpenAIConfig:
@@ -15,11 +109,41 @@ class OpenAIConfig:
     api_key: str
     model: str = DEFAULT_MODEL
     temperature: float = DEFAULT_TEMPERATURE
+    api_base: str | None = None
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+    max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY
+    timeout: float = DEFAULT_TIMEOUT
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    http2: bool = True
+    verify_tls: bool = True
+    response_cache_path: str | None = None
+    response_cache_ttl: float = DEFAULT_RESPONSE_CACHE_TTL
+    response_cache_max_entries: int = DEFAULT_RESPONSE_CACHE_MAX_ENTRIES
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    max_retries: int = DEFAULT_MAX_RETRIES
+    hedge: bool = False
+    fallback_models: tuple[str, ...] = ()
+    profiles: dict[str, ModelProfile] = field(default_factory=dict)
+    slo_p95_ms: float = DEFAULT_SLO_P95_MS
+    slo_error_rate: float = DEFAULT_SLO_ERROR_RATE
+    # Record LLM traffic to, or replay it from, this file (see ``google_adk_test.cassette``).
+    cassette_path: str | None = None
+    cassette_mode: str = "replay"
+    cassette_latency: float = 0.0
 
     @classmethod
     def from_env(cls) -> "OpenAIConfig":
         """Build configuration from environment variables."""
+        cassette_path = _env_path("LLM_CASSETTE", "")
+        cassette_mode = os.getenv("LLM_CASSETTE_MODE", "replay").strip().lower()
+        if cassette_mode not in CASSETTE_MODES:
+            raise ValueError(f"LLM_CASSETTE_MODE must be one of {CASSETTE_MODES}, got '{cassette_mode}'.")
         api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key and cassette_path and cassette_mode == "replay":
+            # Pure replay never reaches the API.
+            api_key = "replay"
         if not api_key:
             raise RuntimeError(
                 "OPENAI_API_KEY not found in the environment. "
@@ -35,11 +159,133 @@ class OpenAIConfig:
                 f"OPENAI_TEMPERATURE must be numeric, got '{temperature_raw}'."
             ) from exc
 
-        return cls(api_key=api_key, model=model, temperature=temperature)
+        return cls(
+            api_key=api_key,
+            model=model,
+            temperature=temperature,
+            api_base=os.getenv("OPENAI_API_BASE") or None,
+            max_connections=_env_number(
+                "OPENAI_HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS, int
+            ),
+            max_keepalive_connections=_env_number(
+                "OPENAI_HTTP_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE_CONNECTIONS, int
+            ),
+            keepalive_expiry=_env_number(
+                "OPENAI_HTTP_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY
+            ),
+            timeout=_env_number("OPENAI_HTTP_TIMEOUT", DEFAULT_TIMEOUT),
+            connect_timeout=_env_number(
+                "OPENAI_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT
+            ),
+            http2=_env_flag("OPENAI_HTTP2", True),
+            verify_tls=_env_flag("OPENAI_VERIFY_TLS", True),
+            # The response cache is opt-in: answers are reused only with a path set.
+            response_cache_path=_env_path("LLM_CACHE_PATH", ""),
+            response_cache_ttl=_env_number("LLM_CACHE_TTL", DEFAULT_RESPONSE_CACHE_TTL),
+            response_cache_max_entries=_env_number(
+                "LLM_CACHE_MAX_ENTRIES", DEFAULT_RESPONSE_CACHE_MAX_ENTRIES, int
+            ),
+            requests_per_minute=_env_number("OPENAI_RPM", 0, int),
+            tokens_per_minute=_env_number("OPENAI_TPM", 0, int),
+            max_retries=_env_number("OPENAI_MAX_RETRIES", DEFAULT_MAX_RETRIES, int),
+            hedge=_env_flag("OPENAI_HEDGE", False),
+            fallback_models=_env_list("OPENAI_FALLBACK_MODELS"),
+            profiles=load_model_profiles(),
+            slo_p95_ms=_env_number("MODEL_SLO_P95_MS", DEFAULT_SLO_P95_MS),
+            slo_error_rate=_env_number("MODEL_SLO_ERROR_RATE", DEFAULT_SLO_ERROR_RATE),
+            cassette_path=cassette_path,
+            cassette_mode=cassette_mode,
+            cassette_latency=_env_number("LLM_CASSETTE_LATENCY", 0.0),
+        )
+
+    def profile(self, agent: str | None) -> ModelProfile:
+        """Resolved profile for ``agent``: its overrides on top of the global model."""
+        own = self.profiles.get(agent or "") or ModelProfile()
+        model = own.model or self.model
+        fallback = own.fallback or self.fallback_models
+        return ModelProfile(
+            model=model,
+            temperature=own.temperature,
+            fallback=tuple(dict.fromkeys(name for name in fallback if name != model)),
+        )
+
+    @property
+    def replaying(self) -> bool:
+        """Whether every LLM call is answered from the cassette, without LiteLLM or the network."""
+        return bool(self.cassette_path) and self.cassette_mode == "replay"
 
     def apply(self) -> None:
         """Ensure downstream libraries see the OpenAI credentials."""
         os.environ.setdefault("OPENAI_API_KEY", self.api_key)
         os.environ.setdefault("OPENAI_MODEL", self.model)
-        # Disable TLS verification for LiteLLM to match local notebook usage.
+        if self.replaying:
+            return
+        # Imported here: LiteLLM takes seconds to import and is only needed once
+        # agents are built. Disable TLS verification to match notebook usage.
+        import litellm
+
         litellm.ssl_verify = False
+        # Failed calls are retried or failed over; skip LiteLLM's help banner for each one.
+        litellm.suppress_debug_info = True
+
+    def http_client(self) -> AsyncOpenAI:
+        """Return the process-wide pooled client for this endpoint.
+
+        Every config with the same endpoint and pool settings gets the same
+        instance, so keep-alive connections (and their TLS sessions) are reused
+        across agents. The client must be driven from a single event loop.
+        """
+        key = (
+            self.api_key,
+            self.api_base,
+            self.max_connections,
+            self.max_keepalive_connections,
+            self.keepalive_expiry,
+            self.timeout,
+            self.connect_timeout,
+            self.http2,
+            self.verify_tls,
+        )
+        client = _HTTP_CLIENTS.get(key)
+        if client is None:
+            from openai import AsyncOpenAI
+
+            # Retries are left to the request scheduler, which paces them.
+            client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.api_base,
+                http_client=self._build_http_client(),
+                max_retries=0,
+            )
+            _HTTP_CLIENTS[key] = client
+        return client
+
+    def litellm_kwargs(self) -> dict[str, Any]:
+        """Extra ``LiteLlm`` arguments that route calls through the shared client."""
+        # LiteLLM would otherwise reset the shared client to 2 retries per call.
+        kwargs: dict[str, Any] = {"client": self.http_client(), "max_retries": 0}
+        if self.api_base:
+            kwargs["api_base"] = self.api_base
+        return kwargs
+
+    def _build_http_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        options: dict[str, Any] = {"limits": limits, "timeout": timeout, "verify": self.verify_tls}
+        try:
+            return httpx.AsyncClient(http2=self.http2, **options)
+        except ImportError:
+            logger.warning("HTTP/2 requested but 'h2' is not installed; using HTTP/1.1.")
+            return httpx.AsyncClient(**options)
+
+
+async def aclose_http_clients() -> None:
+    """Close every shared client; call once when the process shuts down."""
+    clients = list(_HTTP_CLIENTS.values())
+    _HTTP_CLIENTS.clear()
+    for client in clients:
+        await client.close()
@@ -0,0 +1,744 @@
+"""SQLite-backed ADK session and artifact services that survive restarts and are shared by workers."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from google.adk.artifacts import artifact_util
+from google.adk.artifacts.base_artifact_service import ArtifactVersion, BaseArtifactService
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from google.adk.sessions.session import Session
+from google.adk.sessions.state import State
+from google.genai import types
+from loguru import logger
+
+DEFAULT_FLUSH_INTERVAL = 0.05
+DEFAULT_MAX_CACHED_SESSIONS = 256
+# Flush early once this many events are waiting, whatever the interval.
+_MAX_PENDING_EVENTS = 512
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    update_time REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    invocation_id TEXT,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id, seq);
+CREATE TABLE IF NOT EXISTS artifacts (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    mime_type TEXT,
+    custom_metadata TEXT,
+    create_time REAL NOT NULL,
+    part TEXT,
+    data BLOB,
+    PRIMARY KEY (app_name, user_id, session_id, filename, version)
+);
+"""
+
+_SessionKey = tuple[str, str, str]
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Autocommit mode: transactions are opened explicitly where several writes belong together.
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _split_state(state: dict[str, Any] | None) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any]]:
+    """Split a state (delta) into app, user and session scopes, dropping ``temp:`` keys."""
+    app: dict[str, Any] = {}
+    user: dict[str, Any] = {}
+    session: dict[str, Any] = {}
+    for key, value in (state or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app[key.removeprefix(State.APP_PREFIX)] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key.removeprefix(State.USER_PREFIX)] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+@dataclass
+class _CachedSession:
+    """Deserialized events of one session and the last row they cover."""
+
+    create_time: float
+    events: list[Event] = field(default_factory=list)
+    ids: set[str] = field(default_factory=set)
+    last_seq: int = 0
+
+
+class SqliteSessionService(BaseSessionService):
+    """Session service storing sessions, state and an append-only event log in SQLite.
+
+    Appended events are buffered and written by a group commit every
+    ``flush_interval`` seconds (``0`` = on every append), together with the
+    state changes they carry, merged into one update per session, user and
+    app. Reading a session with buffered writes, listing sessions and
+    :meth:`close` flush first, so a crash loses at most the last
+    ``flush_interval`` of events. A batch that fails to commit is put back
+    and retried with the next flush.
+
+    SQLite calls, flushes included, run in a worker thread so a busy or
+    locked database never stalls the event loop; ``append_event`` itself
+    only buffers.
+
+    Deserialized events of the ``max_cached_sessions`` most recently used
+    sessions are kept in memory; a later ``get_session`` only reads rows
+    appended since, including those written by other processes. Returned
+    sessions share those ``Event`` objects, so treat them as read-only.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_cached_sessions: int = DEFAULT_MAX_CACHED_SESSIONS,
+    ) -> None:
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.max_cached_sessions = max_cached_sessions
+        # Guards the connection and ``_cache``; only held off the event loop.
+        self._lock = threading.Lock()
+        # Guards the write buffers and counters; held briefly, also on the loop.
+        self._pending_lock = threading.Lock()
+        self._conn = _connect(self.path)
+        self._cache: OrderedDict[_SessionKey, _CachedSession] = OrderedDict()
+        self._pending_events: list[tuple[tuple[Any, ...], Event]] = []
+        self._pending_sessions: dict[_SessionKey, dict[str, Any]] = {}
+        self._pending_users: dict[tuple[str, str], dict[str, Any]] = {}
+        self._pending_apps: dict[str, dict[str, Any]] = {}
+        # The loop with a flush timer armed; that timer never fires once the loop is gone.
+        self._flush_loop: asyncio.AbstractEventLoop | None = None
+        self.events_written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        return await asyncio.to_thread(self._create_session, app_name, user_id, session_id, state)
+
+    def _create_session(
+        self, app_name: str, user_id: str, session_id: str, state: Optional[dict[str, Any]]
+    ) -> Session:
+        app_delta, user_delta, session_state = _split_state(state)
+        now = time.time()
+        with self._lock:
+            self._flush_locked()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
+                    (app_name, user_id, session_id, json.dumps(session_state), now, now),
+                )
+            except sqlite3.IntegrityError:
+                self._conn.execute("ROLLBACK")
+                raise AlreadyExistsError(f"Session with id {session_id} already exists.") from None
+            self._merge_app_state(app_name, app_delta, now)
+            self._merge_user_state(app_name, user_id, user_delta, now)
+            self._conn.execute("COMMIT")
+            self._cache_put((app_name, user_id, session_id), _CachedSession(create_time=now))
+            state = self._merged_state(app_name, user_id, session_state)
+        return Session(
+            app_name=app_name, user_id=user_id, id=session_id, state=state, last_update_time=now
+        )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        return await asyncio.to_thread(self._get_session, (app_name, user_id, session_id), config)
+
+    def _get_session(self, key: _SessionKey, config: Optional[GetSessionConfig]) -> Optional[Session]:
+        app_name, user_id, session_id = key
+        with self._lock:
+            # Other sessions' writes do not affect this read; let them keep batching.
+            with self._pending_lock:
+                pending = key in self._pending_sessions
+            if pending:
+                self._flush_locked()
+            row = self._conn.execute(
+                "SELECT state, create_time, update_time FROM sessions"
+                " WHERE app_name = ? AND user_id = ? AND id = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                self._cache.pop(key, None)
+                return None
+            state = self._merged_state(app_name, user_id, json.loads(row[0]))
+            if config is not None and config.num_recent_events and key not in self._cache:
+                # A partial read of a cold session: fetch only the tail, do not cache it.
+                events = self._read_events(key, limit=config.num_recent_events)
+            else:
+                events = list(self._load_events(key, create_time=row[1]).events)
+        if config is not None:
+            if config.num_recent_events:
+                events = events[-config.num_recent_events :]
+            if config.after_timestamp:
+                events = [event for event in events if event.timestamp >= config.after_timestamp]
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=state,
+            events=events,
+            last_update_time=row[2],
+        )
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: Optional[str] = None
+    ) -> ListSessionsResponse:
+        return await asyncio.to_thread(self._list_sessions, app_name, user_id)
+
+    def _list_sessions(self, app_name: str, user_id: Optional[str]) -> ListSessionsResponse:
+        query = "SELECT user_id, id, state, update_time FROM sessions WHERE app_name = ?"
+        params: tuple[Any, ...] = (app_name,)
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params += (user_id,)
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(query, params).fetchall()
+            sessions = [
+                Session(
+                    app_name=app_name,
+                    user_id=owner,
+                    id=session_id,
+                    state=self._merged_state(app_name, owner, json.loads(state)),
+                    last_update_time=update_time,
+                )
+                for owner, session_id, state, update_time in rows
+            ]
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await asyncio.to_thread(self._delete_session, (app_name, user_id, session_id))
+
+    def _delete_session(self, key: _SessionKey) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._cache.pop(key, None)
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+            )
+            self._conn.execute(
+                "DELETE FROM artifacts WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+            )
+            self._conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key)
+            self._conn.execute("COMMIT")
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        key = (session.app_name, session.user_id, session.id)
+        app_delta, user_delta, session_delta = _split_state(
+            event.actions.state_delta if event.actions else None
+        )
+        row = (*key, event.id, event.invocation_id, event.timestamp, event.model_dump_json(exclude_none=True))
+        loop = asyncio.get_running_loop()
+        with self._pending_lock:
+            self._pending_events.append((row, event))
+            # Every touched session gets its update time bumped, with or without a delta.
+            self._pending_sessions.setdefault(key, {}).update(session_delta)
+            if user_delta:
+                self._pending_users.setdefault(key[:2], {}).update(user_delta)
+            if app_delta:
+                self._pending_apps.setdefault(key[0], {}).update(app_delta)
+            flush_now = self.flush_interval <= 0 or len(self._pending_events) >= _MAX_PENDING_EVENTS
+            # ``Runner.run`` drives each call on a fresh loop that is closed afterwards,
+            # so a timer left on another (possibly closed) loop is replaced, not trusted.
+            if not flush_now and self._flush_loop is not loop:
+                self._flush_loop = loop
+                loop.call_later(self.flush_interval, self._on_flush_timer)
+        if flush_now:
+            await asyncio.to_thread(self.flush)
+        return event
+
+    def _on_flush_timer(self) -> None:
+        with self._pending_lock:
+            self._flush_loop = None
+        try:
+            asyncio.get_running_loop().run_in_executor(None, self._flush_in_background)
+        except RuntimeError:
+            # ``asyncio.run`` is shutting its executor down; the batch must still be written.
+            threading.Thread(target=self._flush_in_background, daemon=True).start()
+
+    def _flush_in_background(self) -> None:
+        try:
+            self.flush()
+        except Exception:  # noqa: BLE001 - logged by the flush; the batch is retried
+            pass
+
+    def flush(self) -> None:
+        """Write every buffered event and state change in one transaction."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """Flush outstanding writes and close the database."""
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    def stats(self) -> dict[str, Any]:
+        with self._pending_lock:
+            return {
+                "path": str(self.path),
+                "events_written": self.events_written,
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "events_per_flush": self.events_written / self.flushes if self.flushes else 0.0,
+                "pending_events": len(self._pending_events),
+                "cached_sessions": len(self._cache),
+            }
+
+    def _flush_locked(self) -> None:
+        # Called with ``_lock`` held; the buffers are swapped out under ``_pending_lock``.
+        with self._pending_lock:
+            if not self._pending_events and not self._pending_sessions:
+                return
+            events, self._pending_events = self._pending_events, []
+            sessions, self._pending_sessions = self._pending_sessions, {}
+            users, self._pending_users = self._pending_users, {}
+            apps, self._pending_apps = self._pending_apps, {}
+        now = time.time()
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO events (app_name, user_id, session_id, id, invocation_id, timestamp, data)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [row for row, _ in events],
+                )
+                for key, delta in sessions.items():
+                    row = self._conn.execute(
+                        "SELECT state FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    state = {**json.loads(row[0]), **delta}
+                    self._conn.execute(
+                        "UPDATE sessions SET state = ?, update_time = ?"
+                        " WHERE app_name = ? AND user_id = ? AND id = ?",
+                        (json.dumps(state), now, *key),
+                    )
+                for (app_name, user_id), delta in users.items():
+                    self._merge_user_state(app_name, user_id, delta, now)
+                for app_name, delta in apps.items():
+                    self._merge_app_state(app_name, delta, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        except Exception:
+            self._requeue(events, sessions, users, apps)
+            logger.exception("Could not write {} session events; they will be retried", len(events))
+            raise
+        # Only committed events join the cache, so it never shows what the database lacks.
+        for (row, event) in events:
+            cached = self._cache.get(row[:3])
+            if cached is not None and event.id not in cached.ids:
+                cached.events.append(event)
+                cached.ids.add(event.id)
+        with self._pending_lock:
+            self.events_written += len(events)
+            self.flushes += 1
+
+    def _requeue(
+        self,
+        events: list[tuple[tuple[Any, ...], Event]],
+        sessions: dict[_SessionKey, dict[str, Any]],
+        users: dict[tuple[str, str], dict[str, Any]],
+        apps: dict[str, dict[str, Any]],
+    ) -> None:
+        """Put a failed batch back in front of anything buffered since; newer deltas win."""
+        with self._pending_lock:
+            self.failed_flushes += 1
+            self._pending_events = events + self._pending_events
+            for pending, failed in (
+                (self._pending_sessions, sessions),
+                (self._pending_users, users),
+                (self._pending_apps, apps),
+            ):
+                for key, delta in failed.items():
+                    pending[key] = {**delta, **pending.get(key, {})}
+
+    def _merge_app_state(self, app_name: str, delta: dict[str, Any], now: float) -> None:
+        if not delta:
+            return
+        row = self._conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+        state = {**(json.loads(row[0]) if row else {}), **delta}
+        self._conn.execute(
+            "INSERT OR REPLACE INTO app_states VALUES (?, ?, ?)", (app_name, json.dumps(state), now)
+        )
+
+    def _merge_user_state(self, app_name: str, user_id: str, delta: dict[str, Any], now: float) -> None:
+        if not delta:
+            return
+        row = self._conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone()
+        state = {**(json.loads(row[0]) if row else {}), **delta}
+        self._conn.execute(
+            "INSERT OR REPLACE INTO user_states VALUES (?, ?, ?, ?)",
+            (app_name, user_id, json.dumps(state), now),
+        )
+
+    def _merged_state(self, app_name: str, user_id: str, session_state: dict[str, Any]) -> dict[str, Any]:
+        state = dict(session_state)
+        row = self._conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+        if row is not None:
+            state.update({State.APP_PREFIX + key: value for key, value in json.loads(row[0]).items()})
+        row = self._conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone()
+        if row is not None:
+            state.update({State.USER_PREFIX + key: value for key, value in json.loads(row[0]).items()})
+        return state
+
+    def _load_events(self, key: _SessionKey, *, create_time: float) -> _CachedSession:
+        """Bring the cached events of ``key`` up to date, reading only new rows."""
+        cached = self._cache.get(key)
+        if cached is None or cached.create_time != create_time:
+            cached = _CachedSession(create_time=create_time)
+        rows = self._conn.execute(
+            "SELECT seq, id, data FROM events"
+            " WHERE app_name = ? AND user_id = ? AND session_id = ? AND seq > ? ORDER BY seq",
+            (*key, cached.last_seq),
+        ).fetchall()
+        for seq, event_id, data in rows:
+            cached.last_seq = seq
+            # Events appended through this service are already cached.
+            if event_id not in cached.ids:
+                cached.events.append(Event.model_validate_json(data))
+                cached.ids.add(event_id)
+        self._cache_put(key, cached)
+        return cached
+
+    def _read_events(self, key: _SessionKey, *, limit: int) -> list[Event]:
+        rows = self._conn.execute(
+            "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+            " ORDER BY seq DESC LIMIT ?",
+            (*key, limit),
+        ).fetchall()
+        return [Event.model_validate_json(data) for (data,) in reversed(rows)]
+
+    def _cache_put(self, key: _SessionKey, cached: _CachedSession) -> None:
+        self._cache[key] = cached
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cached_sessions:
+            self._cache.popitem(last=False)
+
+
+class SqliteArtifactService(BaseArtifactService):
+    """Versioned artifact store in the same SQLite file as :class:`SqliteSessionService`.
+
+    Inline data is stored as a blob; other parts (text, file references) as
+    JSON. Filenames starting with ``user:`` are scoped to the user rather than
+    the session, as in ADK's in-memory service.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+
+    @staticmethod
+    def _scope(filename: str, session_id: Optional[str]) -> str:
+        if filename.startswith("user:"):
+            return ""
+        if session_id is None:
+            raise ValueError("Session ID must be provided for session-scoped artifacts.")
+        return session_id
+
+    def _uri(self, app_name: str, user_id: str, scope: str, filename: str, version: int) -> str:
+        session = f"/sessions/{scope}" if scope else ""
+        return f"sqlite://apps/{app_name}/users/{user_id}{session}/artifacts/{filename}/versions/{version}"
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        artifact: types.Part,
+        session_id: Optional[str] = None,
+        custom_metadata: Optional[dict[str, Any]] = None,
+    ) -> int:
+        scope = self._scope(filename, session_id)
+        if artifact.inline_data is not None:
+            mime_type, part, data = artifact.inline_data.mime_type, None, artifact.inline_data.data
+        elif artifact.text is not None:
+            mime_type, part, data = "text/plain", artifact.model_dump_json(exclude_none=True), None
+        elif artifact.file_data is not None:
+            if artifact_util.is_artifact_ref(artifact):
+                if not artifact_util.parse_artifact_uri(artifact.file_data.file_uri):
+                    raise ValueError(f"Invalid artifact reference URI: {artifact.file_data.file_uri}")
+                mime_type = None
+            else:
+                mime_type = artifact.file_data.mime_type
+            part, data = artifact.model_dump_json(exclude_none=True), None
+        else:
+            raise ValueError("Not supported artifact type.")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            (version,) = self._conn.execute(
+                "SELECT COALESCE(MAX(version) + 1, 0) FROM artifacts"
+                " WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ?",
+                (app_name, user_id, scope, filename),
+            ).fetchone()
+            self._conn.execute(
+                "INSERT INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    app_name,
+                    user_id,
+                    scope,
+                    filename,
+                    version,
+                    mime_type,
+                    json.dumps(custom_metadata) if custom_metadata else None,
+                    time.time(),
+                    part,
+                    data,
+                ),
+            )
+            self._conn.execute("COMMIT")
+        return version
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+        version: Optional[int] = None,
+    ) -> Optional[types.Part]:
+        row = self._select(
+            "mime_type, part, data", app_name, user_id, filename, session_id, version
+        )
+        if row is None:
+            return None
+        mime_type, part, data = row
+        if part is None:
+            return types.Part(inline_data=types.Blob(mime_type=mime_type, data=data)) if data else None
+        artifact = types.Part.model_validate_json(part)
+        if artifact_util.is_artifact_ref(artifact):
+            parsed = artifact_util.parse_artifact_uri(artifact.file_data.file_uri)
+            if not parsed:
+                raise ValueError(f"Invalid artifact reference URI: {artifact.file_data.file_uri}")
+            return await self.load_artifact(
+                app_name=parsed.app_name,
+                user_id=parsed.user_id,
+                filename=parsed.filename,
+                session_id=parsed.session_id,
+                version=parsed.version,
+            )
+        if artifact == types.Part() or artifact == types.Part(text=""):
+            return None
+        return artifact
+
+    async def list_artifact_keys(
+        self, *, app_name: str, user_id: str, session_id: Optional[str] = None
+    ) -> list[str]:
+        scopes = ("", session_id) if session_id else ("",)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT filename FROM artifacts WHERE app_name = ? AND user_id = ?"
+                f" AND session_id IN ({', '.join('?' * len(scopes))})",
+                (app_name, user_id, *scopes),
+            ).fetchall()
+        return sorted(filename for (filename,) in rows)
+
+    async def delete_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+    ) -> None:
+        scope = self._scope(filename, session_id)
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM artifacts WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ?",
+                (app_name, user_id, scope, filename),
+            )
+
+    async def list_versions(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+    ) -> list[int]:
+        versions = await self.list_artifact_versions(
+            app_name=app_name, user_id=user_id, filename=filename, session_id=session_id
+        )
+        return [version.version for version in versions]
+
+    async def list_artifact_versions(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+    ) -> list[ArtifactVersion]:
+        scope = self._scope(filename, session_id)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version, mime_type, custom_metadata, create_time FROM artifacts"
+                " WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ? ORDER BY version",
+                (app_name, user_id, scope, filename),
+            ).fetchall()
+        return [self._version(app_name, user_id, scope, filename, row) for row in rows]
+
+    async def get_artifact_version(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+        version: Optional[int] = None,
+    ) -> Optional[ArtifactVersion]:
+        row = self._select(
+            "version, mime_type, custom_metadata, create_time",
+            app_name,
+            user_id,
+            filename,
+            session_id,
+            version,
+        )
+        if row is None:
+            return None
+        return self._version(app_name, user_id, self._scope(filename, session_id), filename, row)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _select(
+        self,
+        columns: str,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str],
+        version: Optional[int],
+    ) -> tuple[Any, ...] | None:
+        scope = self._scope(filename, session_id)
+        query = (
+            f"SELECT {columns} FROM artifacts"
+            " WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ?"
+        )
+        params: tuple[Any, ...] = (app_name, user_id, scope, filename)
+        if version is None:
+            query += " ORDER BY version DESC LIMIT 1"
+        else:
+            query += " AND version = ?"
+            params += (version,)
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()
+
+    def _version(
+        self, app_name: str, user_id: str, scope: str, filename: str, row: tuple[Any, ...]
+    ) -> ArtifactVersion:
+        version, mime_type, custom_metadata, create_time = row
+        return ArtifactVersion(
+            version=version,
+            canonical_uri=self._uri(app_name, user_id, scope, filename, version),
+            custom_metadata=json.loads(custom_metadata) if custom_metadata else {},
+            create_time=create_time,
+            mime_type=mime_type,
+        )
+
+
+# One pair of services per database file, shared process-wide.
+_STORES: dict[Path, tuple[SqliteSessionService, SqliteArtifactService]] = {}
+
+
+def open_session_store(path: str | Path) -> tuple[SqliteSessionService, SqliteArtifactService]:
+    """Return the process-wide session and artifact services for the database at ``path``."""
+    resolved = Path(path).expanduser().resolve()
+    services = _STORES.get(resolved)
+    if services is None:
+        services = _STORES[resolved] = (SqliteSessionService(resolved), SqliteArtifactService(resolved))
+        logger.debug("Opened session store {}", resolved)
+    return services
+
+
+def close_session_stores() -> None:
+    """Flush and close every store; call once when the process shuts down."""
+    stores = list(_STORES.values())
+    _STORES.clear()
+    for sessions, artifacts in stores:
+        sessions.close()
+        artifacts.close()
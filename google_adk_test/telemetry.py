@@ -0,0 +1,478 @@
+from __future__ import annotations
+
+import inspect
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+# Prometheus histogram bucket upper bounds, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_MAX_SPANS = 10_000
+_MAX_OPEN_SPANS = 10_000
+_MAX_SAMPLES = 2_048
+
+
+def tracing_enabled() -> bool:
+    """Whether ``AGENT_TRACING`` (default on) instruments agents built by the factories."""
+    return os.getenv("AGENT_TRACING", "true").strip().lower() not in {"0", "false", "no", "off"}
+
+
+@dataclass(slots=True)
+class Span:
+    """One finished agent run, LLM call or tool call."""
+
+    kind: str
+    name: str
+    trace_id: str
+    start: float
+    duration_ms: float
+    status: str = "ok"
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class _Metric:
+    count: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    buckets: list[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    samples: deque = field(default_factory=lambda: deque(maxlen=_MAX_SAMPLES))
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hits: int = 0
+    queue_wait_seconds: float = 0.0
+    retries: int = 0
+    hedges: int = 0
+    fallbacks: int = 0
+
+
+def _nearest_rank(ordered: list[float], fraction: float) -> float:
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+class Tracer:
+    """Collects spans in memory and aggregates them into per-(kind, name) metrics.
+
+    Spans are opened and closed by the callbacks that :func:`instrument_agent`
+    installs. Only the most recent ``max_spans`` spans are kept for trace
+    export; the aggregated metrics cover every span since the last
+    :meth:`reset`. LLM and tool calls that raise are closed with an ``error``
+    status by :class:`TracingPlugin`; other spans interrupted by an exception
+    are never closed and are eventually discarded.
+    """
+
+    def __init__(self, max_spans: int = _MAX_SPANS) -> None:
+        self._lock = threading.Lock()
+        self._open: OrderedDict[tuple[Any, ...], tuple[str, str, str, float, float, dict[str, Any]]]
+        self._open = OrderedDict()
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+        self._metrics: dict[tuple[str, str], _Metric] = {}
+
+    def start(self, key: tuple[Any, ...], kind: str, name: str, trace_id: str, **attributes: Any) -> None:
+        with self._lock:
+            self._open[key] = (kind, name, trace_id, time.time(), time.perf_counter(), attributes)
+            while len(self._open) > _MAX_OPEN_SPANS:
+                self._open.popitem(last=False)
+
+    def annotate(self, key: tuple[Any, ...], **attributes: Any) -> None:
+        """Add attributes to an open span, keeping values that are already set."""
+        with self._lock:
+            if key in self._open:
+                current = self._open[key][5]
+                for name, value in attributes.items():
+                    current.setdefault(name, value)
+
+    def finish(self, key: tuple[Any, ...], *, status: str = "ok", **attributes: Any) -> Span | None:
+        finished = time.perf_counter()
+        with self._lock:
+            opened = self._open.pop(key, None)
+            if opened is None:
+                return None
+            kind, name, trace_id, wall_start, started, span_attributes = opened
+            span_attributes.update({k: v for k, v in attributes.items() if v is not None})
+            if "first_chunk" in span_attributes:
+                first_chunk = span_attributes.pop("first_chunk")
+                span_attributes["ttft_ms"] = round((first_chunk - started) * 1000, 3)
+            duration = finished - started
+            span = Span(
+                kind=kind,
+                name=name,
+                trace_id=trace_id,
+                start=wall_start,
+                duration_ms=round(duration * 1000, 3),
+                status=status,
+                attributes=span_attributes,
+            )
+            self.spans.append(span)
+
+            metric = self._metrics.setdefault((kind, name), _Metric())
+            metric.count += 1
+            metric.errors += status == "error"
+            metric.total_seconds += duration
+            metric.samples.append(duration)
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    metric.buckets[index] += 1
+                    break
+            metric.prompt_tokens += span_attributes.get("prompt_tokens") or 0
+            metric.completion_tokens += span_attributes.get("completion_tokens") or 0
+            metric.cache_hits += bool(span_attributes.get("cache_hit"))
+            metric.queue_wait_seconds += (span_attributes.get("queue_wait_ms") or 0) / 1000
+            metric.retries += span_attributes.get("retries") or 0
+            metric.hedges += bool(span_attributes.get("hedged"))
+            metric.fallbacks += bool(span_attributes.get("fallback_model"))
+            return span
+
+    def reset(self) -> None:
+        with self._lock:
+            self._open.clear()
+            self.spans.clear()
+            self._metrics.clear()
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Per-(kind, name) call counts, latency percentiles and token totals."""
+        rows: list[dict[str, Any]] = []
+        with self._lock:
+            items = sorted(self._metrics.items(), key=lambda item: -item[1].total_seconds)
+            for (kind, name), metric in items:
+                samples = sorted(metric.samples)
+                rows.append(
+                    {
+                        "kind": kind,
+                        "name": name,
+                        "count": metric.count,
+                        "errors": metric.errors,
+                        "total_ms": round(metric.total_seconds * 1000, 2),
+                        "mean_ms": round(metric.total_seconds / metric.count * 1000, 2),
+                        "p50_ms": round(_nearest_rank(samples, 0.50) * 1000, 2),
+                        "p95_ms": round(_nearest_rank(samples, 0.95) * 1000, 2),
+                        "max_ms": round(samples[-1] * 1000, 2),
+                        "prompt_tokens": metric.prompt_tokens,
+                        "completion_tokens": metric.completion_tokens,
+                        "cache_hits": metric.cache_hits,
+                        "queue_wait_ms": round(metric.queue_wait_seconds * 1000, 2),
+                        "retries": metric.retries,
+                        "hedges": metric.hedges,
+                        "fallbacks": metric.fallbacks,
+                    }
+                )
+        return rows
+
+    def prometheus(self) -> str:
+        """Render the aggregated metrics in the Prometheus text exposition format."""
+
+        lines = [
+            "# HELP adk_span_duration_seconds Duration of agent runs, LLM calls and tool calls.",
+            "# TYPE adk_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+            for (kind, name), metric in metrics:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, metric.buckets):
+                    cumulative += count
+                    labels = _labels(kind=kind, name=name, le=repr(bound))
+                    lines.append(f"adk_span_duration_seconds_bucket{labels} {cumulative}")
+                labels = _labels(kind=kind, name=name, le="+Inf")
+                lines.append(f"adk_span_duration_seconds_bucket{labels} {metric.count}")
+                labels = _labels(kind=kind, name=name)
+                lines.append(f"adk_span_duration_seconds_sum{labels} {metric.total_seconds:.6f}")
+                lines.append(f"adk_span_duration_seconds_count{labels} {metric.count}")
+
+            lines += [
+                "# HELP adk_span_errors_total Spans that finished with an error.",
+                "# TYPE adk_span_errors_total counter",
+            ]
+            lines += [
+                f"adk_span_errors_total{_labels(kind=kind, name=name)} {metric.errors}"
+                for (kind, name), metric in metrics
+            ]
+            llm = [(name, metric) for (kind, name), metric in metrics if kind == "llm"]
+            lines += [
+                "# HELP adk_llm_tokens_total Prompt and completion tokens reported by the model.",
+                "# TYPE adk_llm_tokens_total counter",
+            ]
+            for name, metric in llm:
+                lines.append(f"adk_llm_tokens_total{_labels(agent=name, type='prompt')} {metric.prompt_tokens}")
+                lines.append(
+                    f"adk_llm_tokens_total{_labels(agent=name, type='completion')} {metric.completion_tokens}"
+                )
+            lines += [
+                "# HELP adk_llm_cache_hits_total LLM calls served from the response cache.",
+                "# TYPE adk_llm_cache_hits_total counter",
+            ]
+            lines += [f"adk_llm_cache_hits_total{_labels(agent=name)} {metric.cache_hits}" for name, metric in llm]
+            lines += [
+                "# HELP adk_llm_queue_wait_seconds_total Time LLM calls waited for a rate-limit slot.",
+                "# TYPE adk_llm_queue_wait_seconds_total counter",
+            ]
+            lines += [
+                f"adk_llm_queue_wait_seconds_total{_labels(agent=name)} {metric.queue_wait_seconds:.6f}"
+                for name, metric in llm
+            ]
+            lines += [
+                "# HELP adk_llm_retries_total LLM call attempts retried after a transient error.",
+                "# TYPE adk_llm_retries_total counter",
+            ]
+            lines += [f"adk_llm_retries_total{_labels(agent=name)} {metric.retries}" for name, metric in llm]
+            lines += [
+                "# HELP adk_llm_hedges_total LLM calls that sent a hedged duplicate request.",
+                "# TYPE adk_llm_hedges_total counter",
+            ]
+            lines += [f"adk_llm_hedges_total{_labels(agent=name)} {metric.hedges}" for name, metric in llm]
+            lines += [
+                "# HELP adk_llm_fallbacks_total LLM calls answered by a fallback model.",
+                "# TYPE adk_llm_fallbacks_total counter",
+            ]
+            lines += [f"adk_llm_fallbacks_total{_labels(agent=name)} {metric.fallbacks}" for name, metric in llm]
+        return "\n".join(lines) + "\n"
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """Spans in the Chrome trace-event format (open in Perfetto or chrome://tracing).
+
+        Each agent of each invocation gets its own track, so parallel agents and
+        concurrent requests do not overlap.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        tracks: dict[tuple[str, str], int] = {}
+        events = []
+        for span in sorted(spans, key=lambda item: item.start):
+            agent = span.attributes.get("agent", span.name) if span.kind == "tool" else span.name
+            track = tracks.setdefault((span.trace_id, agent), len(tracks) + 1)
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.kind,
+                    "ph": "X",
+                    "ts": round(span.start * 1e6),
+                    "dur": round(span.duration_ms * 1000),
+                    "pid": 1,
+                    "tid": track,
+                    "args": {"status": span.status, "trace_id": span.trace_id, **span.attributes},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path: Path) -> None:
+        """Write the Chrome trace plus the raw spans and summary as JSON."""
+        trace = self.chrome_trace()
+        with self._lock:
+            trace["spans"] = [asdict(span) for span in self.spans]
+        trace["summary"] = self.summary()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(trace, default=str), encoding="utf-8")
+
+    def write_prometheus(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.prometheus(), encoding="utf-8")
+
+
+tracer = Tracer()
+
+
+def _labels(**values: str) -> str:
+    escaped = (
+        '{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in values.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _agent_key(callback_context: CallbackContext) -> tuple[Any, ...]:
+    return ("agent", callback_context.invocation_id, callback_context.agent_name)
+
+
+# The open LLM call of each (invocation, agent) in the current task. ADK runs the
+# before-model callback, the call and its after-model or error callbacks in one
+# task, while parallel tool calls (which may re-enter the model) each get a task
+# with a copy of this mapping, so overlapping calls never share a span.
+_model_calls: ContextVar[dict[tuple[str, str], int]] = ContextVar("_model_calls", default={})
+_call_ids = itertools.count()
+
+
+def _start_model_call(callback_context: CallbackContext) -> tuple[Any, ...]:
+    calls = dict(_model_calls.get())
+    calls[(callback_context.invocation_id, callback_context.agent_name)] = next(_call_ids)
+    _model_calls.set(calls)
+    return _model_key(callback_context)
+
+
+def _model_key(callback_context: CallbackContext) -> tuple[Any, ...]:
+    call = _model_calls.get().get((callback_context.invocation_id, callback_context.agent_name))
+    return ("llm", callback_context.invocation_id, callback_context.agent_name, call)
+
+
+def _tool_key(tool_context: ToolContext) -> tuple[Any, ...]:
+    return ("tool", tool_context.invocation_id, tool_context.function_call_id)
+
+
+async def _run_callbacks(callbacks: list[Callable[..., Any]], **kwargs: Any) -> Any:
+    """Run callbacks in order and return the first override, like ADK does."""
+    for callback in callbacks:
+        result = callback(**kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        if result:
+            return result
+    return None
+
+
+def _as_list(callback: Any) -> list[Any]:
+    if callback is None:
+        return []
+    return list(callback) if isinstance(callback, list) else [callback]
+
+
+def _traced_before_agent(callbacks: list[Any]) -> Callable[..., Any]:
+    async def _before_agent(callback_context: CallbackContext) -> Any:
+        tracer.start(
+            _agent_key(callback_context),
+            "agent",
+            callback_context.agent_name,
+            callback_context.invocation_id,
+        )
+        override = await _run_callbacks(callbacks, callback_context=callback_context)
+        if override:
+            # The agent body and its after-agent callbacks will not run.
+            tracer.finish(_agent_key(callback_context), status="skipped")
+        return override
+
+    _before_agent.traced = True
+    return _before_agent
+
+
+async def _after_agent(callback_context: CallbackContext) -> None:
+    tracer.finish(_agent_key(callback_context))
+    return None
+
+
+def _traced_before_model(callbacks: list[Any], model: str) -> Callable[..., Any]:
+    async def _before_model(callback_context: CallbackContext, llm_request: LlmRequest) -> Any:
+        key = _start_model_call(callback_context)
+        tracer.start(
+            key,
+            "llm",
+            callback_context.agent_name,
+            callback_context.invocation_id,
+            model=llm_request.model or model,
+        )
+        override = await _run_callbacks(
+            callbacks, callback_context=callback_context, llm_request=llm_request
+        )
+        if override:
+            tracer.finish(key, status="skipped")
+        return override
+
+    return _before_model
+
+
+async def _after_model(callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+    key = _model_key(callback_context)
+    if llm_response.partial:
+        tracer.annotate(key, first_chunk=time.perf_counter())
+        return None
+    usage = llm_response.usage_metadata
+    metadata = llm_response.custom_metadata or {}
+    tracer.finish(
+        key,
+        status="error" if llm_response.error_code else "ok",
+        prompt_tokens=usage.prompt_token_count if usage else None,
+        completion_tokens=usage.candidates_token_count if usage else None,
+        cache_hit=metadata.get("cache_hit") or None,
+        queue_wait_ms=metadata.get("queue_wait_ms"),
+        retries=metadata.get("retries") or None,
+        hedged=metadata.get("hedged") or None,
+        fallback_model=metadata.get("fallback_model"),
+        error=llm_response.error_message,
+    )
+    return None
+
+
+def _traced_before_tool(callbacks: list[Any]) -> Callable[..., Any]:
+    async def _before_tool(tool: BaseTool, args: dict[str, Any], tool_context: ToolContext) -> Any:
+        tracer.start(
+            _tool_key(tool_context),
+            "tool",
+            tool.name,
+            tool_context.invocation_id,
+            agent=tool_context.agent_name,
+        )
+        return await _run_callbacks(callbacks, tool=tool, args=args, tool_context=tool_context)
+
+    return _before_tool
+
+
+async def _after_tool(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext, tool_response: Any
+) -> None:
+    failed = isinstance(tool_response, dict) and "error" in tool_response
+    tracer.finish(_tool_key(tool_context), status="error" if failed else "ok")
+    return None
+
+
+def _describe(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}"
+
+
+class TracingPlugin(BasePlugin):
+    """Close the span of an LLM or tool call that raised, with an ``error`` status.
+
+    ADK reports these exceptions to runner plugins only, not to agent
+    callbacks, so add this plugin to every runner whose agents are
+    instrumented. The exception itself still propagates.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(name="tracing")
+
+    async def on_model_error_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> None:
+        tracer.finish(_model_key(callback_context), status="error", error=_describe(error))
+        return None
+
+    async def on_tool_error_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext, error: Exception
+    ) -> None:
+        tracer.finish(_tool_key(tool_context), status="error", error=_describe(error))
+        return None
+
+
+def instrument_agent(agent: BaseAgent) -> BaseAgent:
+    """Attach tracing callbacks to ``agent`` (not its sub-agents) and return it.
+
+    The agent's own callbacks keep running in their original order inside the
+    tracing wrappers, so a callback that short-circuits a step (e.g. a gate or
+    fast path) is recorded as a ``skipped`` span. Calling this twice is a no-op.
+    Register :class:`TracingPlugin` on the runner so calls that raise are closed.
+    """
+    if not tracing_enabled() or getattr(agent.before_agent_callback, "traced", False):
+        return agent
+    agent.before_agent_callback = _traced_before_agent(_as_list(agent.before_agent_callback))
+    agent.after_agent_callback = [_after_agent, *_as_list(agent.after_agent_callback)]
+    if isinstance(agent, LlmAgent):
+        model = agent.model if isinstance(agent.model, str) else getattr(agent.model, "model", "")
+        agent.before_model_callback = _traced_before_model(
+            _as_list(agent.before_model_callback), model
+        )
+        agent.after_model_callback = [_after_model, *_as_list(agent.after_model_callback)]
+        agent.before_tool_callback = _traced_before_tool(_as_list(agent.before_tool_callback))
+        agent.after_tool_callback = [_after_tool, *_as_list(agent.after_tool_callback)]
+    return agent
@@ -1,93 +1,918 @@
 from __future__ import annotations
 
 import ast
+import csv
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Container, Iterable, Mapping, Sequence
 from dataclasses import dataclass
-from typing import Any, Literal
+from pathlib import Path
+from typing import Any, Optional, overload
+
+import numpy as np
 
 
 class MathToolError(ValueError):
     """Raised when the math tool receives invalid inputs."""
 
 
-@dataclass
-class _EvalResult:
+@dataclass(frozen=True, slots=True)
+class MathBudget:
+    """Limits that keep a single expression from monopolising a worker."""
+
+    max_length: int = 2_000_000
+    max_nodes: int = 250_000
+    # ``ast.parse`` itself cannot build trees much deeper than ~3000 levels.
+    max_depth: int = 2_000
+    max_magnitude: float = 1e100
+    # Operands longer than this are elided in the step trace so that rendering
+    # the trace stays linear in the size of the expression.
+    max_operand_chars: int = 400
+
+    @classmethod
+    def from_env(cls) -> "MathBudget":
+        """Build a budget from ``MATH_MAX_*`` environment variables."""
+        defaults = cls()
+        fields = {
+            "max_length": ("MATH_MAX_LENGTH", int),
+            "max_nodes": ("MATH_MAX_NODES", int),
+            "max_depth": ("MATH_MAX_DEPTH", int),
+            "max_magnitude": ("MATH_MAX_MAGNITUDE", float),
+            "max_operand_chars": ("MATH_MAX_OPERAND_CHARS", int),
+        }
+        values: dict[str, Any] = {}
+        for field, (env_name, cast) in fields.items():
+            raw = os.getenv(env_name)
+            if raw is None:
+                values[field] = getattr(defaults, field)
+                continue
+            try:
+                values[field] = cast(raw)
+            except ValueError as exc:
+                raise ValueError(f"{env_name} must be numeric, got '{raw}'.") from exc
+        return cls(**values)
+
+
+_budget: MathBudget | None = None
+
+
+def get_math_budget() -> MathBudget:
+    """Return the process-wide budget, loading it from the environment on first use."""
+    global _budget
+    if _budget is None:
+        _budget = MathBudget.from_env()
+    return _budget
+
+
+def set_math_budget(budget: MathBudget) -> None:
+    """Override the process-wide budget used by :func:`compute_basic_math`."""
+    global _budget
+    _budget = budget
+    # Cached results were produced under the previous limits.
+    get_expression_cache().clear()
+
+
+# Opcodes of the postfix program produced by the parser.
+_CONST, _VAR, _POS, _NEG, _ADD, _SUB, _MUL, _DIV = range(8)
+
+# Precedence levels mirror ``ast._Precedence`` so rendering matches ``ast.unparse``.
+_PREC_TEST, _PREC_ARITH, _PREC_TERM, _PREC_FACTOR, _PREC_ATOM = range(5)
+
+_PRECEDENCE = {
+    _CONST: _PREC_ATOM,
+    _VAR: _PREC_ATOM,
+    _POS: _PREC_FACTOR,
+    _NEG: _PREC_FACTOR,
+    _ADD: _PREC_ARITH,
+    _SUB: _PREC_ARITH,
+    _MUL: _PREC_TERM,
+    _DIV: _PREC_TERM,
+}
+_SOURCE_SYMBOLS = {_POS: "+", _NEG: "-", _ADD: " + ", _SUB: " - ", _MUL: " * ", _DIV: " / "}
+_STEP_SYMBOLS = {_ADD: "+", _SUB: "-", _MUL: "×", _DIV: "÷"}
+_BINARY_OPS = {ast.Add: _ADD, ast.Sub: _SUB, ast.Mult: _MUL, ast.Div: _DIV}
+_UNARY_OPS = {ast.UAdd: _POS, ast.USub: _NEG}
+
+
+def _preview(expression: str, limit: int = 80) -> str:
+    if len(expression) <= limit:
+        return expression
+    return f"{expression[:limit]}…"
+
+
+def _invalid(expression: str) -> MathToolError:
+    return MathToolError(f"Invalid expression '{_preview(expression)}'.")
+
+
+@dataclass(frozen=True, slots=True)
+class _Program:
+    """Flat postfix form of an expression together with its rendered text.
+
+    Node ``i`` is the ``i``-th postfix instruction, so iterating in index order
+    is a post-order walk and the step trace can be produced without recursion.
+    """
+
+    codes: list[int]
+    constants: list[float]
+    names: list[str | None]
+    left: list[int]
+    right: list[int]
+    text: str
+    starts: list[int]
+    ends: list[int]
+    operations: int
+
+
+class _AnyName:
+    """Container that admits every identifier as a variable."""
+
+    def __contains__(self, name: object) -> bool:
+        return True
+
+
+def _parse(
+    expression: str,
+    budget: MathBudget,
+    variables: Container[str] | None = None,
+) -> _Program:
+    """Parse ``expression`` with :func:`ast.parse` and flatten it into a postfix program.
+
+    The tree is walked iteratively in the order the recursive evaluator used,
+    so the first unsupported node is the one reported. Identifiers are
+    rejected unless ``variables`` admits them.
+    """
+    if len(expression) > budget.max_length:
+        raise MathToolError(
+            f"Expression is {len(expression)} characters long; the budget allows {budget.max_length}."
+        )
+    try:
+        tree = ast.parse(expression, mode="eval").body
+    except (RecursionError, MemoryError) as exc:
+        # CPython builds the tree recursively and gives up a few thousand levels deep.
+        raise MathToolError("Expression is nested too deeply to parse.") from exc
+    except (SyntaxError, ValueError) as exc:
+        raise _invalid(expression) from exc
+
+    codes: list[int] = []
+    literals: list[int | float | str] = []
+    nodes = 0
+    work: list[tuple[ast.AST, bool]] = [(tree, False)]
+    while work:
+        node, visited = work.pop()
+        if visited:
+            if isinstance(node, ast.BinOp):
+                code = _BINARY_OPS.get(type(node.op))
+                if code is None:
+                    raise MathToolError(f"Unsupported operator: {type(node.op).__name__}")
+            else:
+                code = _UNARY_OPS[type(node.op)]
+            codes.append(code)
+            literals.append("")
+            continue
+
+        nodes += 1
+        if nodes > budget.max_nodes:
+            raise MathToolError(f"Expression exceeds the node budget of {budget.max_nodes}.")
+        if isinstance(node, ast.BinOp):
+            work += [(node, True), (node.right, False), (node.left, False)]
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+            work += [(node, True), (node.operand, False)]
+        elif isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            codes.append(_CONST)
+            literals.append(node.value)
+        elif isinstance(node, ast.Name) and variables is not None:
+            if node.id not in variables:
+                raise MathToolError(f"Unknown variable '{node.id}'.")
+            codes.append(_VAR)
+            literals.append(node.id)
+        else:
+            raise MathToolError(f"Unsupported expression component: {ast.dump(node)}")
+
+    return _link(codes, literals, budget)
+
+
+def _render_literal(literal: int | float | str) -> str:
+    if isinstance(literal, str):
+        return literal
+    # ``ast.unparse`` spells overflowing float literals as 1e309.
+    return repr(literal).replace("inf", "1e309")
+
+
+def _link(
+    codes: list[int],
+    literals: list[int | float | str],
+    budget: MathBudget,
+) -> _Program:
+    """Resolve child indices, enforce the depth budget and render the text once."""
+    size = len(codes)
+    left = [-1] * size
+    right = [-1] * size
+    depth = [1] * size
+    constants = [0.0] * size
+    names: list[str | None] = [None] * size
+    operations = 0
+    operands: list[int] = []
+
+    for index, code in enumerate(codes):
+        if code == _CONST:
+            try:
+                constants[index] = float(literals[index])
+            except OverflowError as exc:
+                raise MathToolError(
+                    f"Literal {literals[index]} exceeds the magnitude budget of {budget.max_magnitude:g}."
+                ) from exc
+        elif code == _VAR:
+            names[index] = literals[index]
+        elif code == _POS or code == _NEG:
+            child = operands.pop()
+            left[index] = child
+            depth[index] = depth[child] + 1
+        else:
+            right_child = operands.pop()
+            left_child = operands.pop()
+            left[index] = left_child
+            right[index] = right_child
+            depth[index] = max(depth[left_child], depth[right_child]) + 1
+            operations += 1
+        if depth[index] > budget.max_depth:
+            raise MathToolError(
+                f"Expression exceeds the depth budget of {budget.max_depth}."
+            )
+        operands.append(index)
+
+    # Render the whole expression in one iterative in-order pass, remembering the
+    # span of every node so sub-expressions can be sliced out later.
+    pieces: list[str] = []
+    starts = [0] * size
+    ends = [0] * size
+    offset = 0
+    work: list[tuple[int, int, int]] = [(0, size - 1, _PREC_TEST)]
+    while work:
+        action, index, extra = work.pop()
+        if action == 1:  # emit an operator between two operands
+            symbol = _SOURCE_SYMBOLS[codes[index]]
+            pieces.append(symbol)
+            offset += len(symbol)
+            continue
+        if action == 2:  # close a node, optionally with a parenthesis
+            ends[index] = offset
+            if extra:
+                pieces.append(")")
+                offset += 1
+            continue
+
+        code = codes[index]
+        precedence = _PRECEDENCE[code]
+        parenthesize = precedence < extra
+        if parenthesize:
+            pieces.append("(")
+            offset += 1
+        starts[index] = offset
+        if code == _CONST or code == _VAR:
+            literal = _render_literal(literals[index])
+            pieces.append(literal)
+            offset += len(literal)
+            work.append((2, index, parenthesize))
+        elif code == _POS or code == _NEG:
+            pieces.append(_SOURCE_SYMBOLS[code])
+            offset += 1
+            work.append((2, index, parenthesize))
+            work.append((0, left[index], _PREC_FACTOR))
+        else:
+            work.append((2, index, parenthesize))
+            work.append((0, right[index], precedence + 1))
+            work.append((1, index, 0))
+            work.append((0, left[index], precedence))
+
+    return _Program(
+        codes=codes,
+        constants=constants,
+        names=names,
+        left=left,
+        right=right,
+        text="".join(pieces),
+        starts=starts,
+        ends=ends,
+        operations=operations,
+    )
+
+
+class StepTrace(Sequence[str]):
+    """Lazily rendered, post-order list of evaluation steps."""
+
+    __slots__ = ("_program", "_values", "_max_chars")
+
+    def __init__(self, program: _Program, values: list[float], max_chars: int) -> None:
+        self._program = program
+        self._values = values
+        self._max_chars = max_chars
+
+    def __len__(self) -> int:
+        return len(self._program.codes)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self._render(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("step index out of range")
+        return self._render(index)
+
+    def _source(self, index: int) -> str:
+        start = self._program.starts[index]
+        end = self._program.ends[index]
+        if end - start <= self._max_chars:
+            return self._program.text[start:end]
+        keep = max(self._max_chars // 2 - 1, 1)
+        return f"{self._program.text[start:start + keep]} … {self._program.text[end - keep:end]}"
+
+    def _render(self, index: int) -> str:
+        program = self._program
+        code = program.codes[index]
+        value = self._values[index]
+        if code in _STEP_SYMBOLS:
+            left = self._source(program.left[index])
+            right = self._source(program.right[index])
+            return f"{left} {_STEP_SYMBOLS[code]} {right} = {value}"
+        return f"{self._source(index)} = {value}"
+
+
+@dataclass(slots=True)
+class EvalResult:
     value: float
     operations: int
-    steps: list[str]
+    steps: StepTrace
     expression: str
 
 
-def _evaluate_ast(node: ast.AST) -> _EvalResult:
-    if isinstance(node, ast.Expression):
-        return _evaluate_ast(node.body)
-
-    if isinstance(node, ast.BinOp):
-        left = _evaluate_ast(node.left)
-        right = _evaluate_ast(node.right)
-        op_type = type(node.op)
-        symbol: str
-        func: Any
-        if op_type is ast.Add:
-            func = lambda a, b: a + b
-            symbol = "+"
-        elif op_type is ast.Sub:
-            func = lambda a, b: a - b
-            symbol = "-"
-        elif op_type is ast.Mult:
-            func = lambda a, b: a * b
-            symbol = "×"
-        elif op_type is ast.Div:
-            if right.value == 0:
+def _execute(program: _Program, budget: MathBudget) -> EvalResult:
+    codes = program.codes
+    left = program.left
+    right = program.right
+    limit = budget.max_magnitude
+    values = [0.0] * len(codes)
+
+    for index, code in enumerate(codes):
+        if code == _CONST:
+            value = program.constants[index]
+        elif code == _NEG:
+            value = -values[left[index]]
+        elif code == _POS:
+            value = values[left[index]]
+        elif code == _ADD:
+            value = values[left[index]] + values[right[index]]
+        elif code == _SUB:
+            value = values[left[index]] - values[right[index]]
+        elif code == _MUL:
+            value = values[left[index]] * values[right[index]]
+        elif code == _DIV:
+            divisor = values[right[index]]
+            if divisor == 0:
                 raise MathToolError("Division by zero is not allowed.")
-            func = lambda a, b: a / b
-            symbol = "÷"
+            value = values[left[index]] / divisor
         else:
-            raise MathToolError(f"Unsupported operator: {op_type.__name__}")
-
-        value = func(left.value, right.value)
-        expr = ast.unparse(node)
-        step = f"{ast.unparse(node.left)} {symbol} {ast.unparse(node.right)} = {value}"
-        return _EvalResult(
-            value=value,
-            operations=left.operations + right.operations + 1,
-            steps=[*left.steps, *right.steps, step],
-            expression=expr,
-        )
+            raise MathToolError(f"Unbound variable '{program.names[index]}'.")
+        if not -limit <= value <= limit:
+            raise MathToolError(
+                f"Intermediate result {value} exceeds the magnitude budget of {limit:g}."
+            )
+        values[index] = value
+
+    return EvalResult(
+        value=values[-1],
+        operations=program.operations,
+        steps=StepTrace(program, values, budget.max_operand_chars),
+        expression=program.text,
+    )
+
+
+def evaluate_expression(expression: str, budget: MathBudget | None = None) -> EvalResult:
+    """Parse and evaluate ``expression`` iteratively within ``budget``.
+
+    Runs in time linear in the size of the expression; the step trace is only
+    rendered when it is read.
+    """
+    if not expression:
+        raise MathToolError("Expression must be a non-empty string.")
+    budget = budget or get_math_budget()
+    return _execute(_parse(expression, budget), budget)
+
+
+# Runs of blanks become one space; how far a line is indented only matters as
+# "indented or not", which a single space preserves.
+_SPACE_RUN_RE = re.compile(r"[ \t]{2,}|\t")
+_SYMBOLS = r"\-+*/%@&|^~<>=!:,"
+# A single space between two tokens is dropped only where the characters around
+# it cannot join into one token: next to a parenthesis, between an operator and
+# a number or name, and before a sign that no operator ends with. Exponent signs
+# (``1e -5``) and operator pairs such as ``* *`` or ``/ /`` keep their space.
+_REDUNDANT_SPACE_RE = re.compile(
+    rf" (?:(?<=\S )(?=[()])|(?<=[()] )(?=\S)|(?<=[{_SYMBOLS}] )(?=[\w.+\-~])"
+    rf"|(?<=[\w.] )(?<![eE] )(?=[{_SYMBOLS}])|(?<=[eE] )(?=[*/%@&|^~<>=!:,]))"
+)
+
+
+def normalize_expression(expression: str) -> str:
+    """Drop whitespace that cannot change how ``expression`` tokenises.
+
+    Leading whitespace and line breaks are kept, since both are significant.
+    """
+    collapsed = _SPACE_RUN_RE.sub(" ", expression.rstrip(" \t\f\r\n"))
+    return _REDUNDANT_SPACE_RE.sub("", collapsed)
+
+
+# Rough memory held per node of a compiled program (eight parallel lists).
+_PROGRAM_NODE_BYTES = 128
+_ENTRY_OVERHEAD_BYTES = 256
+
+
+@dataclass(slots=True)
+class _CacheEntry:
+    program: _Program | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    # Error messages quote the expression, so they are only reused for the same spelling.
+    source: str | None = None
+
+    def size(self) -> int:
+        """Estimated bytes held by the entry."""
+        size = _ENTRY_OVERHEAD_BYTES
+        if self.program is not None:
+            size += len(self.program.text) + _PROGRAM_NODE_BYTES * len(self.program.codes)
+        if self.result is not None:
+            size += len(self.result["expression"])
+            size += sum(len(step) for step in self.result["steps"])
+            size += sum(len(step) for step in self.result.get("last_steps", ()))
+        if self.error is not None:
+            size += len(self.error) + len(self.source or "")
+        return size
 
-    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
-        operand = _evaluate_ast(node.operand)
-        value = operand.value if isinstance(node.op, ast.UAdd) else -operand.value
-        expr = ast.unparse(node)
-        return _EvalResult(
-            value=value,
-            operations=operand.operations,
-            steps=[*operand.steps, f"{expr} = {value}"],
-            expression=expr,
-        )
 
-    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
-        value = float(node.value)
-        expr = ast.unparse(node)
-        return _EvalResult(value=value, operations=0, steps=[f"{expr} = {value}"], expression=expr)
+class ExpressionCache:
+    """Thread-safe LRU cache of compiled programs and rendered tool results.
 
-    raise MathToolError(f"Unsupported expression component: {ast.dump(node)}")
+    Keys combine the normalised expression with the variable set it was
+    compiled for; failures are cached too so repeated bad input stays cheap.
+    Besides ``max_entries``, the estimated size of all entries is kept under
+    ``max_bytes``; an entry larger than that is not cached at all.
+    """
 
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self._entries: OrderedDict[tuple[str, Any], _CacheEntry] = OrderedDict()
+        self._sizes: dict[tuple[str, Any], int] = {}
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
-def compute_basic_math(expression: str) -> dict[str, Any]:
-    """Evaluate an arithmetic expression composed of +, -, *, /, and parentheses."""
+    def get(self, key: tuple[str, Any], expression: str | None = None) -> _CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.error is not None and entry.source != expression:
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
 
+    def put(self, key: tuple[str, Any], entry: _CacheEntry) -> None:
+        if self.max_entries <= 0:
+            return
+        size = entry.size()
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._sizes[key] = size
+            self.bytes += size
+            self._shrink()
+
+    def resize(self, max_entries: int, max_bytes: int | None = None) -> None:
+        with self._lock:
+            self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._shrink()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.bytes = 0
+
+    def _discard(self, key: tuple[str, Any]) -> None:
+        if self._entries.pop(key, None) is not None:
+            self.bytes -= self._sizes.pop(key)
+
+    def _shrink(self) -> None:
+        while self._entries and (
+            len(self._entries) > max(self.max_entries, 0) or self.bytes > self.max_bytes
+        ):
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache: ExpressionCache | None = None
+
+
+def get_expression_cache() -> ExpressionCache:
+    """Return the process-wide cache, sized from ``MATH_CACHE_SIZE`` and ``MATH_CACHE_MB`` on first use."""
+    global _cache
+    if _cache is None:
+        raw = os.getenv("MATH_CACHE_SIZE", "1024")
+        try:
+            max_entries = int(raw)
+        except ValueError as exc:
+            raise ValueError(f"MATH_CACHE_SIZE must be an integer, got '{raw}'.") from exc
+        raw = os.getenv("MATH_CACHE_MB", "64")
+        try:
+            max_bytes = int(float(raw) * 1024 * 1024)
+        except ValueError as exc:
+            raise ValueError(f"MATH_CACHE_MB must be numeric, got '{raw}'.") from exc
+        _cache = ExpressionCache(max_entries, max_bytes)
+    return _cache
+
+
+# With ``summarize_steps``, tool results list the first and last steps of a long
+# trace and count the rest, so a huge expression never renders its whole trace.
+_RESULT_HEAD_STEPS = 20
+_RESULT_TAIL_STEPS = 10
+
+
+def _render_result(result: EvalResult, summarize_steps: bool) -> dict[str, Any]:
+    steps = result.steps
+    rendered: dict[str, Any] = {
+        "expression": result.expression,
+        "result": result.value,
+        "operations_count": result.operations,
+    }
+    omitted = len(steps) - _RESULT_HEAD_STEPS - _RESULT_TAIL_STEPS
+    if not summarize_steps or omitted <= 0:
+        rendered["steps"] = list(steps)
+    else:
+        rendered["steps"] = steps[:_RESULT_HEAD_STEPS]
+        rendered["steps_omitted"] = omitted
+        rendered["last_steps"] = steps[len(steps) - _RESULT_TAIL_STEPS :]
+    return rendered
+
+
+def compute_basic_math(expression: str, summarize_steps: bool = False) -> dict[str, Any]:
+    """Evaluate an arithmetic expression composed of +, -, *, /, and parentheses.
+
+    With `summarize_steps`, a long step trace lists only the first `steps`,
+    then the number of `steps_omitted`, then the `last_steps`.
+    """
+
+    if not expression:
+        raise MathToolError("Expression must be a non-empty string.")
+
+    cache = get_expression_cache()
+    key = (normalize_expression(expression), "summary" if summarize_steps else None)
+    entry = cache.get(key, expression)
+    if entry is None:
+        budget = get_math_budget()
+        entry = _CacheEntry()
+        try:
+            entry.program = _parse(expression, budget)
+            entry.result = _render_result(_execute(entry.program, budget), summarize_steps)
+        except MathToolError as exc:
+            entry.error = str(exc)
+            entry.source = expression
+        cache.put(key, entry)
+
+    if entry.error is not None:
+        raise MathToolError(entry.error)
+    # Hand out a copy so callers cannot mutate the cached result.
+    result = {**entry.result, "steps": list(entry.result["steps"])}
+    if "last_steps" in result:
+        result["last_steps"] = list(result["last_steps"])
+    return result
+
+
+# Per-row status codes for batch evaluation; the first failure of a row wins.
+_ROW_OK, _ROW_DIV_ZERO, _ROW_MAGNITUDE, _ROW_BAD_INPUT = range(4)
+_ROW_ERRORS = {
+    _ROW_DIV_ZERO: "Division by zero is not allowed.",
+    _ROW_MAGNITUDE: "Intermediate result exceeds the magnitude budget.",
+    _ROW_BAD_INPUT: "Missing or non-numeric input value.",
+}
+_UFUNCS = {_ADD: np.add, _SUB: np.subtract, _MUL: np.multiply}
+_MAX_REPORTED_ERRORS = 50
+
+
+def _flag(status: np.ndarray, mask: Any, code: int) -> None:
+    status[(status == _ROW_OK) & mask] = code
+
+
+@dataclass(slots=True)
+class BatchResult:
+    """Row-wise values of a compiled expression plus per-row failure codes."""
+
+    expression: str
+    values: np.ndarray
+    status: np.ndarray
+
+    @property
+    def error_count(self) -> int:
+        return int(np.count_nonzero(self.status))
+
+    def errors(self, limit: int | None = None) -> list[dict[str, Any]]:
+        rows = np.flatnonzero(self.status)
+        if limit is not None:
+            rows = rows[:limit]
+        return [
+            {"row": int(row), "error": _ROW_ERRORS[int(self.status[row])]}
+            for row in rows
+        ]
+
+    def summary(self) -> dict[str, Any]:
+        valid = self.values[self.status == _ROW_OK]
+        stats: dict[str, Any] = {
+            "rows": int(self.values.size),
+            "succeeded": int(valid.size),
+            "failed": self.error_count,
+        }
+        if valid.size:
+            stats.update(
+                sum=float(valid.sum()),
+                mean=float(valid.mean()),
+                min=float(valid.min()),
+                max=float(valid.max()),
+                std=float(valid.std()),
+            )
+        return stats
+
+    def results(self) -> list[float | None]:
+        return [
+            None if code else value
+            for value, code in zip(self.values.tolist(), self.status.tolist())
+        ]
+
+
+def _as_column(name: str, values: Any) -> np.ndarray:
+    """Convert inline column values to floats; bad cells become NaN like in :func:`load_columns`."""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    if isinstance(values, (str, bytes, Mapping)) or not isinstance(values, Iterable):
+        raise MathToolError(f"Column '{name}' must be a list of values.")
+    return np.fromiter((_to_float(value) for value in values), dtype=np.float64)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledExpression:
+    """An expression parsed once and evaluable over columns of variable values."""
+
+    expression: str
+    variables: tuple[str, ...]
+    program: _Program
+    budget: MathBudget
+
+    def evaluate(self, columns: Mapping[str, Any]) -> BatchResult:
+        """Evaluate every row in one vectorised pass over ``columns``."""
+        arrays: dict[str, np.ndarray] = {}
+        rows: int | None = None
+        for name in self.variables:
+            if name not in columns:
+                raise MathToolError(f"Missing column for variable '{name}'.")
+            array = _as_column(name, columns[name])
+            if array.ndim != 1:
+                raise MathToolError(f"Column '{name}' must be one-dimensional.")
+            if rows is None:
+                rows = array.size
+            elif array.size != rows:
+                raise MathToolError("All variable columns must have the same length.")
+            arrays[name] = array
+        rows = 1 if rows is None else rows
+
+        program = self.program
+        limit = self.budget.max_magnitude
+        status = np.zeros(rows, dtype=np.int8)
+        for array in arrays.values():
+            _flag(status, np.isnan(array), _ROW_BAD_INPUT)
+
+        stack: list[Any] = []
+        with np.errstate(all="ignore"):
+            for index, code in enumerate(program.codes):
+                if code == _CONST:
+                    value = program.constants[index]
+                elif code == _VAR:
+                    value = arrays[program.names[index]]
+                elif code == _NEG:
+                    value = np.negative(stack.pop())
+                elif code == _POS:
+                    value = stack.pop()
+                else:
+                    right = stack.pop()
+                    left = stack.pop()
+                    if code == _DIV:
+                        zero = np.equal(right, 0)
+                        _flag(status, zero, _ROW_DIV_ZERO)
+                        value = np.divide(left, np.where(zero, np.nan, right))
+                    else:
+                        value = _UFUNCS[code](left, right)
+                _flag(status, ~(np.abs(value) <= limit), _ROW_MAGNITUDE)
+                stack.append(value)
+
+        values = np.array(np.broadcast_to(stack.pop(), (rows,)), dtype=np.float64)
+        values[status != _ROW_OK] = np.nan
+        return BatchResult(expression=self.expression, values=values, status=status)
+
+
+def compile_expression(
+    expression: str,
+    variables: Iterable[str] | None = None,
+    budget: MathBudget | None = None,
+) -> CompiledExpression:
+    """Parse ``expression`` once so it can be evaluated over many rows.
+
+    When ``variables`` is omitted every identifier in the expression is treated
+    as a variable.
+    """
     if not expression:
         raise MathToolError("Expression must be a non-empty string.")
+    allowed = _AnyName() if variables is None else frozenset(variables)
+    if budget is not None:
+        program = _parse(expression, budget, allowed)
+    else:
+        budget = get_math_budget()
+        cache = get_expression_cache()
+        key = (normalize_expression(expression), "*" if variables is None else allowed)
+        entry = cache.get(key, expression)
+        if entry is None:
+            entry = _CacheEntry()
+            try:
+                entry.program = _parse(expression, budget, allowed)
+            except MathToolError as exc:
+                entry.error = str(exc)
+                entry.source = expression
+            cache.put(key, entry)
+        if entry.error is not None:
+            raise MathToolError(entry.error)
+        program = entry.program
+    names = tuple(dict.fromkeys(name for name in program.names if name is not None))
+    return CompiledExpression(
+        expression=program.text,
+        variables=names,
+        program=program,
+        budget=budget,
+    )
+
 
+def _to_float(raw: Any) -> float:
     try:
-        tree = ast.parse(expression, mode="eval")
-    except SyntaxError as exc:  # pragma: no cover - defensive
-        raise MathToolError(f"Invalid expression '{expression}'.") from exc
+        return float(raw)
+    except (TypeError, ValueError):
+        return float("nan")
 
-    result = _evaluate_ast(tree)
-    return {
+
+def _confined_path(path: str | Path, env_name: str, default: str) -> Path:
+    """Resolve ``path`` inside the directory named by ``env_name``.
+
+    Tool arguments come from the model, so absolute paths, ``..`` components
+    and symlinks that lead outside the directory are all rejected.
+    """
+    root = Path(os.getenv(env_name) or default).expanduser().resolve()
+    relative = Path(path)
+    if not str(path).strip() or relative.is_absolute() or relative.drive or ".." in relative.parts:
+        raise MathToolError(
+            f"'{path}' must be a relative path inside the {env_name} directory."
+        )
+    resolved = (root / relative).resolve()
+    if not resolved.is_relative_to(root) or resolved == root:
+        raise MathToolError(
+            f"'{path}' must be a relative path inside the {env_name} directory."
+        )
+    return resolved
+
+
+def resolve_data_path(path: str | Path) -> Path:
+    """Resolve a data file name inside ``MATH_DATA_DIR`` (default ``data``)."""
+    return _confined_path(path, "MATH_DATA_DIR", "data")
+
+
+def resolve_output_path(path: str | Path) -> Path:
+    """Resolve a result file name inside ``MATH_OUTPUT_DIR`` (default ``data/results``)."""
+    return _confined_path(path, "MATH_OUTPUT_DIR", "data/results")
+
+
+def load_columns(path: str | Path, names: Iterable[str]) -> dict[str, np.ndarray]:
+    """Read the named columns from a CSV or JSONL file as float arrays.
+
+    Missing or non-numeric cells become NaN and are reported as row errors.
+    ``path`` is trusted; tool arguments go through :func:`resolve_data_path`.
+    """
+    path = Path(path)
+    names = tuple(names)
+    columns: dict[str, list[float]] = {name: [] for name in names}
+    suffix = path.suffix.lower()
+    try:
+        with path.open(newline="", encoding="utf-8") as handle:
+            if suffix == ".csv":
+                records: Iterable[Mapping[str, Any]] = csv.DictReader(handle)
+            elif suffix in {".jsonl", ".ndjson"}:
+                records = (json.loads(line) for line in handle if line.strip())
+            else:
+                raise MathToolError(
+                    f"Unsupported data file '{path.name}'; use .csv or .jsonl."
+                )
+            for record in records:
+                for name in names:
+                    columns[name].append(_to_float(record.get(name)))
+    except OSError as exc:
+        raise MathToolError(f"Could not read data file '{path}': {exc}") from exc
+    except json.JSONDecodeError as exc:
+        raise MathToolError(f"Invalid JSONL in '{path.name}': {exc}") from exc
+    return {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+
+
+def _write_results(path: Path, result: BatchResult) -> None:
+    if path.suffix.lower() not in {".csv", ".jsonl", ".ndjson"}:
+        raise MathToolError(f"Unsupported output file '{path.name}'; use .csv or .jsonl.")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = zip(result.results(), result.status.tolist())
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        if path.suffix.lower() == ".csv":
+            writer = csv.writer(handle)
+            writer.writerow(["row", "result", "error"])
+            for row, (value, code) in enumerate(rows):
+                writer.writerow([row, "" if value is None else value, _ROW_ERRORS.get(code, "")])
+        else:
+            for row, (value, code) in enumerate(rows):
+                record = {"row": row, "result": value, "error": _ROW_ERRORS.get(code)}
+                handle.write(json.dumps(record) + "\n")
+
+
+def compute_batch_math(
+    expression: str,
+    columns: Optional[dict] = None,
+    data_path: Optional[str] = None,
+    output_path: Optional[str] = None,
+) -> dict[str, Any]:
+    """Apply one arithmetic formula with named variables to many rows at once.
+
+    Supply the variable values either inline as `columns` (variable name -> list
+    of numbers) or via `data_path`, the name of a CSV or JSONL file in the data
+    directory whose columns match the variable names. Rows that divide by zero
+    or have missing values fail individually. When `output_path` is given,
+    per-row results are written to that file in the results directory instead
+    of being returned.
+    """
+
+    # Resolve both paths before doing any work so a rejected path touches nothing.
+    source = resolve_data_path(data_path) if data_path and not columns else None
+    target = resolve_output_path(output_path) if output_path else None
+    compiled = compile_expression(expression, variables=columns.keys() if columns else None)
+    if columns:
+        data = columns
+    elif source is not None:
+        data = load_columns(source, compiled.variables)
+    elif compiled.variables:
+        raise MathToolError("Provide either `columns` or `data_path` with the variable values.")
+    else:
+        data = {}
+
+    result = compiled.evaluate(data)
+    response: dict[str, Any] = {
         "expression": result.expression,
-        "result": result.value,
-        "operations_count": result.operations,
-        "steps": result.steps,
+        "variables": list(compiled.variables),
+        "summary": result.summary(),
+        "errors": result.errors(limit=_MAX_REPORTED_ERRORS),
     }
+    if target is not None:
+        _write_results(target, result)
+        response["output_path"] = output_path
+    else:
+        response["results"] = result.results()
+    return response
@@ -1,44 +1,41 @@
 from __future__ import annotations
 
 import asyncio
+import json
+import os
+import statistics
 import sys
-from typing import Iterable
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
 
 import typer
-from google.adk import Runner
-from google.adk.artifacts.in_memory_artifact_service import (
-    InMemoryArtifactService,
-)
-from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
-from google.adk.sessions.in_memory_session_service import (
-    InMemorySessionService,
-)
-from google.genai import types
 from loguru import logger
 from rich.console import Console
+from rich.table import Table
 
-from google_adk_test import OpenAIConfig, build_math_orchestrator
+from google_adk_test import OpenAIConfig
+from google_adk_test.events import iter_text_parts, summarize_event
+from google_adk_test.settings import aclose_http_clients
 
+if TYPE_CHECKING:
+    from google.adk import Runner
 
-app = typer.Typer(help="Google ADK math orchestration demo.")
-console = Console()
+# google-adk, google-genai and LiteLLM take seconds to import, so they are
+# imported inside the functions that need them; `--help` stays instant.
 
 
-def iter_text_parts(content: types.Content | None) -> Iterable[str]:
-    """Yield text fragments from an event content."""
-    if not content or not content.parts:
-        return
-    for part in content.parts:
-        if part.text:
-            yield part.text
+app = typer.Typer(help="Google ADK math orchestration demo.")
+console = Console()
 
 
-def print_event(event) -> None:
+def print_event(event, *, include_text: bool = True) -> None:
     """Display an ADK event with Rich styling."""
     text_segments = [
         segment.strip() for segment in iter_text_parts(event.content) if segment
     ]
-    if text_segments:
+    if include_text and text_segments:
         console.print(f"[bold]{event.author}[/] {' '.join(text_segments)}")
 
     for function_call in event.get_function_calls():
@@ -54,6 +51,362 @@ def print_event(event) -> None:
         )
 
 
+@dataclass
+class AgentTiming:
+    """Wall-clock marks for one agent within a streamed run."""
+
+    started: float
+    first_token: float | None = None
+    finished: float | None = None
+
+
+async def stream_prompt(
+    runner: Runner,
+    *,
+    user: str,
+    session: str,
+    prompt: str,
+) -> None:
+    """Run a prompt with SSE streaming, echoing tokens as they arrive."""
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types
+
+    message = types.Content(role="user", parts=[types.Part(text=prompt)])
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
+    started = time.perf_counter()
+    first_token: float | None = None
+    streaming_author: str | None = None
+    timings: dict[str, AgentTiming] = {}
+    invocations: set[str] = set()
+
+    async for event in runner.run_async(
+        user_id=user,
+        session_id=session,
+        new_message=message,
+        run_config=run_config,
+    ):
+        now = time.perf_counter()
+        if event.author == "user":
+            continue
+
+        # Parallel agents interleave their events, so each agent is timed on its own.
+        timing = timings.setdefault(event.author, AgentTiming(started=now))
+        timing.finished = now
+        invocations.add(event.invocation_id)
+
+        if event.partial:
+            text = "".join(iter_text_parts(event.content))
+            if not text:
+                continue
+            if streaming_author != event.author:
+                if streaming_author is not None:
+                    console.print()
+                console.print(f"[bold]{event.author}[/] ", end="")
+                streaming_author = event.author
+            console.print(text, end="", markup=False, highlight=False)
+            timing.first_token = timing.first_token or now
+            first_token = first_token or now
+            continue
+
+        # The final event repeats the streamed text; only surface tool traffic.
+        streamed = streaming_author == event.author
+        if streaming_author is not None:
+            console.print()
+            streaming_author = None
+        print_event(event, include_text=not streamed)
+
+    _apply_agent_spans(timings, invocations)
+    print_latency_report(started, first_token, timings)
+
+
+def _apply_agent_spans(timings: dict[str, AgentTiming], invocations: set[str]) -> None:
+    """Replace event-based agent start and end marks with the tracer's agent spans.
+
+    An agent's first event only arrives once its first LLM call answers, so the
+    spans (when tracing is on) give the real start; without them the report
+    falls back to each agent's first and last event.
+    """
+    from google_adk_test.telemetry import tracer
+
+    # Spans carry wall-clock starts; the report uses ``perf_counter`` marks.
+    offset = time.perf_counter() - time.time()
+    spans: dict[str, tuple[float, float]] = {}
+    for span in list(tracer.spans):
+        if span.kind != "agent" or span.trace_id not in invocations or span.name not in timings:
+            continue
+        begin = span.start + offset
+        end = begin + span.duration_ms / 1000
+        if span.name in spans:
+            begin, end = min(begin, spans[span.name][0]), max(end, spans[span.name][1])
+        spans[span.name] = (begin, end)
+    for name, (begin, end) in spans.items():
+        timings[name].started = begin
+        timings[name].finished = max(end, timings[name].finished or end)
+
+
+def print_latency_report(
+    started: float,
+    first_token: float | None,
+    timings: dict[str, AgentTiming],
+) -> None:
+    """Summarise time-to-first-token and per-agent latency."""
+    table = Table(title="Latency")
+    table.add_column("agent")
+    table.add_column("first token (s)", justify="right")
+    table.add_column("duration (s)", justify="right")
+    for author, timing in timings.items():
+        ttft = (
+            f"{timing.first_token - timing.started:.2f}"
+            if timing.first_token is not None
+            else "-"
+        )
+        table.add_row(author, ttft, f"{timing.finished - timing.started:.2f}")
+
+    total = max((t.finished for t in timings.values()), default=started) - started
+    overall_ttft = f"{first_token - started:.2f}" if first_token is not None else "-"
+    table.add_row("[bold]total[/]", overall_ttft, f"{total:.2f}")
+    console.print(table)
+
+
+def build_runner(agent, *, artifacts: bool = True, session_db: Path | None = None) -> Runner:
+    """Wire an agent to ADK services: bounded in-memory, or SQLite-backed with ``session_db``.
+
+    ``session_db`` defaults to ``SESSION_DB``; sessions and artifacts stored
+    there outlive the process. In-memory sessions follow the ``SESSION_*``
+    limits of :class:`~google_adk_test.session_cache.SessionLimits`. Pass
+    ``artifacts=False`` for one-shot workloads that should not keep uploaded files.
+    """
+    from google.adk import Runner
+    from google.adk.artifacts.in_memory_artifact_service import InMemoryArtifactService
+    from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
+
+    from google_adk_test.session_cache import BoundedSessionService
+    from google_adk_test.telemetry import TracingPlugin
+
+    session_db = session_db or os.getenv("SESSION_DB") or None
+    if session_db:
+        from google_adk_test.storage import open_session_store
+
+        session_service, artifact_service = open_session_store(session_db)
+        logger.info("Storing sessions in {}", session_db)
+    else:
+        session_service, artifact_service = BoundedSessionService(), InMemoryArtifactService()
+    return Runner(
+        app_name="agents",
+        agent=agent,
+        session_service=session_service,
+        artifact_service=artifact_service if artifacts else None,
+        memory_service=InMemoryMemoryService(),
+        plugins=[TracingPlugin()],
+    )
+
+
+async def ensure_session(runner: Runner, *, user: str, session: str) -> None:
+    """Create ``session`` unless a durable store already holds it."""
+    service = runner.session_service
+    if await service.get_session(app_name=runner.app_name, user_id=user, session_id=session) is None:
+        await service.create_session(app_name=runner.app_name, user_id=user, session_id=session)
+        logger.debug("Session created for user='{}', session='{}'", user, session)
+    else:
+        logger.debug("Resuming session '{}' of user '{}'", session, user)
+
+
+def read_prompts(path: Path) -> list[dict[str, Any]]:
+    """Load prompts from JSONL; each line is a string or an object with a `prompt` key."""
+    prompts: list[dict[str, Any]] = []
+    with path.open(encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"prompt": record}
+            if not isinstance(record, dict) or not record.get("prompt"):
+                raise typer.BadParameter(
+                    f"Line {line_number} of {path} has no 'prompt' field."
+                )
+            record.setdefault("id", str(len(prompts)))
+            prompts.append(record)
+    return prompts
+
+
+async def run_prompt(runner: Runner, *, user: str, record: dict[str, Any]) -> dict[str, Any]:
+    """Run one prompt in its own session and collect its events and timing."""
+    from google.genai import types
+
+    started = time.perf_counter()
+    events: list[dict[str, Any]] = []
+    error: str | None = None
+
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name,
+        user_id=user,
+    )
+    try:
+        message = types.Content(role="user", parts=[types.Part(text=record["prompt"])])
+        async for event in runner.run_async(
+            user_id=user,
+            session_id=session.id,
+            new_message=message,
+        ):
+            if event.author != "user":
+                events.append(summarize_event(event))
+    except Exception as exc:  # noqa: BLE001 - one failed prompt must not stop the batch
+        logger.warning("Prompt {} failed: {}", record["id"], exc)
+        error = f"{type(exc).__name__}: {exc}"
+    finally:
+        # Sessions are not reused, so drop them to keep memory flat over long batches.
+        await runner.session_service.delete_session(
+            app_name=runner.app_name,
+            user_id=user,
+            session_id=session.id,
+        )
+
+    final = next((event["text"] for event in reversed(events) if "text" in event), None)
+    return {
+        "id": record["id"],
+        "prompt": record["prompt"],
+        "latency_s": round(time.perf_counter() - started, 4),
+        "final_response": final,
+        "events": events,
+        "error": error,
+    }
+
+
+async def run_batch(
+    runner: Runner,
+    prompts: list[dict[str, Any]],
+    *,
+    user: str,
+    output: Path,
+    concurrency: int,
+) -> list[dict[str, Any]]:
+    """Run prompts concurrently and append each result to ``output`` as it completes."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _bounded(record: dict[str, Any]) -> dict[str, Any]:
+        async with semaphore:
+            return await run_prompt(runner, user=user, record=record)
+
+    results: list[dict[str, Any]] = []
+    with output.open("w", encoding="utf-8") as handle:
+        for finished in asyncio.as_completed([_bounded(record) for record in prompts]):
+            result = await finished
+            handle.write(json.dumps(result, default=str) + "\n")
+            handle.flush()
+            results.append(result)
+            logger.debug(
+                "Prompt {} finished in {:.2f}s ({}/{})",
+                result["id"],
+                result["latency_s"],
+                len(results),
+                len(prompts),
+            )
+    return results
+
+
+def print_batch_report(results: list[dict[str, Any]], elapsed: float) -> None:
+    """Summarise throughput and latency percentiles for a batch."""
+    from google_adk_test.agents import fast_path_stats
+    from google_adk_test.coalescing import single_flight_stats
+    from google_adk_test.llm_cache import response_cache_stats
+    from google_adk_test.routing import routing_stats
+    from google_adk_test.scheduling import scheduler_stats
+
+    latencies = sorted(result["latency_s"] for result in results)
+    failures = sum(1 for result in results if result["error"])
+    table = Table(title="Batch summary")
+    table.add_column("metric")
+    table.add_column("value", justify="right")
+    table.add_row("prompts", str(len(results)))
+    table.add_row("failed", str(failures))
+    table.add_row("wall time (s)", f"{elapsed:.2f}")
+    table.add_row("prompts / s", f"{len(results) / elapsed:.2f}" if elapsed else "-")
+    if latencies:
+        table.add_row("p50 latency (s)", f"{statistics.median(latencies):.2f}")
+        table.add_row("p95 latency (s)", f"{latencies[int(0.95 * (len(latencies) - 1))]:.2f}")
+        table.add_row("max latency (s)", f"{latencies[-1]:.2f}")
+    fast_path = fast_path_stats.snapshot()
+    if fast_path["checks"]:
+        table.add_row("fast-path hit rate", f"{fast_path['hit_rate']:.1%}")
+        table.add_row("fast-path avg (ms)", f"{fast_path['avg_hit_ms']:.2f}")
+    for flight in single_flight_stats.snapshot():
+        table.add_row(
+            "coalesced requests",
+            f"{flight['coalescing_ratio']:.1%} of {flight['requests']} ({flight['executions']} runs)",
+        )
+    for cache in response_cache_stats():
+        table.add_row("LLM cache hit rate", f"{cache['hit_rate']:.1%} of {cache['hits'] + cache['misses']}")
+    for cassette in _cassette_stats():
+        table.add_row(
+            f"cassette ({cassette['mode']}) hits / misses / recorded",
+            f"{cassette['hits']} / {cassette['misses']} / {cassette['recorded']}",
+        )
+    for scheduler in scheduler_stats():
+        if not scheduler["admitted"]:
+            continue
+        table.add_row(
+            f"{scheduler['model']} queue wait p50/p95 (ms)",
+            f"{scheduler['queue_wait_p50_ms']:.0f}/{scheduler['queue_wait_p95_ms']:.0f}",
+        )
+        table.add_row(
+            f"{scheduler['model']} retries (429s)", f"{scheduler['retries']} ({scheduler['rate_limited']})"
+        )
+        if scheduler["hedges"]:
+            table.add_row(
+                f"{scheduler['model']} hedges (won)", f"{scheduler['hedges']} ({scheduler['hedge_wins']})"
+            )
+    for endpoint in routing_stats():
+        table.add_row(
+            f"{endpoint['model']} calls (errors, SLO trips)",
+            f"{endpoint['calls']} ({endpoint['errors']}, {endpoint['trips']})",
+        )
+    console.print(table)
+
+
+def print_profile() -> None:
+    """Show where the time went, slowest (by total) first."""
+    from google_adk_test.telemetry import tracer
+
+    table = Table(title="Profile")
+    table.add_column("kind")
+    table.add_column("name")
+    for column in ("calls", "errors", "total (ms)", "mean (ms)", "p95 (ms)", "tokens in/out", "cache hits", "queued (ms)", "retries"):
+        table.add_column(column, justify="right")
+    for row in tracer.summary():
+        table.add_row(
+            row["kind"],
+            row["name"],
+            str(row["count"]),
+            str(row["errors"]),
+            f"{row['total_ms']:.1f}",
+            f"{row['mean_ms']:.1f}",
+            f"{row['p95_ms']:.1f}",
+            f"{row['prompt_tokens']}/{row['completion_tokens']}" if row["kind"] == "llm" else "-",
+            str(row["cache_hits"]) if row["kind"] == "llm" else "-",
+            f"{row['queue_wait_ms']:.1f}" if row["kind"] == "llm" else "-",
+            str(row["retries"]) if row["kind"] == "llm" else "-",
+        )
+    console.print(table)
+
+
+def export_telemetry(
+    *, profile: bool, trace_file: Path | None, metrics_file: Path | None
+) -> None:
+    """Print and/or write the spans collected during this command."""
+    from google_adk_test.telemetry import tracer
+
+    if profile:
+        print_profile()
+    if trace_file is not None:
+        tracer.write_trace(trace_file)
+        console.print(f"Trace written to [bold]{trace_file}[/]")
+    if metrics_file is not None:
+        tracer.write_prometheus(metrics_file)
+        console.print(f"Metrics written to [bold]{metrics_file}[/]")
+
+
 def configure_logging(debug: bool) -> None:
     """Set up loguru sinks."""
     logger.remove()
@@ -85,45 +438,401 @@ def run(
         "--debug",
         help="Enable verbose logging.",
     ),
+    stream: bool = typer.Option(
+        False,
+        "--stream",
+        help="Stream tokens as they are generated and report per-agent latency.",
+    ),
+    fast_path: Optional[bool] = typer.Option(
+        None,
+        "--fast-path/--no-fast-path",
+        help="Answer plain arithmetic prompts without calling any LLM (default: MATH_FAST_PATH).",
+    ),
+    pipeline: Optional[str] = typer.Option(
+        None,
+        "--pipeline",
+        help="Pipeline mode: sequential, conditional or parallel (default: MATH_PIPELINE_MODE).",
+    ),
+    session_db: Optional[Path] = typer.Option(
+        None,
+        "--session-db",
+        help="SQLite file that keeps sessions and artifacts across runs (default: SESSION_DB; in memory when unset).",
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Print per-agent, per-LLM-call and per-tool timings when done.",
+    ),
+    trace_file: Optional[Path] = typer.Option(
+        None,
+        "--trace-file",
+        help="Write spans as JSON (Chrome trace format, opens in Perfetto).",
+    ),
+    metrics_file: Optional[Path] = typer.Option(
+        None,
+        "--metrics-file",
+        help="Write aggregated metrics in Prometheus text format.",
+    ),
 ) -> None:
     """Execute the orchestrator for a single user prompt."""
+    from google_adk_test import build_math_orchestrator
+
     configure_logging(debug)
 
     config = OpenAIConfig.from_env()
     logger.info("Using OpenAI model {}", config.model)
 
-    orchestrator = build_math_orchestrator(config)
+    runner = build_runner(
+        build_math_orchestrator(config, fast_path=fast_path, mode=pipeline), session_db=session_db
+    )
+    logger.debug("Runner initialized with session '{}'", session)
+
+    if stream:
+        asyncio.run(
+            _close_clients_after(
+                _stream_run(runner, user=user, session=session, prompt=prompt)
+            )
+        )
+        export_telemetry(profile=profile, trace_file=trace_file, metrics_file=metrics_file)
+        return
 
-    session_service = InMemorySessionService()
     asyncio.run(
-        session_service.create_session(
-            app_name="agents",
-            user_id=user,
-            session_id=session,
+        _close_clients_after(_print_run(runner, user=user, session=session, prompt=prompt))
+    )
+    export_telemetry(profile=profile, trace_file=trace_file, metrics_file=metrics_file)
+
+
+@app.command()
+def batch(
+    input_path: Path = typer.Argument(
+        ...,
+        exists=True,
+        dir_okay=False,
+        help="JSONL file with one prompt per line (a string or {\"id\": ..., \"prompt\": ...}).",
+    ),
+    output: Path = typer.Option(
+        Path("batch_results.jsonl"),
+        "--output",
+        "-o",
+        help="JSONL file that receives one result per prompt as it completes.",
+    ),
+    concurrency: int = typer.Option(
+        8,
+        "--concurrency",
+        "-c",
+        min=1,
+        help="Maximum number of prompts in flight at once.",
+    ),
+    user: str = typer.Option(
+        "batch-user",
+        "--user",
+        "-u",
+        help="User identifier injected into every session.",
+    ),
+    debug: bool = typer.Option(
+        False,
+        "--debug",
+        help="Enable verbose logging.",
+    ),
+    fast_path: Optional[bool] = typer.Option(
+        None,
+        "--fast-path/--no-fast-path",
+        help="Answer plain arithmetic prompts without calling any LLM (default: MATH_FAST_PATH).",
+    ),
+    pipeline: Optional[str] = typer.Option(
+        None,
+        "--pipeline",
+        help="Pipeline mode: sequential, conditional or parallel (default: MATH_PIPELINE_MODE).",
+    ),
+    session_db: Optional[Path] = typer.Option(
+        None,
+        "--session-db",
+        help="SQLite file that keeps sessions and artifacts across runs (default: SESSION_DB; in memory when unset).",
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Print per-agent, per-LLM-call and per-tool timings when done.",
+    ),
+    trace_file: Optional[Path] = typer.Option(
+        None,
+        "--trace-file",
+        help="Write spans as JSON (Chrome trace format, opens in Perfetto).",
+    ),
+    metrics_file: Optional[Path] = typer.Option(
+        None,
+        "--metrics-file",
+        help="Write aggregated metrics in Prometheus text format.",
+    ),
+) -> None:
+    """Run many prompts concurrently through a single orchestrator and Runner."""
+    from google_adk_test import build_math_orchestrator
+    from google_adk_test.coalescing import CoalescingRunner
+
+    configure_logging(debug)
+
+    config = OpenAIConfig.from_env()
+    logger.info("Using OpenAI model {}", config.model)
+
+    prompts = read_prompts(input_path)
+    # Duplicate prompts in flight at the same time share one pipeline run.
+    runner = CoalescingRunner(
+        build_runner(
+            build_math_orchestrator(config, fast_path=fast_path, mode=pipeline), session_db=session_db
+        ),
+        app="math_orchestrator",
+    )
+    logger.info("Running {} prompts with concurrency {}", len(prompts), concurrency)
+
+    started = time.perf_counter()
+    results = asyncio.run(
+        _close_clients_after(
+            run_batch(runner, prompts, user=user, output=output, concurrency=concurrency)
         )
     )
-    logger.debug("Session created for user='%s', session='%s'", user, session)
+    print_batch_report(results, time.perf_counter() - started)
+    console.print(f"Results written to [bold]{output}[/]")
+    export_telemetry(profile=profile, trace_file=trace_file, metrics_file=metrics_file)
 
-    runner = Runner(
-        app_name="agents",
-        agent=orchestrator,
-        session_service=session_service,
-        artifact_service=InMemoryArtifactService(),
-        memory_service=InMemoryMemoryService(),
+
+@app.command()
+def ocr(
+    input_path: Path = typer.Argument(
+        ...,
+        exists=True,
+        help="An image, a multi-page PDF, or a directory of images and PDFs.",
+    ),
+    output: Path = typer.Option(
+        Path("ocr_results.jsonl"),
+        "--output",
+        "-o",
+        help="JSONL file that receives one Detected Text / Notes record per page.",
+    ),
+    checkpoint_path: Optional[Path] = typer.Option(
+        None,
+        "--checkpoint",
+        help="File listing finished page ids (default: <output>.checkpoint); finished pages are skipped.",
+    ),
+    concurrency: int = typer.Option(
+        4,
+        "--concurrency",
+        "-c",
+        min=1,
+        help="Maximum number of pages transcribed at once.",
+    ),
+    user: str = typer.Option(
+        "ocr-user",
+        "--user",
+        "-u",
+        help="User identifier injected into every session.",
+    ),
+    session_db: Optional[Path] = typer.Option(
+        None,
+        "--session-db",
+        help="SQLite file that keeps sessions and artifacts across runs (default: SESSION_DB; in memory when unset).",
+    ),
+    debug: bool = typer.Option(
+        False,
+        "--debug",
+        help="Enable verbose logging.",
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Print per-agent, per-LLM-call and per-tool timings when done.",
+    ),
+    trace_file: Optional[Path] = typer.Option(
+        None,
+        "--trace-file",
+        help="Write spans as JSON (Chrome trace format, opens in Perfetto).",
+    ),
+    metrics_file: Optional[Path] = typer.Option(
+        None,
+        "--metrics-file",
+        help="Write aggregated metrics in Prometheus text format.",
+    ),
+) -> None:
+    """Transcribe every page of a directory or PDF with the OCR agent, resumably."""
+    from google_adk_test import build_ocr_agent
+    from google_adk_test.ocr_batch import OcrCheckpoint, iter_pages, run_ocr_batch
+
+    configure_logging(debug)
+
+    config = OpenAIConfig.from_env()
+    logger.info("Using OpenAI model {}", config.model)
+
+    pages = iter_pages(input_path)
+    checkpoint = OcrCheckpoint(checkpoint_path or output.with_name(output.name + ".checkpoint"))
+    remaining = sum(1 for page in pages if page.id not in checkpoint.done)
+    logger.info("{} pages found, {} already done", len(pages), len(pages) - remaining)
+
+    # Pages are independent, so skip the artifact store instead of growing it per page.
+    runner = build_runner(build_ocr_agent(config), artifacts=False, session_db=session_db)
+    started = time.perf_counter()
+    try:
+        counts = asyncio.run(
+            _close_clients_after(
+                run_ocr_batch(
+                    runner,
+                    pages,
+                    user=user,
+                    output=output,
+                    checkpoint=checkpoint,
+                    concurrency=concurrency,
+                )
+            )
+        )
+    finally:
+        checkpoint.close()
+    elapsed = time.perf_counter() - started
+
+    table = Table(title="OCR summary")
+    table.add_column("metric")
+    table.add_column("value", justify="right")
+    table.add_row("pages", str(len(pages)))
+    table.add_row("skipped (checkpoint)", str(len(pages) - remaining))
+    table.add_row("transcribed", str(counts["transcribed"]))
+    table.add_row("failed", str(counts["failed"]))
+    table.add_row("wall time (s)", f"{elapsed:.2f}")
+    finished = counts["transcribed"] + counts["failed"]
+    table.add_row("pages / s", f"{finished / elapsed:.2f}" if elapsed else "-")
+    for cassette in _cassette_stats():
+        table.add_row(
+            f"cassette ({cassette['mode']}) hits / misses / recorded",
+            f"{cassette['hits']} / {cassette['misses']} / {cassette['recorded']}",
+        )
+    console.print(table)
+    console.print(f"Results appended to [bold]{output}[/]")
+    export_telemetry(profile=profile, trace_file=trace_file, metrics_file=metrics_file)
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to bind."),
+    port: int = typer.Option(8000, "--port", "-p", help="Port to listen on."),
+    workers: int = typer.Option(
+        os.cpu_count() or 1,
+        "--workers",
+        "-w",
+        min=1,
+        help="Worker processes; each builds every served app once at boot.",
+    ),
+    apps: Optional[list[str]] = typer.Option(
+        None,
+        "--app",
+        help="App to serve (repeatable): math_orchestrator, reasoning_tool_orchestrator, ocr_transcriber. Default: all.",
+    ),
+    concurrency: int = typer.Option(
+        16,
+        "--concurrency",
+        "-c",
+        min=1,
+        help="Requests one worker runs at once.",
+    ),
+    queue_depth: int = typer.Option(
+        32,
+        "--queue-depth",
+        min=0,
+        help="Further requests one worker may hold; beyond that the server answers 503.",
+    ),
+    warmup_prompt: Optional[str] = typer.Option(
+        None,
+        "--warmup-prompt",
+        help="Run this prompt through each text app in every worker before accepting traffic.",
+    ),
+    drain_timeout: float = typer.Option(
+        30.0,
+        "--drain-timeout",
+        help="Seconds to let in-flight requests finish on shutdown.",
+    ),
+    request_timeout: float = typer.Option(
+        300.0,
+        "--request-timeout",
+        min=1.0,
+        help="Seconds a request may wait for its worker before the server answers 504.",
+    ),
+    session_db: Optional[Path] = typer.Option(
+        None,
+        "--session-db",
+        help="SQLite file shared by all workers for sessions and artifacts (default: SESSION_DB; in memory when unset).",
+    ),
+    ocr_workers: int = typer.Option(
+        0,
+        "--ocr-workers",
+        min=0,
+        help="OCR preprocessing processes per worker (0 preprocesses images on a thread).",
+    ),
+    debug: bool = typer.Option(
+        False,
+        "--debug",
+        help="Enable verbose logging.",
+    ),
+) -> None:
+    """Serve the ADK apps over HTTP from a pool of worker processes."""
+    from google_adk_test.serving import SERVED_APPS, ServeSettings, serve as serve_apps
+
+    configure_logging(debug)
+    # Fail here rather than in every worker when the key is missing.
+    config = OpenAIConfig.from_env()
+    logger.info("Using OpenAI model {}", config.model)
+
+    settings = ServeSettings(
+        apps=tuple(apps or SERVED_APPS),
+        workers=workers,
+        concurrency=concurrency,
+        queue_depth=queue_depth,
+        drain_timeout=drain_timeout,
+        request_timeout=request_timeout,
+        warmup_prompt=warmup_prompt,
+        session_db=str(session_db) if session_db else os.getenv("SESSION_DB") or None,
+        image_workers=ocr_workers,
+        debug=debug,
     )
-    logger.debug("Runner initialized with session '{}'", session)
+    serve_apps(settings, host=host, port=port)
+
+
+async def _close_clients_after(coro):
+    """Await ``coro``, then release the shared HTTP pool (on the same event loop), session stores and cassettes."""
+    try:
+        return await coro
+    finally:
+        await aclose_http_clients()
+        _close_session_stores()
+        _save_cassettes()
+
+
+def _close_session_stores() -> None:
+    # The store module is only loaded, and only needs flushing, when a session DB was opened.
+    storage = sys.modules.get("google_adk_test.storage")
+    if storage is not None:
+        storage.close_session_stores()
+
 
+def _save_cassettes() -> None:
+    # Loaded only when ``LLM_CASSETTE`` is set; recordings are written here.
+    cassette = sys.modules.get("google_adk_test.cassette")
+    if cassette is not None:
+        cassette.close_cassettes()
+
+
+def _cassette_stats() -> list[dict[str, Any]]:
+    cassette = sys.modules.get("google_adk_test.cassette")
+    return cassette.cassette_stats() if cassette is not None else []
+
+
+async def _print_run(runner: Runner, *, user: str, session: str, prompt: str) -> None:
+    from google.genai import types
+
+    await ensure_session(runner, user=user, session=session)
     message = types.Content(role="user", parts=[types.Part(text=prompt)])
-    events = runner.run(
-        user_id=user,
-        session_id=session,
-        new_message=message,
-    )
+    async for event in runner.run_async(user_id=user, session_id=session, new_message=message):
+        if event.author != "user":
+            print_event(event)
 
-    for event in events:
-        if event.author == "user":
-            continue
-        print_event(event)
+
+async def _stream_run(runner: Runner, *, user: str, session: str, prompt: str) -> None:
+    await ensure_session(runner, user=user, session=session)
+    await stream_prompt(runner, user=user, session=session, prompt=prompt)
 
 
 if __name__ == "__main__":
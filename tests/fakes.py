@@ -0,0 +1,61 @@
+"""Test doubles shared by the model-wrapper tests."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+class FakeLlm(BaseLlm):
+    """Scripted ``BaseLlm`` that answers ``replies`` in order, repeating the last one.
+
+    A reply may be a string, a ready ``LlmResponse`` or an exception to raise.
+    Each call first sleeps ``delay`` seconds; every request is kept in ``requests``.
+    """
+
+    model: str = "fake-model"
+    replies: list[Any] = ["ok"]
+    delay: float = 0.0
+    requests: list[LlmRequest] = []
+
+    @property
+    def calls(self) -> int:
+        return len(self.requests)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.requests.append(llm_request)
+        reply = self.replies[min(self.calls, len(self.replies)) - 1]
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if isinstance(reply, BaseException):
+            raise reply
+        if isinstance(reply, LlmResponse):
+            yield reply
+            return
+        if stream:
+            yield LlmResponse(content=text_content(reply), partial=True)
+        yield LlmResponse(content=text_content(reply))
+
+
+def text_content(text: str, role: str = "model") -> types.Content:
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+def make_request(text: str, model: str = "fake-model") -> LlmRequest:
+    return LlmRequest(model=model, contents=[text_content(text, role="user")])
+
+
+async def collect(llm: BaseLlm, request: LlmRequest, stream: bool = False) -> list[LlmResponse]:
+    return [response async for response in llm.generate_content_async(request, stream=stream)]
+
+
+def reply_text(responses: list[LlmResponse]) -> str:
+    final = [response for response in responses if not response.partial]
+    return "".join(part.text or "" for part in final[-1].content.parts)
@@ -0,0 +1,135 @@
+"""Tests for recording LLM calls to a cassette, replaying them and reporting drift."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from fakes import FakeLlm, collect, make_request, reply_text
+from google_adk_test.cassette import Cassette, CassetteLlm, CassetteMissError, describe_drift
+
+
+def cassette_llm(cassette: Cassette, inner: FakeLlm | None = None, **fields: float) -> CassetteLlm:
+    return CassetteLlm(model="fake-model", inner=inner, cassette=cassette, agent="math_agent", **fields)
+
+
+def instructed(text: str, instruction: str = "Answer the question.") -> LlmRequest:
+    request = make_request(text)
+    request.config.system_instruction = instruction
+    return request
+
+
+def record(path: Path, inner: FakeLlm, *requests: LlmRequest) -> Cassette:
+    """Record ``requests`` through ``inner`` into ``path`` and save it."""
+    cassette = Cassette(path, mode="record")
+    llm = cassette_llm(cassette, inner)
+    for request in requests:
+        asyncio.run(collect(llm, request))
+    cassette.save()
+    return cassette
+
+
+def stored_lines(path: Path) -> list[dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle]
+
+
+def test_recorded_calls_replay_without_the_model(tmp_path: Path) -> None:
+    path = tmp_path / "calls.jsonl.gz"
+    record(path, FakeLlm(replies=["4", "9"]), instructed("2 + 2"), instructed("3 * 3"))
+    assert len(stored_lines(path)) == 2
+
+    cassette = Cassette(path, mode="replay")
+    llm = cassette_llm(cassette)
+    assert reply_text(asyncio.run(collect(llm, instructed("3 * 3")))) == "9"
+    streamed = asyncio.run(collect(llm, instructed("2 + 2"), stream=True))
+    assert streamed[0].partial and reply_text(streamed) == "4"
+    assert streamed[-1].custom_metadata == {"cassette_hit": True}
+    assert cassette.stats()["hits"] == 2 and cassette.stats()["misses"] == 0
+
+
+def test_repeated_requests_replay_in_recording_order(tmp_path: Path) -> None:
+    path = tmp_path / "calls.jsonl.gz"
+    record(path, FakeLlm(replies=["first", "second"]), instructed("a poem"), instructed("a poem"))
+    llm = cassette_llm(Cassette(path, mode="replay"))
+    answers = [reply_text(asyncio.run(collect(llm, instructed("a poem")))) for _ in range(3)]
+    assert answers == ["first", "second", "second"]
+
+
+def test_failed_calls_are_not_recorded(tmp_path: Path) -> None:
+    inner = FakeLlm(replies=[LlmResponse(error_code="500", error_message="boom"), "4"])
+    cassette = record(tmp_path / "calls.jsonl.gz", inner, instructed("2 + 2"), instructed("2 + 2"))
+    assert cassette.recorded == 1
+    assert [line["responses"][0]["content"]["parts"][0]["text"] for line in stored_lines(cassette.path)] == ["4"]
+
+
+def test_inline_images_are_stored_as_digests(tmp_path: Path) -> None:
+    request = instructed("read this")
+    request.contents[0].parts.append(types.Part.from_bytes(data=b"\x89PNG" * 100, mime_type="image/png"))
+    path = tmp_path / "calls.jsonl.gz"
+    record(path, FakeLlm(replies=["text"]), request)
+    image = stored_lines(path)[0]["request"]["contents"][0]["parts"][1]["inline_data"]
+    assert set(image) == {"mime_type", "sha256", "size"}
+    # The key is still computed from the full request, so the replay matches.
+    assert reply_text(asyncio.run(collect(cassette_llm(Cassette(path, mode="replay")), request))) == "text"
+
+
+def test_a_changed_instruction_misses_and_reports_the_drift(tmp_path: Path) -> None:
+    path = tmp_path / "calls.jsonl.gz"
+    record(path, FakeLlm(replies=["4"]), instructed("2 + 2"))
+    cassette = Cassette(path, mode="replay")
+    with pytest.raises(CassetteMissError, match="config.system_instruction"):
+        asyncio.run(collect(cassette_llm(cassette), instructed("2 + 2", "Answer in words.")))
+    (drift,) = cassette.stats()["drifts"]
+    assert drift["agent"] == "math_agent"
+    assert drift["changes"] == ['config.system_instruction: "Answer the question." -> "Answer in words."']
+
+
+def test_auto_mode_records_only_what_is_missing(tmp_path: Path) -> None:
+    path = tmp_path / "calls.jsonl.gz"
+    record(path, FakeLlm(replies=["4"]), instructed("2 + 2"))
+    inner = FakeLlm(replies=["9"])
+    cassette = Cassette(path, mode="auto")
+    llm = cassette_llm(cassette, inner)
+    assert reply_text(asyncio.run(collect(llm, instructed("2 + 2")))) == "4"
+    assert reply_text(asyncio.run(collect(llm, instructed("3 * 3")))) == "9"
+    assert inner.calls == 1
+    assert cassette.stats()["drifts"][0]["changes"][0].startswith("contents[0]:")
+    cassette.save()
+    # Saving merges with the file: the call recorded earlier is kept.
+    assert len(stored_lines(path)) == 2
+
+
+def test_replayed_latency_is_scaled(tmp_path: Path) -> None:
+    path = tmp_path / "calls.jsonl.gz"
+    record(path, FakeLlm(replies=["4"], delay=0.2), instructed("2 + 2"))
+    fast = cassette_llm(Cassette(path, mode="replay"))
+    slow = cassette_llm(Cassette(path, mode="replay"), latency_scale=0.5)
+
+    async def timed(llm: CassetteLlm) -> float:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await collect(llm, instructed("2 + 2"))
+        return loop.time() - started
+
+    assert asyncio.run(timed(fast)) < 0.05
+    assert asyncio.run(timed(slow)) >= 0.09
+
+
+def test_describe_drift_reports_the_first_differing_message() -> None:
+    recorded = {"model": "m", "params": {}, "contents": [{"text": "a"}, {"text": "b"}]}
+    changed = {"model": "m", "params": {"temperature": 0}, "contents": [{"text": "a"}, {"text": "c"}]}
+    assert describe_drift(recorded, changed) == [
+        'params: {} -> {"temperature": 0}',
+        'contents[1]: {"text": "b"} -> {"text": "c"}',
+    ]
+    assert describe_drift(recorded, {**recorded, "contents": recorded["contents"][:1]}) == [
+        "contents: 2 -> 1 messages"
+    ]
@@ -0,0 +1,105 @@
+"""Tests for single-flight coalescing of identical concurrent requests."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from google.adk import Agent, Runner
+from google.adk.sessions import InMemorySessionService
+
+from fakes import FakeLlm, text_content
+from google_adk_test.coalescing import CoalescingRunner
+
+APP = "math_orchestrator"
+
+
+def coalescing_runner(llm: FakeLlm) -> CoalescingRunner:
+    agent = Agent(name="echo_agent", model=llm, instruction="Answer the question.")
+    runner = Runner(app_name=APP, agent=agent, session_service=InMemorySessionService())
+    return CoalescingRunner(runner, enabled=True)
+
+
+async def ask(runner: CoalescingRunner, user_id: str, session_id: str, prompt: str) -> list[Any]:
+    return [
+        event
+        async for event in runner.run_async(
+            user_id=user_id, session_id=session_id, new_message=text_content(prompt, role="user")
+        )
+    ]
+
+
+async def ask_together(runner: CoalescingRunner, requests: list[tuple[str, dict[str, Any], str]]) -> list[list[Any]]:
+    """Create one session per ``(user, state, prompt)`` and run them all at once."""
+    sessions = [
+        await runner.session_service.create_session(app_name=APP, user_id=user, state=state)
+        for user, state, _ in requests
+    ]
+    return await asyncio.gather(
+        *(ask(runner, user, session.id, prompt) for session, (user, _, prompt) in zip(sessions, requests))
+    )
+
+
+def test_identical_prompts_share_one_run() -> None:
+    llm = FakeLlm(replies=["4"], delay=0.05)
+    runner = coalescing_runner(llm)
+
+    async def scenario() -> None:
+        results = await ask_together(runner, [("a", {}, "2 + 2"), ("b", {}, " 2  +  2 ")])
+        assert llm.calls == 1
+        for events in results:
+            assert events[-1].content.parts[0].text == "4"
+        # The follower's session holds its own copy of the run.
+        session = await runner.session_service.list_sessions(app_name=APP, user_id="b")
+        stored = await runner.session_service.get_session(
+            app_name=APP, user_id="b", session_id=session.sessions[0].id
+        )
+        assert [event.author for event in stored.events] == ["user", "echo_agent"]
+
+    asyncio.run(scenario())
+
+
+def test_different_session_state_is_not_coalesced() -> None:
+    llm = FakeLlm(replies=["4"], delay=0.05)
+    runner = coalescing_runner(llm)
+    asyncio.run(ask_together(runner, [("a", {"unit": "cm"}, "2 + 2"), ("b", {"unit": "in"}, "2 + 2")]))
+    assert llm.calls == 2
+
+
+def test_different_user_state_is_not_coalesced() -> None:
+    llm = FakeLlm(replies=["4"], delay=0.05)
+    runner = coalescing_runner(llm)
+    asyncio.run(
+        ask_together(runner, [("a", {"user:name": "Ada"}, "2 + 2"), ("b", {"user:name": "Bo"}, "2 + 2")])
+    )
+    assert llm.calls == 2
+
+
+def test_sessions_with_history_run_on_their_own() -> None:
+    llm = FakeLlm(replies=["4"], delay=0.05)
+    runner = coalescing_runner(llm)
+
+    async def scenario() -> None:
+        session = await runner.session_service.create_session(app_name=APP, user_id="a")
+        await ask(runner, "a", session.id, "hello")
+        fresh = await runner.session_service.create_session(app_name=APP, user_id="b")
+        await asyncio.gather(ask(runner, "a", session.id, "2 + 2"), ask(runner, "b", fresh.id, "2 + 2"))
+
+    asyncio.run(scenario())
+    assert llm.calls == 3
+
+
+def test_a_failed_run_fails_every_waiter() -> None:
+    llm = FakeLlm(replies=[RuntimeError("boom")], delay=0.05)
+    runner = coalescing_runner(llm)
+
+    async def scenario() -> list[Any]:
+        sessions = [await runner.session_service.create_session(app_name=APP, user_id=user) for user in "ab"]
+        return await asyncio.gather(
+            *(ask(runner, session.user_id, session.id, "2 + 2") for session in sessions),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert llm.calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,143 @@
+"""Tests for the SQLite response cache and the ``CachedLlm`` wrapper."""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models.llm_response import LlmResponse
+
+from fakes import FakeLlm, collect, make_request, reply_text, text_content
+from google_adk_test import llm_cache
+from google_adk_test.llm_cache import CachedLlm, ResponseCache, get_response_cache
+from google_adk_test.settings import OpenAIConfig
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """A wall clock the test advances by hand."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> ResponseCache:
+    cache = ResponseCache(tmp_path / "responses.sqlite", ttl_seconds=60.0, max_entries=2)
+    yield cache
+    cache.close()
+
+
+def answer(text: str) -> list[LlmResponse]:
+    return [LlmResponse(content=text_content(text))]
+
+
+def test_round_trip(cache: ResponseCache) -> None:
+    assert cache.get("k") is None
+    cache.put("k", "fake-model", answer("hello"))
+    assert reply_text(cache.get("k")) == "hello"
+    assert (cache.hits, cache.misses, cache.stores) == (1, 1, 1)
+
+
+def test_expired_entries_are_misses_and_purged(cache: ResponseCache, clock: list[float]) -> None:
+    cache.put("k", "fake-model", answer("hello"))
+    clock[0] += 59
+    assert cache.get("k") is not None
+    clock[0] += 2
+    assert cache.get("k") is None
+    assert cache.stats()["size"] == 0
+    assert cache.evictions == 1
+
+
+def test_reads_do_not_extend_the_ttl(cache: ResponseCache, clock: list[float]) -> None:
+    cache.put("k", "fake-model", answer("hello"))
+    for _ in range(3):
+        clock[0] += 30
+        cache.get("k")
+    assert cache.get("k") is None
+
+
+def test_least_recently_read_entries_are_evicted(
+    cache: ResponseCache, clock: list[float], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(llm_cache, "_EVICT_EVERY", 1)
+    cache.ttl_seconds = 3_600.0
+    cache.put("a", "fake-model", answer("a"))
+    clock[0] += 1
+    cache.put("b", "fake-model", answer("b"))
+    # Reads only refresh the LRU timestamp once per touch interval.
+    clock[0] += llm_cache._TOUCH_INTERVAL + 1
+    assert cache.get("a") is not None
+    cache.put("c", "fake-model", answer("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_zero_max_entries_stores_nothing(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "off.sqlite", max_entries=0)
+    cache.put("k", "fake-model", answer("hello"))
+    assert cache.get("k") is None
+    cache.close()
+
+
+def test_wal_mode_shares_entries_across_connections(cache: ResponseCache) -> None:
+    cache.put("k", "fake-model", answer("hello"))
+    other = ResponseCache(cache.path)
+    try:
+        assert reply_text(other.get("k")) == "hello"
+    finally:
+        other.close()
+    with sqlite3.connect(cache.path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def cached(cache: ResponseCache, inner: FakeLlm, endpoint: str = "http://mock/v1") -> CachedLlm:
+    return CachedLlm(model=inner.model, inner=inner, cache=cache, endpoint=endpoint)
+
+
+def test_repeated_requests_are_served_from_the_cache(cache: ResponseCache) -> None:
+    inner = FakeLlm(replies=["first", "second"])
+    llm = cached(cache, inner)
+    first = asyncio.run(collect(llm, make_request("2 + 2")))
+    # Whitespace differences do not split the key.
+    again = asyncio.run(collect(llm, make_request("2  +   2"), stream=True))
+    assert inner.calls == 1
+    assert reply_text(first) == reply_text(again) == "first"
+    assert again[0].partial and again[-1].custom_metadata == {"cache_hit": True}
+
+
+def test_endpoints_do_not_share_entries(cache: ResponseCache) -> None:
+    inner = FakeLlm(replies=["mock", "real"])
+    asyncio.run(collect(cached(cache, inner, "http://mock/v1"), make_request("hi")))
+    responses = asyncio.run(collect(cached(cache, inner, "openai"), make_request("hi")))
+    assert inner.calls == 2
+    assert reply_text(responses) == "real"
+
+
+def test_errors_and_fallback_answers_are_not_stored(cache: ResponseCache) -> None:
+    inner = FakeLlm(
+        replies=[
+            LlmResponse(error_code="500", error_message="boom"),
+            LlmResponse(content=text_content("fallback"), custom_metadata={"fallback_model": "other"}),
+            "primary",
+        ]
+    )
+    llm = cached(cache, inner)
+    for _ in range(4):
+        asyncio.run(collect(llm, make_request("hi")))
+    assert inner.calls == 3
+    assert cache.stores == 1
+
+
+def test_cache_is_off_unless_a_path_is_set(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "mock")
+    monkeypatch.delenv("LLM_CACHE_PATH", raising=False)
+    assert get_response_cache(OpenAIConfig.from_env()) is None
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "on.sqlite"))
+    config = OpenAIConfig.from_env()
+    assert get_response_cache(config) is get_response_cache(config)
+    get_response_cache(config).close()
+    llm_cache._CACHES.clear()
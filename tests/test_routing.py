@@ -0,0 +1,117 @@
+"""Tests for endpoint health tracking and ``FallbackLlm`` failover."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from fakes import FakeLlm, collect, make_request, reply_text
+from google_adk_test import routing
+from google_adk_test.routing import (
+    COOLDOWN_SECONDS,
+    MIN_SAMPLES,
+    WINDOW_SECONDS,
+    EndpointHealth,
+    FallbackLlm,
+)
+
+SLO = {"slo_p95_ms": 1_000.0, "slo_error_rate": 0.25}
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """A monotonic clock the test advances by hand."""
+    now = [1_000.0]
+    monkeypatch.setattr(routing, "time", SimpleNamespace(monotonic=lambda: now[0], perf_counter=lambda: now[0]))
+    return now
+
+
+def record(health: EndpointHealth, calls: int, *, seconds: float = 0.1, failures: int = 0) -> None:
+    for index in range(calls):
+        health.record(seconds, index >= failures, **SLO)
+
+
+def test_too_few_calls_never_trip(clock: list[float]) -> None:
+    health = EndpointHealth("primary")
+    record(health, MIN_SAMPLES - 1, failures=MIN_SAMPLES - 1)
+    assert health.available()
+    assert health.stats()["window_error_rate"] == 1.0
+
+
+def test_error_rate_above_the_slo_trips(clock: list[float]) -> None:
+    health = EndpointHealth("primary")
+    record(health, MIN_SAMPLES, failures=2)
+    assert health.available()
+    record(health, 1, failures=1)
+    assert not health.available()
+    assert health.stats()["trips"] == 1 and health.stats()["tripped"]
+
+
+def test_slow_p95_trips(clock: list[float]) -> None:
+    health = EndpointHealth("primary")
+    record(health, MIN_SAMPLES, seconds=1.5)
+    assert not health.available()
+
+
+def test_cooldown_restores_traffic_with_an_empty_window(clock: list[float]) -> None:
+    health = EndpointHealth("primary")
+    record(health, MIN_SAMPLES, failures=MIN_SAMPLES)
+    clock[0] += COOLDOWN_SECONDS - 1
+    assert not health.available()
+    clock[0] += 1
+    assert health.available()
+    # The calls that tripped it are forgotten: one more failure does not trip again.
+    record(health, 1, failures=1)
+    assert health.available()
+    assert health.stats()["trips"] == 1
+
+
+def test_old_calls_leave_the_window(clock: list[float]) -> None:
+    health = EndpointHealth("primary")
+    record(health, MIN_SAMPLES - 1, failures=MIN_SAMPLES - 1)
+    clock[0] += WINDOW_SECONDS + 1
+    record(health, MIN_SAMPLES)
+    assert health.available()
+    assert health.stats()["errors"] == MIN_SAMPLES - 1
+
+
+def fallback(primary: FakeLlm, secondary: FakeLlm) -> FallbackLlm:
+    return FallbackLlm(
+        model=primary.model,
+        routes=[primary, secondary],
+        health=[EndpointHealth(primary.model), EndpointHealth(secondary.model)],
+        **SLO,
+    )
+
+
+def test_failed_calls_move_to_the_next_model(clock: list[float]) -> None:
+    primary = FakeLlm(model="primary", replies=[ConnectionError("down")])
+    secondary = FakeLlm(model="secondary", replies=["from secondary"])
+    llm = fallback(primary, secondary)
+    responses = asyncio.run(collect(llm, make_request("hi")))
+    assert reply_text(responses) == "from secondary"
+    assert responses[-1].custom_metadata == {"fallback_model": "secondary"}
+    assert llm.health[0].stats()["errors"] == 1
+
+
+def test_tripped_models_are_tried_last(clock: list[float]) -> None:
+    primary = FakeLlm(model="primary", replies=["from primary"])
+    secondary = FakeLlm(model="secondary", replies=["from secondary"])
+    llm = fallback(primary, secondary)
+    record(llm.health[0], MIN_SAMPLES, failures=MIN_SAMPLES)
+    assert reply_text(asyncio.run(collect(llm, make_request("hi")))) == "from secondary"
+    assert primary.calls == 0
+    clock[0] += COOLDOWN_SECONDS
+    assert reply_text(asyncio.run(collect(llm, make_request("hi")))) == "from primary"
+
+
+def test_the_last_models_error_is_raised(clock: list[float]) -> None:
+    llm = fallback(
+        FakeLlm(model="primary", replies=[ConnectionError("down")]),
+        FakeLlm(model="secondary", replies=[TimeoutError("slow")]),
+    )
+    with pytest.raises(TimeoutError):
+        asyncio.run(collect(llm, make_request("hi")))
+    assert [health.stats()["errors"] for health in llm.health] == [1, 1]
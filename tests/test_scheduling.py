@@ -0,0 +1,124 @@
+"""Tests for the request scheduler's admission order, budget refunds and hedging."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from fakes import FakeLlm, collect, make_request
+from google_adk_test import scheduling
+from google_adk_test.scheduling import Priority, RequestScheduler, ScheduledLlm
+
+
+def test_higher_priority_is_admitted_first() -> None:
+    scheduler = RequestScheduler(requests_per_minute=1_200)
+    admitted: list[str] = []
+
+    async def call(name: str, priority: Priority) -> None:
+        await scheduler.acquire(1, priority)
+        admitted.append(name)
+
+    async def scenario() -> None:
+        scheduler._requests.level = 0
+        tasks = [
+            asyncio.create_task(call("low", Priority.LOW)),
+            asyncio.create_task(call("normal", Priority.NORMAL)),
+            asyncio.create_task(call("high", Priority.HIGH)),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.queued == 3
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+    asyncio.run(scenario())
+    assert admitted == ["high", "normal", "low"]
+
+
+def test_cancelled_waiters_leave_the_queue_without_spending_budget() -> None:
+    scheduler = RequestScheduler(tokens_per_minute=600)
+
+    async def scenario() -> None:
+        scheduler._tokens.level = 0
+        waiting = asyncio.create_task(scheduler.acquire(50))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert scheduler.queued == 0
+        assert scheduler.admitted == 0
+
+    asyncio.run(scenario())
+
+
+def test_admitted_then_cancelled_calls_are_refunded() -> None:
+    scheduler = RequestScheduler(tokens_per_minute=60_000)
+    full = scheduler._tokens.capacity
+
+    async def scenario() -> None:
+        task = asyncio.create_task(scheduler.acquire(5_000))
+        await asyncio.sleep(0)  # queued and admitted; the wake-up is scheduled
+        await asyncio.sleep(0)  # the wake-up ran, the task has not resumed yet
+        assert scheduler.admitted == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert scheduler._tokens.level == pytest.approx(full, abs=50)
+
+
+def test_successes_restore_the_rate_after_a_429() -> None:
+    class RateLimited(Exception):
+        status_code = 429
+
+    scheduler = RequestScheduler(requests_per_minute=600)
+    assert scheduler.record_failure(RateLimited(), attempt=0) is not None
+    assert scheduler.stats()["rate_scale"] == 0.75
+    assert scheduler.record_failure(ValueError("bad request"), attempt=0) is None
+    for _ in range(20):
+        scheduler.record_success()
+    assert scheduler.stats()["rate_scale"] == 1.0
+
+
+def hedging_llm(scheduler: RequestScheduler) -> ScheduledLlm:
+    return ScheduledLlm(
+        model="fake-model",
+        inner=FakeLlm(replies=["ok"], delay=0.03),
+        scheduler=scheduler,
+        hedge=True,
+    )
+
+
+def hedged_calls(llm: ScheduledLlm, calls: int) -> int:
+    async def scenario() -> int:
+        hedged = 0
+        for _ in range(calls):
+            responses = await collect(llm, make_request("2 + 2"))
+            hedged += responses[-1].custom_metadata["hedged"]
+        return hedged
+
+    return asyncio.run(scenario())
+
+
+def test_hedges_are_capped_per_agent(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Every call outlives this p95, so each one is a hedge candidate.
+    monkeypatch.setattr(ScheduledLlm, "_hedge_delay", lambda self: 0.001)
+    scheduler = RequestScheduler()
+    first, second = hedging_llm(scheduler), hedging_llm(scheduler)
+    assert hedged_calls(first, 20) == 2
+    # Hedges of another agent on the same scheduler do not use up this one's share.
+    assert hedged_calls(second, 20) == 2
+    assert scheduler.hedges == 4
+    assert second.inner.calls == 22
+
+
+def test_retries_transient_errors_then_succeeds(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(scheduling, "BACKOFF_BASE", 0.001)
+    llm = ScheduledLlm(
+        model="fake-model",
+        inner=FakeLlm(replies=[ConnectionError("reset"), "ok"]),
+        scheduler=RequestScheduler(),
+    )
+    responses = asyncio.run(collect(llm, make_request("2 + 2")))
+    assert responses[-1].custom_metadata["retries"] == 1
+    assert llm.scheduler.retries == 1
@@ -0,0 +1,193 @@
+"""Tests for the serve worker pool, with threads standing in for worker processes."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import queue
+import threading
+import time
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from google_adk_test import serving
+from google_adk_test.serving import (
+    PoolBusyError,
+    RequestTimeoutError,
+    ServeSettings,
+    WorkerCrashedError,
+    WorkerPool,
+    _Worker,
+    create_server,
+)
+
+
+class FakeProcess:
+    """Enough of ``multiprocessing.Process`` for the pool's bookkeeping."""
+
+    def __init__(self) -> None:
+        self.alive = True
+        self.pid = 4242
+        self.exitcode: int | None = None
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def join(self, timeout: float | None = None) -> None:
+        # A joined worker has received its stop sentinel and exited.
+        self.alive = False
+
+    def terminate(self) -> None:
+        self.alive = False
+
+
+def fake_pool(monkeypatch: pytest.MonkeyPatch, **overrides: Any) -> WorkerPool:
+    """A pool whose workers are ready at once and never leave this process."""
+    settings = ServeSettings(apps=("math_orchestrator",), **{"workers": 2, **overrides})
+    pool = WorkerPool(settings)
+
+    def _spawn(index: int, restarts: int = 0) -> _Worker:
+        worker = _Worker(index=index, process=FakeProcess(), inbox=queue.Queue(), restarts=restarts)
+        worker.ready.set()
+        return worker
+
+    monkeypatch.setattr(pool, "_spawn", _spawn)
+    return pool
+
+
+def request(session_id: str, user_id: str = "u") -> dict[str, Any]:
+    return {"message": "2 + 2", "user_id": user_id, "session_id": session_id, "images": []}
+
+
+async def next_job(worker: _Worker) -> dict[str, Any]:
+    return await asyncio.to_thread(worker.inbox.get, timeout=5)
+
+
+def answer(pool: WorkerPool, job: dict[str, Any], text: str = "4") -> None:
+    pool._outbox.put(("done", job["id"], json.dumps({"response": text})))
+
+
+def test_sessions_are_routed_to_one_worker(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool = fake_pool(monkeypatch, workers=4)
+    pool._workers = [pool._spawn(index) for index in range(4)]
+    owners = {pool.route("math_orchestrator", "u", f"s{index}").index for index in range(64)}
+    assert len(owners) > 1
+    assert pool.route("math_orchestrator", "u", "s1") is pool.route("math_orchestrator", "u", "s1")
+    # New sessions with the same prompt share a worker, so they can be coalesced.
+    targets = {
+        pool.route("math_orchestrator", "u", pool.new_session_id("math_orchestrator", "u", " 2 +  2"))
+        for _ in range(8)
+    }
+    assert len(targets) == 1
+
+
+def test_answers_reach_their_request(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool = fake_pool(monkeypatch)
+
+    async def scenario() -> None:
+        await pool.start()
+        try:
+            worker = pool.route("math_orchestrator", "u", "s1")
+            submitted = asyncio.create_task(pool.submit("math_orchestrator", request("s1")))
+            job = await next_job(worker)
+            assert worker.pending == 1
+            answer(pool, job)
+            assert json.loads(await submitted) == {"response": "4"}
+            assert worker.pending == 0
+        finally:
+            await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_full_workers_answer_503(monkeypatch: pytest.MonkeyPatch) -> None:
+    server = create_server(ServeSettings(apps=("math_orchestrator",), workers=1, concurrency=1, queue_depth=1))
+    pool = server.state.pool
+    monkeypatch.setattr(pool, "_spawn", fake_pool(monkeypatch)._spawn)
+    pool._workers = [pool._spawn(0)]
+    pool._workers[0].pending = pool.settings.max_pending
+
+    # Without ``with``, the lifespan (which would start real workers) does not run.
+    response = TestClient(server).post(
+        "/apps/math_orchestrator/run", json={"message": "2 + 2", "session_id": "s1"}
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert "queued" in response.json()["detail"]
+
+
+def test_close_drains_in_flight_requests(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool = fake_pool(monkeypatch, workers=1)
+
+    async def scenario() -> None:
+        await pool.start()
+        worker = pool._workers[0]
+        in_flight = asyncio.create_task(pool.submit("math_orchestrator", request("s1")))
+        job = await next_job(worker)
+        closing = asyncio.create_task(pool.close())
+        await asyncio.sleep(0.1)
+        assert pool.draining and not closing.done()
+        with pytest.raises(PoolBusyError):
+            await pool.submit("math_orchestrator", request("s2"))
+        answer(pool, job)
+        assert json.loads(await in_flight) == {"response": "4"}
+        await asyncio.wait_for(closing, 5)
+        # Each worker is told to stop once the queue has drained.
+        assert worker.inbox.get_nowait() is None
+
+    asyncio.run(scenario())
+
+
+def test_crashed_worker_is_replaced_despite_other_traffic(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool = fake_pool(monkeypatch, workers=2)
+
+    async def scenario() -> None:
+        await pool.start()
+        stop = threading.Event()
+
+        def chatter() -> None:
+            # A busy outbox must not delay the liveness check.
+            while not stop.is_set():
+                pool._outbox.put(("stats", 0, {}))
+                time.sleep(0.01)
+
+        chatty = threading.Thread(target=chatter, daemon=True)
+        chatty.start()
+        try:
+            crashed = pool.route("math_orchestrator", "u", "s1")
+            submitted = asyncio.create_task(pool.submit("math_orchestrator", request("s1")))
+            await next_job(crashed)
+            crashed.process.alive = False
+            with pytest.raises(WorkerCrashedError):
+                await asyncio.wait_for(submitted, 5)
+            replacement = pool._workers[crashed.index]
+            assert replacement is not crashed and replacement.restarts == 1
+            assert crashed.pending == 0
+        finally:
+            stop.set()
+            chatty.join()
+            await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_requests_without_an_answer_time_out(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool = fake_pool(monkeypatch, workers=1, request_timeout=0.2)
+
+    async def scenario() -> None:
+        await pool.start()
+        try:
+            with pytest.raises(RequestTimeoutError):
+                await pool.submit("math_orchestrator", request("s1"))
+            assert pool._workers[0].pending == 0
+            assert not pool._futures
+        finally:
+            await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_liveness_is_checked_often() -> None:
+    assert serving._LIVENESS_INTERVAL <= 1.0
@@ -0,0 +1,168 @@
+"""Tests for the session ledger's trimming, expiry and LRU eviction."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.adk import Agent, Runner
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.adk.sessions.session import Session
+
+from fakes import FakeLlm, text_content
+from google_adk_test import session_cache
+from google_adk_test.session_cache import BoundedSessionService, SessionBoundsPlugin, SessionLimits
+
+APP = "math_orchestrator"
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """A monotonic clock the test advances by hand."""
+    now = [1_000.0]
+    monkeypatch.setattr(session_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture(autouse=True)
+def no_ledgers() -> None:
+    yield
+    session_cache._LEDGERS.clear()
+
+
+def bounded(**limits: float) -> BoundedSessionService:
+    return BoundedSessionService(
+        SessionLimits(**{"ttl_seconds": 0, "max_events": 0, "max_session_bytes": 0, "max_total_bytes": 0, **limits})
+    )
+
+
+async def turn(service: BoundedSessionService, session: Session, invocation: str, *texts: str) -> None:
+    for text in texts:
+        await service.append_event(session, Event(invocation_id=invocation, author="agent", content=text_content(text)))
+
+
+async def stored(service: BoundedSessionService, session: Session) -> Session | None:
+    return await service.get_session(app_name=APP, user_id=session.user_id, session_id=session.id)
+
+
+def texts(session: Session) -> list[str]:
+    return [event.content.parts[0].text for event in session.events]
+
+
+def test_the_oldest_whole_invocations_are_trimmed(clock: list[float]) -> None:
+    service = bounded(max_events=4)
+
+    async def scenario() -> Session:
+        session = await service.create_session(app_name=APP, user_id="a")
+        await turn(service, session, "i1", "a", "b")
+        await turn(service, session, "i2", "c", "d", "e")
+        await turn(service, session, "i3", "f")
+        return await stored(service, session)
+
+    # ``i1`` goes whole, although dropping one of its events would have been enough.
+    assert texts(asyncio.run(scenario())) == ["c", "d", "e", "f"]
+    assert service.stats()["trimmed_events"] == 2
+    assert service.stats()["events"] == 4
+
+
+def test_the_latest_invocation_is_never_trimmed(clock: list[float]) -> None:
+    service = bounded(max_events=2)
+
+    async def scenario() -> Session:
+        session = await service.create_session(app_name=APP, user_id="a")
+        await turn(service, session, "i1", "a")
+        await turn(service, session, "i2", "b", "c", "d")
+        return await stored(service, session)
+
+    assert texts(asyncio.run(scenario())) == ["b", "c", "d"]
+
+
+def test_sessions_are_trimmed_to_their_byte_cap(clock: list[float]) -> None:
+    service = bounded(max_session_bytes=1_000)
+
+    async def scenario() -> Session:
+        session = await service.create_session(app_name=APP, user_id="a")
+        for index in range(6):
+            await turn(service, session, f"i{index}", "x" * 300)
+        return await stored(service, session)
+
+    assert len(asyncio.run(scenario()).events) < 6
+    stats = service.stats()
+    assert 0 < stats["largest_session_bytes"] <= 1_000
+    assert stats["bytes"] == stats["largest_session_bytes"]
+
+
+def test_idle_sessions_expire(clock: list[float]) -> None:
+    service = bounded(ttl_seconds=60)
+
+    async def scenario() -> None:
+        idle = await service.create_session(app_name=APP, user_id="a")
+        clock[0] += 30
+        active = await service.create_session(app_name=APP, user_id="b")
+        clock[0] += 31
+        assert await stored(service, idle) is None
+        assert await stored(service, active) is not None
+
+    asyncio.run(scenario())
+    assert service.stats()["expired_sessions"] == 1
+    assert service.stats()["sessions"] == 1
+
+
+def test_least_recently_used_sessions_are_evicted(clock: list[float]) -> None:
+    service = bounded(max_total_bytes=3_000)
+
+    async def scenario() -> None:
+        first = await service.create_session(app_name=APP, user_id="a")
+        await turn(service, first, "i1", "x" * 1_000)
+        second = await service.create_session(app_name=APP, user_id="b")
+        await turn(service, second, "i1", "x" * 1_000)
+        # Reading ``first`` makes ``second`` the least recently used.
+        assert await stored(service, first) is not None
+        third = await service.create_session(app_name=APP, user_id="c")
+        await turn(service, third, "i1", "x" * 1_000)
+        assert await stored(service, second) is None
+        assert await stored(service, first) is not None and await stored(service, third) is not None
+
+    asyncio.run(scenario())
+    stats = service.stats()
+    assert stats["evicted_sessions"] == 1 and stats["sessions"] == 2
+    assert stats["bytes"] <= 3_000
+
+
+def test_deleted_sessions_leave_the_ledger(clock: list[float]) -> None:
+    service = bounded()
+
+    async def scenario() -> None:
+        session = await service.create_session(app_name=APP, user_id="a", state={"unit": "cm"})
+        await turn(service, session, "i1", "a")
+        await service.delete_session(app_name=APP, user_id="a", session_id=session.id)
+
+    asyncio.run(scenario())
+    assert service.stats()["sessions"] == 0 and service.stats()["bytes"] == 0
+
+
+def test_the_plugin_bounds_a_plain_in_memory_service(clock: list[float]) -> None:
+    service = InMemorySessionService()
+    runner = Runner(
+        app_name=APP,
+        agent=Agent(name="echo_agent", model=FakeLlm(replies=["4"]), instruction="Answer the question."),
+        session_service=service,
+        plugins=[SessionBoundsPlugin(SessionLimits(max_events=2))],
+    )
+
+    async def scenario() -> Session:
+        session = await service.create_session(app_name=APP, user_id="a")
+        for prompt in ("2 + 2", "3 + 1", "1 + 3"):
+            async for _ in runner.run_async(
+                user_id="a", session_id=session.id, new_message=text_content(prompt, role="user")
+            ):
+                pass
+        return await service.get_session(app_name=APP, user_id="a", session_id=session.id)
+
+    session = asyncio.run(scenario())
+    # Only the last run, the question and its answer, is left.
+    assert [event.author for event in session.events] == ["user", "echo_agent"]
+    assert texts(session) == ["1 + 3", "4"]
+    assert session_cache.session_cache_stats()[0]["trimmed_events"] == 4
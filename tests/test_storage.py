@@ -0,0 +1,191 @@
+"""Tests for the SQLite session service's group commit and incremental reloads."""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+import pytest
+from google.adk.events import Event, EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.session import Session
+
+from fakes import text_content
+from google_adk_test.storage import SqliteSessionService
+
+APP = "math_orchestrator"
+
+
+@pytest.fixture
+def service(tmp_path: Path) -> SqliteSessionService:
+    # A long interval: nothing is written until a read, ``flush`` or ``close``.
+    service = SqliteSessionService(tmp_path / "sessions.sqlite", flush_interval=60.0)
+    yield service
+    service.close()
+
+
+def turn(text: str, **state: Any) -> Event:
+    return Event(
+        invocation_id="inv",
+        author="agent",
+        content=text_content(text),
+        actions=EventActions(state_delta=state),
+    )
+
+
+async def append(service: SqliteSessionService, session: Session, *texts: str, **state: Any) -> None:
+    for text in texts:
+        await service.append_event(session, turn(text, **state))
+
+
+def stored_texts(path: Path, session_id: str) -> list[str]:
+    """The event texts on disk, read without the service."""
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT data FROM events WHERE session_id = ? ORDER BY seq", (session_id,))
+        return [Event.model_validate_json(data).content.parts[0].text for (data,) in rows]
+
+
+def texts(session: Session) -> list[str]:
+    return [event.content.parts[0].text for event in session.events]
+
+
+def test_appends_are_written_in_one_commit(service: SqliteSessionService) -> None:
+    async def scenario() -> None:
+        first = await service.create_session(app_name=APP, user_id="a")
+        second = await service.create_session(app_name=APP, user_id="b")
+        await append(service, first, "1", "2", "3", step=1)
+        await append(service, second, "x", "y", step=2)
+        assert service.stats()["pending_events"] == 5
+        assert stored_texts(service.path, first.id) == []
+        service.flush()
+        assert stored_texts(service.path, first.id) == ["1", "2", "3"]
+        stored = await service.get_session(app_name=APP, user_id="b", session_id=second.id)
+        assert texts(stored) == ["x", "y"] and stored.state == {"step": 2}
+
+    asyncio.run(scenario())
+    assert service.stats()["flushes"] == 1
+    assert service.stats()["events_per_flush"] == 5
+
+
+def test_reading_a_session_flushes_its_writes(service: SqliteSessionService) -> None:
+    async def scenario() -> Session:
+        session = await service.create_session(app_name=APP, user_id="a")
+        await append(service, session, "1", "2", answer=4)
+        return await service.get_session(app_name=APP, user_id="a", session_id=session.id)
+
+    stored = asyncio.run(scenario())
+    assert texts(stored) == ["1", "2"] and stored.state == {"answer": 4}
+    assert service.stats()["pending_events"] == 0
+
+
+def test_the_timer_flushes_off_the_event_loop(tmp_path: Path) -> None:
+    service = SqliteSessionService(tmp_path / "sessions.sqlite", flush_interval=0.01)
+
+    async def scenario() -> Session:
+        session = await service.create_session(app_name=APP, user_id="a")
+        await append(service, session, "1", "2")
+        for _ in range(100):
+            if service.stats()["flushes"]:
+                break
+            await asyncio.sleep(0.01)
+        return session
+
+    session = asyncio.run(scenario())
+    assert stored_texts(service.path, session.id) == ["1", "2"]
+    assert service.stats()["flushes"] == 1
+    service.close()
+
+
+def test_a_second_service_reads_only_new_rows(service: SqliteSessionService) -> None:
+    reader = SqliteSessionService(service.path)
+
+    async def scenario() -> None:
+        session = await service.create_session(app_name=APP, user_id="a")
+        await append(service, session, "1", "2")
+        service.flush()
+        before = await reader.get_session(app_name=APP, user_id="a", session_id=session.id)
+        await append(service, session, "3")
+        service.flush()
+        after = await reader.get_session(app_name=APP, user_id="a", session_id=session.id)
+        assert texts(after) == ["1", "2", "3"]
+        # Rows read before are not deserialized again.
+        assert after.events[0] is before.events[0]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        reader.close()
+
+
+def test_recent_events_of_a_cold_session(service: SqliteSessionService) -> None:
+    async def scenario() -> None:
+        session = await service.create_session(app_name=APP, user_id="a")
+        await append(service, session, "1", "2", "3")
+        service.flush()
+        service._cache.clear()
+        stored = await service.get_session(
+            app_name=APP, user_id="a", session_id=session.id, config=GetSessionConfig(num_recent_events=2)
+        )
+        assert texts(stored) == ["2", "3"]
+
+    asyncio.run(scenario())
+    assert service.stats()["cached_sessions"] == 0
+
+
+class FlakyConnection:
+    """Wraps a connection whose next ``failures`` batch inserts fail as if the file were locked."""
+
+    def __init__(self, conn: sqlite3.Connection, failures: int = 1) -> None:
+        self._conn = conn
+        self.failures = failures
+
+    def executemany(self, sql: str, rows: Any) -> sqlite3.Cursor:
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return self._conn.executemany(sql, rows)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+def test_a_failed_flush_is_retried(service: SqliteSessionService) -> None:
+    reader = SqliteSessionService(service.path)
+
+    async def scenario() -> None:
+        session = await service.create_session(app_name=APP, user_id="a")
+        await append(service, session, "1", "2", step=1)
+        service._conn = FlakyConnection(service._conn)
+        with pytest.raises(sqlite3.OperationalError):
+            service.flush()
+        assert service.stats()["failed_flushes"] == 1
+        assert service.stats()["pending_events"] == 2
+        # A newer value of the same key wins over the failed batch's.
+        await append(service, session, "3", step=2)
+        service.flush()
+        stored = await reader.get_session(app_name=APP, user_id="a", session_id=session.id)
+        assert texts(stored) == ["1", "2", "3"] and stored.state == {"step": 2}
+        mine = await service.get_session(app_name=APP, user_id="a", session_id=session.id)
+        assert texts(mine) == ["1", "2", "3"]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        reader.close()
+    assert service.stats()["events_written"] == 3
+
+
+def test_state_scopes(service: SqliteSessionService) -> None:
+    async def scenario() -> None:
+        first = await service.create_session(app_name=APP, user_id="a", state={"user:name": "Ada", "temp:x": 1})
+        await append(service, first, "1", **{"app:version": 2, "temp:y": 1, "unit": "cm"})
+        second = await service.create_session(app_name=APP, user_id="a")
+        other = await service.create_session(app_name=APP, user_id="b")
+        assert second.state == {"user:name": "Ada", "app:version": 2}
+        assert other.state == {"app:version": 2}
+        stored = await service.get_session(app_name=APP, user_id="a", session_id=first.id)
+        assert stored.state == {"user:name": "Ada", "app:version": 2, "unit": "cm"}
+
+    asyncio.run(scenario())
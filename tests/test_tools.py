@@ -0,0 +1,226 @@
+"""Regression tests for the math tool's parser, evaluator and expression cache."""
+
+from __future__ import annotations
+
+import pytest
+
+from google_adk_test import tools
+from google_adk_test.tools import (
+    ExpressionCache,
+    MathBudget,
+    MathToolError,
+    compute_basic_math,
+    evaluate_expression,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch: pytest.MonkeyPatch) -> ExpressionCache:
+    """Give every test an empty cache so results never leak between tests."""
+    cache = ExpressionCache()
+    monkeypatch.setattr(tools, "_cache", cache)
+    return cache
+
+
+def value(expression: str, budget: MathBudget | None = None) -> float:
+    return evaluate_expression(expression, budget or MathBudget()).value
+
+
+@pytest.mark.parametrize(
+    ("expression", "expected"),
+    [
+        ("1 + 2 * 3", 7.0),
+        ("(1 + 2) * 3", 9.0),
+        ("2 * 3 + 4 * 5", 26.0),
+        ("10 - 4 - 3", 3.0),
+        ("100 / 10 / 5", 2.0),
+        ("10 - (4 - 3)", 9.0),
+        ("8 / 4 * 2", 4.0),
+        ("1 + 2 - 3 + 4", 4.0),
+        ("((((7))))", 7.0),
+    ],
+)
+def test_precedence_and_left_associativity(expression: str, expected: float) -> None:
+    assert value(expression) == expected
+    assert value(expression) == float(eval(expression))
+
+
+@pytest.mark.parametrize(
+    ("expression", "expected"),
+    [
+        ("-3", -3.0),
+        ("--3", 3.0),
+        ("+-+3", -3.0),
+        ("-2 * 3", -6.0),
+        ("2 * -3", -6.0),
+        ("2 - -3", 5.0),
+        ("-(2 + 3)", -5.0),
+        ("-2 + 3", 1.0),
+        ("6 / -2 / -3", 1.0),
+    ],
+)
+def test_unary_minus(expression: str, expected: float) -> None:
+    assert value(expression) == expected
+
+
+def test_literals_match_python() -> None:
+    assert value("1_000 + 0x10 + 0b11 + 0o7") == 1000 + 16 + 3 + 7
+    assert value(".5 + 1. + 1e3 + 2.5E-1") == 0.5 + 1.0 + 1000.0 + 0.25
+    assert value("True + 1") == 2.0
+    assert value("False * 3") == 0.0
+
+
+@pytest.mark.parametrize(
+    ("expression", "operator"),
+    [
+        ("2 ** 3", "Pow"),
+        ("2 ** 3 ** 2", "Pow"),
+        ("-2 ** 2", "Pow"),
+        ("7 // 2", "FloorDiv"),
+        ("7 % 2", "Mod"),
+        ("1 << 2", "LShift"),
+        ("1 & 2", "BitAnd"),
+    ],
+)
+def test_unsupported_operators(expression: str, operator: str) -> None:
+    with pytest.raises(MathToolError, match=f"^Unsupported operator: {operator}$"):
+        compute_basic_math(expression)
+
+
+@pytest.mark.parametrize(
+    ("expression", "message"),
+    [
+        ("x + 1", "Unsupported expression component: Name(id='x', ctx=Load())"),
+        ("None + 1", "Unsupported expression component: Constant(value=None)"),
+        ("'a'", "Unsupported expression component: Constant(value='a')"),
+        ("1j", "Unsupported expression component: Constant(value=1j)"),
+        ("abs(1)", "Unsupported expression component: Call(func=Name(id='abs', ctx=Load()), args=[Constant(value=1)], keywords=[])"),
+        ("~1", "Unsupported expression component: UnaryOp(op=Invert(), operand=Constant(value=1))"),
+        ("1 < 2", "Unsupported expression component: Compare(left=Constant(value=1), ops=[Lt()], comparators=[Constant(value=2)])"),
+        ("1,2", "Unsupported expression component: Tuple(elts=[Constant(value=1), Constant(value=2)], ctx=Load())"),
+        # The whole expression is checked before anything is evaluated.
+        ("1 / 0 + 2 ** 3", "Unsupported operator: Pow"),
+    ],
+)
+def test_rejected_components_keep_their_messages(expression: str, message: str) -> None:
+    with pytest.raises(MathToolError) as info:
+        compute_basic_math(expression)
+    assert str(info.value) == message
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["1 +", "(1 + 2", "1 + 2)", "3 4", "1.5.2", "2 * * 3", "8 / / 2", "1 $ 2", " 1 + 2", "\t1", "1\n+ 2", "1\n  "],
+)
+def test_invalid_syntax(expression: str) -> None:
+    with pytest.raises(MathToolError) as info:
+        compute_basic_math(expression)
+    assert str(info.value) == f"Invalid expression '{expression}'."
+
+
+@pytest.mark.parametrize(
+    ("expression", "expected"),
+    [
+        ("1 + 2\n", 3.0),
+        ("\n1 + 2", 3.0),
+        ("(1\n + 2)", 3.0),
+        ("1 + 2  # total", 3.0),
+        ("1 + \\\n 2", 3.0),
+        ("1\t+\t2", 3.0),
+    ],
+)
+def test_whitespace_follows_python(expression: str, expected: float) -> None:
+    assert compute_basic_math(expression)["result"] == expected
+
+
+def test_division_by_zero() -> None:
+    with pytest.raises(MathToolError, match="Division by zero"):
+        compute_basic_math("1 / (2 - 2)")
+
+
+def test_steps_and_rendering() -> None:
+    result = compute_basic_math("(1+2)*-3")
+    assert result["expression"] == "(1 + 2) * -3"
+    assert result["operations_count"] == 2
+    assert result["steps"] == [
+        "1 = 1.0",
+        "2 = 2.0",
+        "1 + 2 = 3.0",
+        "3 = 3.0",
+        "-3 = -3.0",
+        # Operands are rendered like ``ast.unparse`` renders each child on its own.
+        "1 + 2 × -3 = -9.0",
+    ]
+
+
+def test_length_budget() -> None:
+    with pytest.raises(MathToolError, match="characters long"):
+        value("1 + 1", MathBudget(max_length=4))
+
+
+def test_node_budget() -> None:
+    assert value("1 + 1", MathBudget(max_nodes=3)) == 2.0
+    with pytest.raises(MathToolError, match="node budget of 3"):
+        value("1 + 1 + 1", MathBudget(max_nodes=3))
+
+
+def test_depth_budget() -> None:
+    assert value("-" * 9 + "1", MathBudget(max_depth=10)) == -1.0
+    with pytest.raises(MathToolError, match="depth budget of 10"):
+        value("-" * 10 + "1", MathBudget(max_depth=10))
+
+
+def test_magnitude_budget() -> None:
+    with pytest.raises(MathToolError, match="magnitude budget"):
+        value("1e50 * 1e51")
+    with pytest.raises(MathToolError, match="magnitude budget"):
+        value("1e309")
+
+
+def test_large_expressions_evaluate_iteratively() -> None:
+    subtotal = "(" + " + ".join(["1"] * 100) + ")"
+    assert value(" + ".join([subtotal] * 1_000)) == 100_000.0
+    assert value(" + ".join(["1"] * 1_500)) == 1_500.0
+
+
+def test_too_deep_for_the_parser() -> None:
+    with pytest.raises(MathToolError, match="nested too deeply"):
+        value(" + ".join(["1"] * 10_000), MathBudget(max_depth=100_000))
+    with pytest.raises(MathToolError, match="Invalid expression"):
+        value("(" * 500 + "1" + ")" * 500)
+
+
+def test_steps_are_complete_by_default() -> None:
+    result = compute_basic_math(" + ".join(["1"] * 100))
+    assert len(result["steps"]) == 199
+    assert "steps_omitted" not in result and "last_steps" not in result
+
+
+def test_long_traces_are_summarised_on_request() -> None:
+    result = compute_basic_math(" + ".join(["1"] * 100), summarize_steps=True)
+    assert len(result["steps"]) == tools._RESULT_HEAD_STEPS
+    assert len(result["last_steps"]) == tools._RESULT_TAIL_STEPS
+    assert result["steps_omitted"] == 199 - tools._RESULT_HEAD_STEPS - tools._RESULT_TAIL_STEPS
+    assert result["last_steps"][-1].endswith("= 100.0")
+    assert "steps_omitted" not in compute_basic_math("1 + 2", summarize_steps=True)
+
+
+def test_cache_respects_byte_budget(fresh_cache: ExpressionCache) -> None:
+    fresh_cache.resize(1024, max_bytes=20_000)
+    for operands in range(2, 60):
+        compute_basic_math(" + ".join(["1"] * operands))
+    stats = fresh_cache.stats()
+    assert 0 < stats["bytes"] <= 20_000
+    assert stats["evictions"] > 0
+    # An entry larger than the whole budget is never stored.
+    compute_basic_math(" + ".join(["1"] * 500))
+    assert fresh_cache.stats()["bytes"] <= 20_000
+
+
+def test_cached_errors_are_per_spelling() -> None:
+    with pytest.raises(MathToolError, match="'2 \\*  \\* 3'"):
+        compute_basic_math("2 *  * 3")
+    with pytest.raises(MathToolError, match="'2 \\* \\* 3'"):
+        compute_basic_math("2 * * 3")
+    with pytest.raises(MathToolError, match="Pow"):
+        compute_basic_math("2 ** 3")